@@ -0,0 +1,11 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def inline_thumbnails(settings):
+    """
+    Варианты картинок создаются сразу после коммита, а не в пуле:
+    поток пула мог бы писать во временный MEDIA_ROOT теста, пока тот
+    удаляется.
+    """
+    settings.THUMBNAIL_WORKERS = 0
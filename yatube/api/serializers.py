@@ -0,0 +1,100 @@
+"""
+Сериализация постов, групп, авторов и комментариев для JSON API.
+
+Каждое поле ответа знает, какие колонки и связи ему нужны, поэтому
+выборка с sparse fields читает только запрошенное, а связи подтягиваются
+через select_related: число запросов не зависит от размера страницы.
+"""
+from posts.counters import user_stats
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def _image_url(post):
+    return post.image.url if post.image else None
+
+
+# Поле ответа: (колонки для only(), функция получения значения).
+POST_FIELDS = {
+    'id': (('id',), lambda post: post.id),
+    'text': (('text',), lambda post: post.text),
+    'pub_date': (('pub_date',), lambda post: post.pub_date),
+    'updated': (('updated',), lambda post: post.updated),
+    'author': (('author__username',), lambda post: post.author.username),
+    'group': (
+        ('group__slug',), lambda post: post.group and post.group.slug
+    ),
+    'image': (('image',), _image_url),
+    'image_width': (('image_width',), lambda post: post.image_width),
+    'image_height': (('image_height',), lambda post: post.image_height),
+    'comments_count': (('comments_count',), lambda post: post.comments_count),
+}
+# Ключ курсора и автор для областей кеша читаются всегда.
+REQUIRED_COLUMNS = ('id', 'pub_date', 'author')
+
+
+def parse_fields(request, available):
+    """Поля из ?fields=a,b в порядке запроса; без параметра — все."""
+    raw = request.GET.get('fields')
+    if not raw:
+        return list(available)
+    fields = list(dict.fromkeys(
+        field.strip() for field in raw.split(',') if field.strip()
+    ))
+    unknown = [field for field in fields if field not in available]
+    if unknown:
+        raise ApiError(f'Неизвестные поля: {", ".join(unknown)}')
+    return fields
+
+
+def select_post_fields(queryset, fields):
+    """Ограничивает выборку постов колонками и связями полей fields."""
+    columns = set(REQUIRED_COLUMNS)
+    related = set()
+    for field in fields:
+        for column in POST_FIELDS[field][0]:
+            columns.add(column)
+            if '__' in column:
+                relation = column.split('__')[0]
+                related.add(relation)
+                columns.add(relation)
+    if related:
+        queryset = queryset.select_related(*sorted(related))
+    return queryset.only(*sorted(columns))
+
+
+def serialize_post(post, fields):
+    return {field: POST_FIELDS[field][1](post) for field in fields}
+
+
+def serialize_group(group):
+    return {
+        'slug': group.slug,
+        'title': group.title,
+        'description': group.description,
+    }
+
+
+def serialize_author(user):
+    stats = user_stats(user)
+    return {
+        'username': user.username,
+        'full_name': user.get_full_name(),
+        'posts_count': stats.posts_count,
+        'followers_count': stats.followers_count,
+        'following_count': stats.following_count,
+    }
+
+
+def serialize_comment(comment):
+    return {
+        'id': comment.id,
+        'author': comment.author.username,
+        'text': comment.text,
+        'created': comment.created,
+    }
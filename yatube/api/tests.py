@@ -0,0 +1,201 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.models import Comment, Follow, Group, Post, UserStats
+from posts.paginators import encode_cursor
+
+User = get_user_model()
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='StasBasov')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Важная группа',
+            slug='important',
+            description='Группа для важных постов',
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author,
+                text=f'Пост {number}',
+                group=cls.group if number % 2 else None,
+            )
+            for number in range(30)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def walk(self, client, url, **params):
+        """Обходит все страницы по ссылкам next и собирает тексты."""
+        texts = []
+        response = client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            texts += [post['text'] for post in data['results']]
+            if not data['next']:
+                return texts
+            response = client.get(data['next'])
+
+    def test_feeds_walk_with_cursor(self):
+        """Ленты API обходятся курсором целиком и в порядке сайта."""
+        feeds = [
+            (reverse('api:post_list'), 30),
+            (reverse('api:group_posts', args=['important']), 15),
+            (reverse('api:profile_posts', args=['StasBasov']), 30),
+            (reverse('api:follow_posts'), 30),
+        ]
+        for url, total in feeds:
+            with self.subTest(url=url):
+                texts = self.walk(self.authorized_client, url, limit=7)
+                self.assertEqual(len(texts), total)
+                self.assertEqual(texts[0], 'Пост 29')
+                self.assertEqual(len(set(texts)), total)
+
+    def test_out_of_range_cursor(self):
+        """Курсор с id за пределами 64 бит открывает первую страницу."""
+        token = encode_cursor(
+            Post(pub_date=self.posts[0].pub_date, id=10 ** 23)
+        )
+        response = self.guest_client.get(
+            reverse('api:post_list'), {'after': token}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['text'], 'Пост 29')
+
+    def test_feed_envelopes(self):
+        """Лента группы и профиля содержат группу и автора."""
+        data = self.guest_client.get(
+            reverse('api:group_posts', args=['important'])
+        ).json()
+        self.assertEqual(data['group']['title'], 'Важная группа')
+        data = self.guest_client.get(
+            reverse('api:profile_posts', args=['StasBasov'])
+        ).json()
+        self.assertEqual(data['author']['posts_count'], 30)
+        self.assertEqual(data['author']['followers_count'], 1)
+
+    def test_sparse_fields(self):
+        """?fields= оставляет в ответе только запрошенные поля."""
+        data = self.guest_client.get(
+            reverse('api:post_list'), {'fields': 'id,text'}
+        ).json()
+        self.assertEqual(set(data['results'][0]), {'id', 'text'})
+        response = self.guest_client.get(
+            reverse('api:post_list'), {'fields': 'id,password'}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['error'])
+
+    def test_post_detail_with_comments(self):
+        """Пост отдаётся с комментариями, если они запрошены."""
+        url = reverse('api:post_detail', args=[self.posts[0].id])
+        data = self.guest_client.get(url).json()
+        self.assertEqual(data['comments_count'], 1)
+        self.assertEqual(data['comments'][0]['text'], 'Комментарий')
+        data = self.guest_client.get(url, {'fields': 'text'}).json()
+        self.assertEqual(data, {'text': 'Пост 0'})
+        response = self.guest_client.get(
+            reverse('api:post_detail', args=[10 ** 6])
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_batch(self):
+        """Пакет постов по id приходит в порядке запроса за один запрос."""
+        ids = [self.posts[5].id, 10 ** 6, self.posts[1].id]
+        with CaptureQueriesContext(connection) as queries:
+            data = self.guest_client.get(
+                reverse('api:post_batch'),
+                {'ids': ','.join(map(str, ids)), 'fields': 'id,author,group'}
+            ).json()
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(
+            [post['id'] for post in data['results']], [ids[0], ids[2]]
+        )
+        self.assertEqual(data['results'][1]['group'], 'important')
+        self.assertEqual(data['missing'], [10 ** 6])
+        for ids in [
+            '', '1,x', ','.join(map(str, range(1, 102))), str(10 ** 23)
+        ]:
+            with self.subTest(ids=ids):
+                response = self.guest_client.get(
+                    reverse('api:post_batch'), {'ids': ids}
+                )
+                self.assertEqual(response.status_code, 400)
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        """Число запросов не растёт вместе с размером страницы."""
+        urls = [
+            reverse('api:post_list'),
+            reverse('api:group_posts', args=['important']),
+            reverse('api:profile_posts', args=['StasBasov']),
+            reverse('api:follow_posts'),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                counts = []
+                for limit in (1, 30):
+                    cache.clear()
+                    with CaptureQueriesContext(connection) as queries:
+                        self.authorized_client.get(url, {'limit': limit})
+                    counts.append(len(queries))
+                self.assertEqual(counts[0], counts[1])
+
+    def test_follow_requires_login(self):
+        """Лента подписок без авторизации отвечает 401."""
+        response = self.guest_client.get(reverse('api:follow_posts'))
+        self.assertEqual(response.status_code, 401)
+
+    def test_anonymous_responses_are_cached(self):
+        """Повторный анонимный запрос отдаётся из кеша и по ETag — 304."""
+        url = reverse('api:post_list')
+        etag = self.guest_client.get(url)['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 0)
+        Post.objects.create(author=self.author, text='Новый пост')
+        data = self.guest_client.get(url).json()
+        self.assertEqual(data['results'][0]['text'], 'Новый пост')
+
+    def test_only_get(self):
+        """API только читает данные."""
+        response = self.authorized_client.post(reverse('api:post_list'))
+        self.assertEqual(response.status_code, 405)
+
+    def test_author_without_stats(self):
+        """Автор без строки UserStats получает посчитанные счётчики."""
+        UserStats.objects.filter(user=self.author).delete()
+        urls = [
+            reverse('api:profile_posts', args=['StasBasov']),
+            reverse('posts:profile', args=['StasBasov']),
+            reverse('posts:post_detail', args=[self.posts[0].pk]),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                UserStats.objects.filter(user=self.author).delete()
+                cache.clear()
+                response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, 200)
+                stats = UserStats.objects.get(user=self.author)
+                self.assertEqual(
+                    (stats.posts_count, stats.followers_count), (30, 1)
+                )
+        author = self.guest_client.get(urls[0]).json()['author']
+        self.assertEqual(author['posts_count'], 30)
+        self.assertContains(self.guest_client.get(urls[1]), 'Total posts: 30')
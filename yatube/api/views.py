@@ -0,0 +1,161 @@
+from functools import wraps
+
+from django.conf import settings
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from posts.cache import (GLOBAL_SCOPE, GROUPS_SCOPE, author_scope,
+                         cache_anonymous_page, follow_scope, group_scope,
+                         post_scope, track_scopes)
+from posts.models import Group, Post, User
+from posts.paginators import KeysetPaginator, in_pk_range
+from posts.timeline import timeline_feed
+
+from .serializers import (POST_FIELDS, ApiError, parse_fields,
+                          select_post_fields, serialize_author,
+                          serialize_comment, serialize_group, serialize_post)
+
+
+def api_view(view):
+    """Только GET; ошибки отдаются JSON-объектом {"error": ...}."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            if request.method not in ('GET', 'HEAD'):
+                raise ApiError('Метод не поддерживается', status=405)
+            return view(request, *args, **kwargs)
+        except ApiError as error:
+            return JsonResponse({'error': error.message}, status=error.status)
+        except Http404:
+            return JsonResponse({'error': 'Не найдено'}, status=404)
+    return wrapper
+
+
+def parse_limit(request):
+    raw = request.GET.get('limit')
+    if raw is None:
+        return settings.POSTS_PER_PAGE
+    try:
+        limit = int(raw)
+    except ValueError:
+        raise ApiError('limit должен быть числом')
+    if not 1 <= limit <= settings.API_MAX_PAGE_SIZE:
+        raise ApiError(
+            f'limit должен быть от 1 до {settings.API_MAX_PAGE_SIZE}'
+        )
+    return limit
+
+
+def post_page(request, post_list, key=None, **extra):
+    """
+    Страница постов после курсора ?after= с полями из ?fields=
+    и ссылкой на следующую страницу.
+    """
+    fields = parse_fields(request, POST_FIELDS)
+    paginator = KeysetPaginator(
+        select_post_fields(post_list, fields),
+        parse_limit(request),
+        key=key
+    )
+    page = paginator.cursor_page(after=request.GET.get('after'))
+    next_url = None
+    if page.next_cursor:
+        query = request.GET.copy()
+        query['after'] = page.next_cursor
+        next_url = f'{request.path}?{query.urlencode()}'
+    return JsonResponse({
+        **extra,
+        'results': [serialize_post(post, fields) for post in page],
+        'next': next_url,
+    })
+
+
+@api_view
+@cache_anonymous_page
+def post_list(request):
+    track_scopes(request, [GLOBAL_SCOPE, GROUPS_SCOPE])
+    return post_page(request, Post.objects.all())
+
+
+@api_view
+@cache_anonymous_page
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    track_scopes(request, [group_scope(group.id)])
+    return post_page(request, group.posts.all(), group=serialize_group(group))
+
+
+@api_view
+@cache_anonymous_page
+def profile_posts(request, username):
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    track_scopes(request, [author_scope(author.id), GROUPS_SCOPE])
+    return post_page(
+        request, author.posts.all(), author=serialize_author(author)
+    )
+
+
+@api_view
+def follow_posts(request):
+    if not request.user.is_authenticated:
+        raise ApiError('Требуется авторизация', status=401)
+    track_scopes(request, [
+        GLOBAL_SCOPE, GROUPS_SCOPE, follow_scope(request.user.id)
+    ])
+    post_list, key = timeline_feed(request.user)
+    return post_page(request, post_list, key=key)
+
+
+@api_view
+@cache_anonymous_page
+def post_detail(request, post_id):
+    """Пост с комментариями; ?fields= может включать comments."""
+    fields = parse_fields(request, {**POST_FIELDS, 'comments': None})
+    post_fields = [field for field in fields if field != 'comments']
+    post = get_object_or_404(
+        select_post_fields(Post.objects.all(), post_fields),
+        id=post_id
+    )
+    track_scopes(request, [
+        post_scope(post.id), author_scope(post.author_id), GROUPS_SCOPE
+    ])
+    data = serialize_post(post, post_fields)
+    if 'comments' in fields:
+        data['comments'] = [
+            serialize_comment(comment)
+            for comment in post.comments.select_related('author')
+        ]
+    return JsonResponse(data)
+
+
+@api_view
+@cache_anonymous_page
+def post_batch(request):
+    """
+    Посты по списку ?ids=1,2,3 одним запросом: результаты идут в порядке
+    ids, отсутствующие id перечислены в missing.
+    """
+    try:
+        ids = list(dict.fromkeys(
+            int(pk) for pk in request.GET.get('ids', '').split(',') if pk
+        ))
+    except ValueError:
+        raise ApiError('ids должен быть списком чисел через запятую')
+    if not ids:
+        raise ApiError('Укажите ids')
+    if not all(in_pk_range(pk) for pk in ids):
+        raise ApiError('ids вне допустимого диапазона')
+    if len(ids) > settings.API_BATCH_SIZE:
+        raise ApiError(f'Не больше {settings.API_BATCH_SIZE} ids за запрос')
+    fields = parse_fields(request, POST_FIELDS)
+    track_scopes(
+        request, [post_scope(pk) for pk in ids] + [GROUPS_SCOPE]
+    )
+    posts = select_post_fields(Post.objects.all(), fields).in_bulk(ids)
+    return JsonResponse({
+        'results': [
+            serialize_post(posts[pk], fields) for pk in ids if pk in posts
+        ],
+        'missing': [pk for pk in ids if pk not in posts],
+    })
@@ -0,0 +1,371 @@
+"""
+Двухуровневый кеш для нескольких рабочих процессов.
+
+L1 — небольшой LRU в памяти процесса, L2 — общий для всех процессов
+файл SQLite. Каждая запись в L2 добавляет штамп в журнал изменений;
+процесс не чаще раза в SYNC_INTERVAL секунд читает новые штампы
+и выбрасывает из своего L1 изменённые ключи. Так значение, изменённое
+одним процессом, устаревает в остальных не дольше чем на SYNC_INTERVAL.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from . import metrics
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS entries ('
+    'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)',
+    'CREATE INDEX IF NOT EXISTS entries_expires ON entries (expires)',
+    # key IS NULL — штамп очистки всего кеша.
+    'CREATE TABLE IF NOT EXISTS stamps ('
+    'seq INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT)',
+)
+
+
+class LRU:
+    """Ограниченный по числу записей LRU с временем жизни записей."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        """Возвращает сериализованное значение или None."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires is not None and expires <= time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def discard(self, keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class TwoTierCache(BaseCache):
+    """
+    Бэкенд кеша Django: LOCATION — путь к файлу L2.
+
+    OPTIONS: MAX_ENTRIES и CULL_FREQUENCY ограничивают L2,
+    L1_MAX_ENTRIES — L1, SYNC_INTERVAL — период чтения журнала,
+    STAMPS_KEPT — сколько последних штампов хранится в журнале.
+    """
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._sync_interval = float(options.get('SYNC_INTERVAL', 1))
+        self._stamps_kept = int(options.get('STAMPS_KEPT', 10000))
+        self._l1 = LRU(int(options.get('L1_MAX_ENTRIES', 1000)))
+        self._local = threading.local()
+        self._sync_lock = threading.Lock()
+        self._pid = None
+        self._seen = None
+        self._synced_at = 0
+        self._stats = {'l1': Counter(), 'l2': Counter()}
+
+    # Соединение и журнал штампов
+
+    def _reset_after_fork(self):
+        """Данные родительского процесса не годятся после fork()."""
+        self._pid = os.getpid()
+        self._local = threading.local()
+        self._l1.clear()
+        self._seen = None
+        self._stats = {'l1': Counter(), 'l2': Counter()}
+
+    @property
+    def _connection(self):
+        if self._pid != os.getpid():
+            self._reset_after_fork()
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self._path, timeout=30, isolation_level=None,
+                check_same_thread=False,
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            for statement in SCHEMA:
+                connection.execute(statement)
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def _write(self, keys):
+        """
+        Транзакция записи в L2: изменённые ключи (None — все) получают
+        штампы, а из своего L1 выбрасываются сразу.
+        """
+        connection = self._connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+            connection.executemany(
+                'INSERT INTO stamps (key) VALUES (?)',
+                [(key,) for key in keys] if keys is not None else [(None,)]
+            )
+            connection.execute(
+                'DELETE FROM stamps '
+                'WHERE seq <= (SELECT MAX(seq) FROM stamps) - ?',
+                (self._stamps_kept,)
+            )
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        if keys is None:
+            self._l1.clear()
+        else:
+            self._l1.discard(keys)
+
+    def _sync(self):
+        """Выбрасывает из L1 ключи, изменённые другими процессами."""
+        connection = self._connection
+        now = time.monotonic()
+        if self._seen is not None and (
+            now - self._synced_at < self._sync_interval
+        ):
+            return
+        with self._sync_lock:
+            self._synced_at = now
+            if self._seen is None:
+                self._seen = connection.execute(
+                    'SELECT COALESCE(MAX(seq), 0) FROM stamps'
+                ).fetchone()[0]
+                return
+            stamps = connection.execute(
+                'SELECT seq, key FROM stamps WHERE seq > ? ORDER BY seq',
+                (self._seen,)
+            ).fetchall()
+            if not stamps:
+                return
+            keys = [key for seq, key in stamps]
+            # Пропуск в номерах значит, что часть журнала уже удалена.
+            if stamps[0][0] != self._seen + 1 or None in keys:
+                self._l1.clear()
+            else:
+                self._l1.discard(keys)
+            self._seen = stamps[-1][0]
+
+    # Хранилище L2
+
+    def _cull(self, connection):
+        connection.execute(
+            'DELETE FROM entries WHERE expires <= ?', (time.time(),)
+        )
+        count = connection.execute(
+            'SELECT COUNT(*) FROM entries'
+        ).fetchone()[0]
+        if count > self._max_entries:
+            # Бессрочные записи (поколения областей) вытесняются последними.
+            connection.execute(
+                'DELETE FROM entries WHERE key IN ('
+                'SELECT key FROM entries '
+                'ORDER BY expires IS NULL, expires LIMIT ?)',
+                (count // self._cull_frequency,)
+            )
+
+    def _store(self, connection, key, value, timeout):
+        connection.execute(
+            'INSERT OR REPLACE INTO entries (key, value, expires) '
+            'VALUES (?, ?, ?)',
+            (
+                key,
+                pickle.dumps(value, self.pickle_protocol),
+                self.get_backend_timeout(timeout),
+            )
+        )
+
+    def _fetch(self, keys):
+        """Живые записи L2: {ключ: (expires, сериализованное значение)}."""
+        connection = self._connection
+        found = {}
+        keys = list(keys)
+        # Ограничение SQLite на число параметров запроса.
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = connection.execute(
+                'SELECT key, value, expires FROM entries '
+                'WHERE key IN ({}) AND (expires IS NULL OR expires > ?)'
+                .format(', '.join('?' * len(chunk))),
+                (*chunk, time.time())
+            )
+            for key, value, expires in rows:
+                found[key] = (expires, value)
+        return found
+
+    def _lookup(self, keys):
+        """Ищет ключи сначала в L1, затем в L2; ведёт статистику."""
+        self._sync()
+        found = {}
+        missing = []
+        for key in keys:
+            value = self._l1.get(key)
+            if value is None:
+                missing.append(key)
+            else:
+                found[key] = value
+        self._stats['l1']['hits'] += len(found)
+        self._stats['l1']['misses'] += len(missing)
+        if missing:
+            fetched = self._fetch(missing)
+            self._stats['l2']['hits'] += len(fetched)
+            self._stats['l2']['misses'] += len(missing) - len(fetched)
+            for key, (expires, value) in fetched.items():
+                self._l1.set(key, value, expires)
+                found[key] = value
+        metrics.add('cache_hits', len(found))
+        metrics.add('cache_misses', len(keys) - len(found))
+        return {key: pickle.loads(value) for key, value in found.items()}
+
+    # API кеша Django
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self._lookup([key]).get(key, default)
+
+    def get_many(self, keys, version=None):
+        made = {self.make_key(key, version=version): key for key in keys}
+        for key in made:
+            self.validate_key(key)
+        return {
+            made[key]: value for key, value in self._lookup(made).items()
+        }
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        with self._write([key]) as connection:
+            self._cull(connection)
+            self._store(connection, key, value, timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        made = {
+            self.make_key(key, version=version): value
+            for key, value in data.items()
+        }
+        for key in made:
+            self.validate_key(key)
+        with self._write(list(made)) as connection:
+            self._cull(connection)
+            for key, value in made.items():
+                self._store(connection, key, value, timeout)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        with self._write([key]) as connection:
+            exists = connection.execute(
+                'SELECT 1 FROM entries '
+                'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                (key, time.time())
+            ).fetchone()
+            if exists:
+                return False
+            self._cull(connection)
+            self._store(connection, key, value, timeout)
+        return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        with self._write([key]) as connection:
+            return connection.execute(
+                'UPDATE entries SET expires = ? '
+                'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                (self.get_backend_timeout(timeout), key, time.time())
+            ).rowcount > 0
+
+    def incr(self, key, delta=1, version=None):
+        """Атомарно для всех процессов: чтение и запись в одной транзакции."""
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        with self._write([key]) as connection:
+            row = connection.execute(
+                'SELECT value FROM entries '
+                'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                (key, time.time())
+            ).fetchone()
+            if row is None:
+                raise ValueError("Key '%s' not found" % key)
+            value = pickle.loads(row[0]) + delta
+            connection.execute(
+                'UPDATE entries SET value = ? WHERE key = ?',
+                (pickle.dumps(value, self.pickle_protocol), key)
+            )
+        return value
+
+    def delete(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        with self._write([key]) as connection:
+            connection.execute('DELETE FROM entries WHERE key = ?', (key,))
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_key(key, version=version) for key in keys]
+        for key in keys:
+            self.validate_key(key)
+        if not keys:
+            return
+        with self._write(keys) as connection:
+            connection.executemany(
+                'DELETE FROM entries WHERE key = ?', [(key,) for key in keys]
+            )
+
+    def has_key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key in self._lookup([key])
+
+    def clear(self):
+        with self._write(None) as connection:
+            connection.execute('DELETE FROM entries')
+
+    def stats(self):
+        """Попадания и промахи по уровням в этом процессе."""
+        return {
+            'l1': {
+                'hits': self._stats['l1']['hits'],
+                'misses': self._stats['l1']['misses'],
+                'entries': len(self._l1),
+            },
+            'l2': {
+                'hits': self._stats['l2']['hits'],
+                'misses': self._stats['l2']['misses'],
+            },
+        }
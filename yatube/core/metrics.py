@@ -0,0 +1,199 @@
+"""
+Метрики запросов по представлениям.
+
+MetricsMiddleware собирает для каждого запроса время ответа, число
+и время запросов к базе, попадания и промахи кеша и размер ответа.
+Процесс копит приращения в памяти и не чаще раза
+в METRICS_FLUSH_INTERVAL секунд прибавляет их к общему для всех
+рабочих процессов файлу SQLite METRICS_DATABASE. Эндпоинт /metrics
+читает суммы из этого файла и отдаёт их в текстовом формате Prometheus.
+"""
+import contextvars
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+
+# Границы корзин гистограммы времени ответа, секунды.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+INF = '+Inf'
+UNRESOLVED = '<unresolved>'
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS metrics ('
+    'view TEXT NOT NULL, name TEXT NOT NULL, value REAL NOT NULL, '
+    'PRIMARY KEY (view, name))'
+)
+UPSERT = (
+    'INSERT INTO metrics (view, name, value) VALUES (?, ?, ?) '
+    'ON CONFLICT (view, name) DO UPDATE SET value = value + excluded.value'
+)
+
+# Суммы: имя в базе -> (метрика, тип, описание).
+TOTALS = {
+    'queries': (
+        'yatube_db_queries_total', 'counter', 'Запросов к базе'
+    ),
+    'query_time': (
+        'yatube_db_query_seconds_total', 'counter',
+        'Время запросов к базе, секунды'
+    ),
+    'cache_hits': (
+        'yatube_cache_hits_total', 'counter', 'Попаданий в кеш'
+    ),
+    'cache_misses': (
+        'yatube_cache_misses_total', 'counter', 'Промахов кеша'
+    ),
+    'response_bytes': (
+        'yatube_response_bytes_total', 'counter', 'Байт в ответах'
+    ),
+}
+DURATION = 'yatube_request_duration_seconds'
+
+# Измерения текущего запроса: их пополняют обёртка запросов к базе
+# и бэкенд кеша.
+current = contextvars.ContextVar('metrics_sample', default=None)
+
+
+def add(name, value):
+    """Прибавляет value к измерению текущего запроса, если оно идёт."""
+    sample = current.get()
+    if sample is not None:
+        sample[name] += value
+
+
+class Registry:
+    """Приращения метрик процесса и их сброс в общий файл."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._pending = defaultdict(Counter)
+        self._flushed_at = time.monotonic()
+        self._connection = None
+        self._path = None
+
+    def _check_fork(self):
+        # После fork() приращения родителя уже посчитаны им самим.
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._pending = defaultdict(Counter)
+            self._connection = None
+
+    def connect(self):
+        path = settings.METRICS_DATABASE
+        if self._connection is None or self._path != path:
+            self._connection = sqlite3.connect(
+                path, timeout=30, isolation_level=None,
+                check_same_thread=False,
+            )
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute(SCHEMA)
+            self._path = path
+        return self._connection
+
+    def record(self, view, duration, sample):
+        with self._lock:
+            self._check_fork()
+            values = self._pending[view]
+            values['requests'] += 1
+            values['duration'] += duration
+            bucket = next(
+                (str(bound) for bound in BUCKETS if duration <= bound), INF
+            )
+            values[f'bucket:{bucket}'] += 1
+            values.update(sample)
+            due = (
+                time.monotonic() - self._flushed_at
+                >= settings.METRICS_FLUSH_INTERVAL
+            )
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            self._check_fork()
+            pending, self._pending = self._pending, defaultdict(Counter)
+            self._flushed_at = time.monotonic()
+            if not pending:
+                return
+            connection = self.connect()
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                connection.executemany(UPSERT, [
+                    (view, name, value)
+                    for view, values in pending.items()
+                    for name, value in values.items()
+                ])
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+            connection.execute('COMMIT')
+
+    def totals(self):
+        """Суммы всех процессов: {view: {name: value}}."""
+        self.flush()
+        with self._lock:
+            rows = self.connect().execute(
+                'SELECT view, name, value FROM metrics'
+            ).fetchall()
+        result = defaultdict(dict)
+        for view, name, value in rows:
+            result[view][name] = value
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._check_fork()
+            self._pending = defaultdict(Counter)
+            self.connect().execute('DELETE FROM metrics')
+
+
+registry = Registry()
+
+
+def escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace(
+        '\n', '\\n'
+    )
+
+
+def number(value):
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+def render(totals):
+    """Текстовый формат Prometheus."""
+    lines = [
+        f'# HELP {DURATION} Время ответа по представлениям, секунды',
+        f'# TYPE {DURATION} histogram',
+    ]
+    views = sorted(totals)
+    for view in views:
+        values = totals[view]
+        label = f'view="{escape_label(view)}"'
+        cumulative = 0
+        for bound in [str(bound) for bound in BUCKETS] + [INF]:
+            cumulative += values.get(f'bucket:{bound}', 0)
+            lines.append(
+                f'{DURATION}_bucket{{{label},le="{bound}"}} '
+                f'{number(cumulative)}'
+            )
+        lines.append(
+            f'{DURATION}_sum{{{label}}} {number(values.get("duration", 0))}'
+        )
+        lines.append(
+            f'{DURATION}_count{{{label}}} {number(values.get("requests", 0))}'
+        )
+    for name, (metric, kind, description) in TOTALS.items():
+        lines.append(f'# HELP {metric} {description}')
+        lines.append(f'# TYPE {metric} {kind}')
+        for view in views:
+            lines.append(
+                f'{metric}{{view="{escape_label(view)}"}} '
+                f'{number(totals[view].get(name, 0))}'
+            )
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,174 @@
+import random
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import metrics, slowlog, staticfiles, template_profiling
+
+
+class StaticFilesMiddleware:
+    """
+    Отдаёт собранную статику из индекса, составленного при старте
+    процесса (core.staticfiles). Стоит первым в MIDDLEWARE: запросы
+    статики не проходят ни метрики, ни сессии. Включается
+    STATIC_PRODUCTION_MODE; при отладке статику отдаёт runserver.
+    """
+
+    def __init__(self, get_response):
+        if not settings.STATIC_PRODUCTION_MODE:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.files = staticfiles.index(
+            manifest=getattr(staticfiles_storage, 'hashed_files', None)
+        )
+
+    def __call__(self, request):
+        if request.method in ('GET', 'HEAD'):
+            asset = self.files.get(request.path_info)
+            if asset is not None:
+                return staticfiles.serve(request, asset)
+        return self.get_response(request)
+
+
+class MetricsMiddleware:
+    """
+    Меряет запрос и записывает его в метрики под именем представления.
+    Стоит в MIDDLEWARE сразу за StaticFilesMiddleware, чтобы учитывать
+    запросы к базе остальных middleware; собранная статика, которую та
+    отдаёт, в метрики не попадает. У потоковых ответов запрос
+    заканчивается, когда отдан последний кусок.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        sample = Counter()
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(
+                connection.execute_wrapper(self.wrap_query(sample))
+            )
+        token = metrics.current.set(sample)
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            stack.close()
+            raise
+        finally:
+            metrics.current.reset(token)
+        if response.streaming:
+            response.streaming_content = self.stream(
+                response.streaming_content, request, started, sample, stack
+            )
+            return response
+        stack.close()
+        sample['response_bytes'] += len(response.content)
+        self.record(request, started, sample)
+        return response
+
+    @staticmethod
+    def wrap_query(sample):
+        def wrapper(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                sample['queries'] += 1
+                sample['query_time'] += time.perf_counter() - started
+        return wrapper
+
+    def stream(self, content, request, started, sample, stack):
+        metrics.current.set(sample)
+        try:
+            for chunk in content:
+                sample['response_bytes'] += len(chunk)
+                yield chunk
+        finally:
+            metrics.current.set(None)
+            stack.close()
+            self.record(request, started, sample)
+
+    @staticmethod
+    def record(request, started, sample):
+        match = getattr(request, 'resolver_match', None)
+        metrics.registry.record(
+            match.view_name if match else metrics.UNRESOLVED,
+            time.perf_counter() - started,
+            sample,
+        )
+
+
+class SlowRequestMiddleware:
+    """
+    Ведёт трассу доли запросов и пишет в журнал медленные из них.
+    Запросы вне выборки проходят без обёрток. С TEMPLATE_PROFILING
+    в трассу попадает профиль рендера по шаблонам и тегам.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.SLOW_LOG_SAMPLE_RATE:
+            return self.get_response(request)
+        started = time.perf_counter()
+        trace = slowlog.Trace()
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(
+                connection.execute_wrapper(slowlog.wrap_query(trace))
+            )
+        token = slowlog.current.set(trace)
+        try:
+            with ExitStack() as profiling:
+                if settings.TEMPLATE_PROFILING:
+                    trace.profile = profiling.enter_context(
+                        template_profiling.profiling()
+                    )
+                response = self.get_response(request)
+        except BaseException:
+            stack.close()
+            raise
+        finally:
+            slowlog.current.reset(token)
+        if response.streaming:
+            response.streaming_content = self.stream(
+                response.streaming_content, request, response, started,
+                trace, stack
+            )
+            return response
+        stack.close()
+        self.finish(request, response, started, trace)
+        return response
+
+    def stream(self, content, request, response, started, trace, stack):
+        slowlog.current.set(trace)
+        try:
+            yield from content
+        finally:
+            slowlog.current.set(None)
+            stack.close()
+            self.finish(request, response, started, trace)
+
+    @staticmethod
+    def finish(request, response, started, trace):
+        duration = time.perf_counter() - started
+        if not trace.is_slow(duration):
+            return
+        match = getattr(request, 'resolver_match', None)
+        slowlog.logger.warning(
+            'slow request %s %s', request.method, request.path,
+            extra={'trace': trace.entry(
+                request,
+                match.view_name if match else None,
+                response.status_code,
+                duration,
+            )}
+        )
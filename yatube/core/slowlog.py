@@ -0,0 +1,157 @@
+"""
+Журнал медленных запросов.
+
+SlowRequestMiddleware ведёт трассу для доли SLOW_LOG_SAMPLE_RATE
+запросов: SQL с временем и местом вызова, отрендеренные шаблоны с
+временем. Если запрос дольше SLOW_REQUEST_THRESHOLD или хотя бы один
+запрос к базе дольше SLOW_QUERY_THRESHOLD, трасса пишется JSON-строкой
+в логгер yatube.slow (в настройках — ротируемый файл). Быстрые
+запросы только копят в списке сырые кадры и коды; текст места вызова
+и JSON собираются лишь для записи в журнал. С TEMPLATE_PROFILING
+в запись добавляется профиль рендера из core.template_profiling.
+"""
+import contextvars
+import json
+import logging
+import os
+import sys
+import time
+
+import django
+from django.conf import settings
+from django.template import base as template_base
+
+logger = logging.getLogger('yatube.slow')
+
+# Трасса текущего запроса, если за ним ведётся запись.
+current = contextvars.ContextVar('slow_trace', default=None)
+
+DJANGO_DIR = os.path.dirname(django.__file__) + os.sep
+TEMPLATE_BASE = template_base.__file__
+# Кадры middleware журнала и метрик не бывают местом вызова.
+OWN_FILES = (
+    __file__,
+    os.path.join(os.path.dirname(__file__), 'middleware.py'),
+)
+
+
+def capture():
+    """
+    Место вызова (первый кадр вне Django и журнала) и шаблоны, внутри
+    которых выполняется код, от внутреннего к внешнему. Возвращает
+    сырые данные, текст собирает describe().
+    """
+    site = None
+    templates = []
+    frame = sys._getframe(1)
+    while frame is not None:
+        code = frame.f_code
+        if code.co_name == 'render' and code.co_filename == TEMPLATE_BASE:
+            name = getattr(frame.f_locals.get('self'), 'name', None)
+            if name and (not templates or templates[-1] != name):
+                templates.append(name)
+        elif site is None and not (
+            code.co_filename.startswith(DJANGO_DIR)
+            or code.co_filename in OWN_FILES
+        ):
+            site = (code.co_filename, frame.f_lineno, code.co_name)
+        frame = frame.f_back
+    return site, templates
+
+
+def short_path(filename):
+    if filename.startswith(settings.BASE_DIR):
+        return os.path.relpath(filename, settings.BASE_DIR)
+    marker = 'site-packages' + os.sep
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    return filename
+
+
+def describe(site):
+    if site is None:
+        return None
+    filename, line, function = site
+    return f'{short_path(filename)}:{line} in {function}'
+
+
+class Trace:
+    """Записанное за один запрос."""
+
+    def __init__(self):
+        self.queries = []
+        self.templates = []
+        self.slowest_query = 0
+        self.dropped = 0
+        # Профиль рендера шаблонов, если включён TEMPLATE_PROFILING.
+        self.profile = None
+
+    def query(self, sql, duration, site, templates):
+        self.slowest_query = max(self.slowest_query, duration)
+        if len(self.queries) >= settings.SLOW_LOG_MAX_QUERIES:
+            self.dropped += 1
+            return
+        self.queries.append((sql, duration, site, templates))
+
+    def template(self, name, duration):
+        self.templates.append((name, duration))
+
+    def is_slow(self, duration):
+        return (
+            duration >= settings.SLOW_REQUEST_THRESHOLD
+            or self.slowest_query >= settings.SLOW_QUERY_THRESHOLD
+        )
+
+    def entry(self, request, view, status, duration):
+        entry = {
+            'method': request.method,
+            'path': request.get_full_path(),
+            'view': view,
+            'status': status,
+            'duration': round(duration, 6),
+            'sql_time': round(sum(query[1] for query in self.queries), 6),
+            'queries': [
+                {
+                    'sql': sql,
+                    'duration': round(query_time, 6),
+                    'site': describe(site),
+                    'templates': templates,
+                }
+                for sql, query_time, site, templates in self.queries
+            ],
+            'queries_dropped': self.dropped,
+            'templates': [
+                {'name': name, 'duration': round(render_time, 6)}
+                for name, render_time in self.templates
+            ],
+        }
+        if self.profile is not None:
+            entry['template_profile'] = self.profile.summary(
+                settings.SLOW_LOG_PROFILE_ROWS
+            )
+        return entry
+
+
+def wrap_query(trace):
+    """Обёртка connection.execute_wrapper, пишущая запросы в трассу."""
+    def wrapper(execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            trace.query(sql, duration, *capture())
+    return wrapper
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна JSON-строка на запись: время, уровень и поля трассы."""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'message': record.getMessage(),
+        }
+        entry.update(getattr(record, 'trace', {}))
+        return json.dumps(entry, ensure_ascii=False, default=str)
@@ -0,0 +1,187 @@
+"""
+Статика в продакшен-режиме.
+
+collectstatic через CompressedManifestStaticFilesStorage пишет в
+STATIC_ROOT копии файлов с хешем содержимого в имени
+(img/logo.3f2a1b9c0d4e.png), манифест staticfiles.json и рядом с
+каждым сжимаемым файлом его gzip-копию (.gz), сжатую один раз на
+максимальном уровне. Тег {% static %} отдаёт имена с хешем.
+
+StaticFilesMiddleware при старте процесса составляет индекс собранных
+файлов и отдаёт их, не доходя до представлений:
+- gzip-копию, если клиент её принимает;
+- файлы с хешем — с Cache-Control immutable на STATIC_MAX_AGE: их
+  содержимое под этим именем не меняется, и браузер не перепроверяет
+  их при повторных загрузках страниц;
+- прочие — на STATIC_FALLBACK_MAX_AGE;
+- ETag и Last-Modified с ответом 304 на условные запросы.
+Файлы, собранные после старта, видны после перезапуска процессов.
+"""
+import gzip
+import logging
+import mimetypes
+import os
+from collections import namedtuple
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+logger = logging.getLogger(__name__)
+
+# Уже сжатые форматы: gzip их не уменьшает.
+INCOMPRESSIBLE = {
+    '.png', '.jpg', '.jpeg', '.gif', '.webp', '.avif', '.woff', '.woff2',
+    '.gz', '.br', '.zip', '.mp4', '.webm', '.mp3', '.ogg',
+}
+# Файлы меньше этого не сжимаются: заголовки gzip съедят выигрыш.
+GZIP_MIN_SIZE = 256
+# gzip-копия сохраняется, только если она меньше оригинала хотя бы на 5%.
+GZIP_MAX_RATIO = 0.95
+
+Variant = namedtuple('Variant', 'path size etag')
+Asset = namedtuple(
+    'Asset', 'identity gzip content_type last_modified cache_control'
+)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Манифест с хешами имён и gzip-копии собранных файлов."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Несобранные файлы, о которых уже есть запись в журнале.
+        self.missing = set()
+
+    def post_process(self, paths, dry_run=False, **options):
+        names = set()
+        for name, hashed_name, processed in super().post_process(
+            paths, dry_run, **options
+        ):
+            if not isinstance(processed, Exception):
+                names.add(name)
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        for name in sorted(names):
+            for target in {name, self.hashed_files.get(self.hash_key(name))}:
+                compressed = target and self.compress(target)
+                if compressed:
+                    yield target, compressed, True
+
+    def compress(self, name):
+        """Пишет gzip-копию файла; возвращает её имя или None."""
+        if os.path.splitext(name)[1].lower() in INCOMPRESSIBLE:
+            return None
+        with self.open(name) as source:
+            content = source.read()
+        if len(content) < GZIP_MIN_SIZE:
+            return None
+        # mtime=0: одинаковые файлы дают одинаковые байты копии.
+        compressed = gzip.compress(content, compresslevel=9, mtime=0)
+        if len(compressed) > len(content) * GZIP_MAX_RATIO:
+            return None
+        gzip_name = f'{name}.gz'
+        if self.exists(gzip_name):
+            self.delete(gzip_name)
+        self._save(gzip_name, ContentFile(compressed))
+        return gzip_name
+
+    def stored_name(self, name):
+        # Файла нет среди собранных: ссылка остаётся без хеша, и
+        # страница не падает из-за одной картинки или таблицы стилей.
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            if name not in self.missing:
+                self.missing.add(name)
+                logger.warning('Нет собранного файла %s', name)
+            return name
+
+
+def variant(path):
+    stat = os.stat(path)
+    etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+    return Variant(path, stat.st_size, etag)
+
+
+def index(root=None, url=None, manifest=None):
+    """
+    Собранные файлы по адресам: {'/static/img/logo.….png': Asset}.
+    manifest — исходные имена и их имена с хешем.
+    """
+    root = root or settings.STATIC_ROOT
+    url = url or settings.STATIC_URL
+    hashed = set((manifest or {}).values())
+    files = {}
+    if not root or not os.path.isdir(root):
+        return files
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            name = os.path.relpath(path, root).replace(os.sep, '/')
+            if name.endswith('.gz') and os.path.exists(path[:-3]):
+                continue
+            identity = variant(path)
+            gzip_path = f'{path}.gz'
+            content_type, _ = mimetypes.guess_type(name)
+            files[url + name] = Asset(
+                identity=identity,
+                gzip=variant(gzip_path) if os.path.exists(gzip_path)
+                else None,
+                content_type=content_type or 'application/octet-stream',
+                last_modified=int(os.path.getmtime(path)),
+                cache_control=(
+                    f'public, max-age={settings.STATIC_MAX_AGE}, immutable'
+                    if name in hashed else
+                    f'public, max-age={settings.STATIC_FALLBACK_MAX_AGE}'
+                ),
+            )
+    return files
+
+
+def accepts_gzip(request):
+    """Есть ли gzip в Accept-Encoding с ненулевым весом."""
+    for coding in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        token, _, params = coding.partition(';')
+        if token.strip().lower() not in ('gzip', '*'):
+            continue
+        weight = params.strip().lower()
+        if weight.startswith('q='):
+            try:
+                return float(weight[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+def serve(request, asset):
+    """Ответ с файлом, его gzip-копией или 304 Not Modified."""
+    encoded = asset.gzip is not None and accepts_gzip(request)
+    chosen = asset.gzip if encoded else asset.identity
+    headers = HttpResponse(content_type=asset.content_type)
+    headers['Content-Length'] = chosen.size
+    headers['ETag'] = chosen.etag
+    headers['Last-Modified'] = http_date(asset.last_modified)
+    headers['Cache-Control'] = asset.cache_control
+    if asset.gzip is not None:
+        headers['Vary'] = 'Accept-Encoding'
+    if encoded:
+        headers['Content-Encoding'] = 'gzip'
+    response = get_conditional_response(
+        request, etag=chosen.etag, last_modified=asset.last_modified,
+        response=headers
+    )
+    if response is not headers or request.method == 'HEAD':
+        return response
+    # Файл открывается, только когда его действительно надо отдать.
+    response = FileResponse(
+        open(chosen.path, 'rb'), content_type=asset.content_type
+    )
+    for header, value in headers.items():
+        response[header] = value
+    return response
@@ -0,0 +1,80 @@
+import os
+import time
+
+from django.template import (
+    TemplateDoesNotExist, TemplateSyntaxError, engines
+)
+from django.template.backends import django as django_backend
+
+from . import slowlog
+
+
+class Template(django_backend.Template):
+    """Шаблон, который записывает время рендера в трассу запроса."""
+
+    def render(self, context=None, request=None):
+        trace = slowlog.current.get()
+        if trace is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            trace.template(
+                self.template.name, time.perf_counter() - started
+            )
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """Стандартный бэкенд Django с шаблонами, видимыми журналу."""
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
+
+
+# Файлы в каталогах шаблонов, которые считаются шаблонами.
+TEMPLATE_SUFFIXES = ('.html', '.txt', '.xml')
+
+
+def template_names(loader):
+    """Имена всех шаблонов в каталогах загрузчика."""
+    for directory in loader.get_dirs():
+        for root, _, files in os.walk(directory):
+            for filename in files:
+                if filename.endswith(TEMPLATE_SUFFIXES):
+                    path = os.path.join(root, filename)
+                    yield os.path.relpath(path, directory).replace(
+                        os.sep, '/'
+                    )
+
+
+def prewarm():
+    """
+    Компилирует все шаблоны заранее, чтобы кеширующий загрузчик не
+    разбирал их на первых запросах рабочего процесса. Шаблоны, которые
+    не разбираются (например, из неустановленных приложений),
+    пропускаются. Возвращает число скомпилированных.
+    """
+    compiled = 0
+    for backend in engines.all():
+        if not isinstance(backend, django_backend.DjangoTemplates):
+            continue
+        engine = backend.engine
+        names = set()
+        for loader in engine.template_loaders:
+            for source in getattr(loader, 'loaders', [loader]):
+                if hasattr(source, 'get_dirs'):
+                    names.update(template_names(source))
+        for name in sorted(names):
+            try:
+                engine.get_template(name)
+            except (TemplateDoesNotExist, TemplateSyntaxError):
+                continue
+            compiled += 1
+    return compiled
@@ -0,0 +1,130 @@
+"""
+Профилирование рендера шаблонов.
+
+Внутри profiling() время рендера копится по шаблонам и по тегам.
+Для этого Template._render и Node.render_annotated при первом
+профилировании заменяются обёртками с таймером; вне профилирования
+обёртка только проверяет контекстную переменную. Так же Django
+подменяет Template._render в тестах, и обёртки уживаются с этой
+подменой.
+
+Время шаблона — всё и собственное, без вложенных через include
+и extends шаблонов. Время тега включает вложенные в него теги.
+"""
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.template.base import Node, Template, TextNode, VariableNode
+
+current = ContextVar('template_profile', default=None)
+
+
+class Profile:
+    def __init__(self):
+        # Шаблон -> [рендеров, всё время, собственное время].
+        self.templates = defaultdict(lambda: [0, 0.0, 0.0])
+        # (шаблон, тег) -> [рендеров, время].
+        self.tags = defaultdict(lambda: [0, 0.0])
+        # Время вложенных шаблонов для каждого открытого рендера.
+        self._nested = []
+
+    def render_template(self, render, template, context):
+        self._nested.append(0.0)
+        started = time.perf_counter()
+        try:
+            return render(template, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            nested = self._nested.pop()
+            if self._nested:
+                self._nested[-1] += elapsed
+            stats = self.templates[template.name or '<string>']
+            stats[0] += 1
+            stats[1] += elapsed
+            stats[2] += elapsed - nested
+
+    def render_node(self, render, node, context):
+        started = time.perf_counter()
+        try:
+            return render(node, context)
+        finally:
+            stats = self.tags[(template_name(node), tag_name(node))]
+            stats[0] += 1
+            stats[1] += time.perf_counter() - started
+
+    def summary(self, limit=None):
+        """Шаблоны и теги по убыванию времени, секунды."""
+        templates = sorted(
+            (
+                {'name': name, 'count': count, 'total': round(total, 6),
+                 'own': round(own, 6)}
+                for name, (count, total, own) in self.templates.items()
+            ),
+            key=lambda row: row['own'], reverse=True
+        )
+        tags = sorted(
+            (
+                {'template': template, 'tag': tag, 'count': count,
+                 'total': round(total, 6)}
+                for (template, tag), (count, total) in self.tags.items()
+            ),
+            key=lambda row: row['total'], reverse=True
+        )
+        return {'templates': templates[:limit], 'tags': tags[:limit]}
+
+
+def template_name(node):
+    origin = getattr(node, 'origin', None)
+    return getattr(origin, 'template_name', None) or '<string>'
+
+
+def tag_name(node):
+    if isinstance(node, VariableNode):
+        return '{{ }}'
+    token = getattr(node, 'token', None)
+    if token is not None and token.contents:
+        return token.contents.split(None, 1)[0]
+    return type(node).__name__
+
+
+def profiled_template_render(render):
+    def _render(self, context):
+        profile = current.get()
+        if profile is None:
+            return render(self, context)
+        return profile.render_template(render, self, context)
+    _render.profiled = True
+    return _render
+
+
+def profiled_node_render(render):
+    def render_annotated(self, context):
+        profile = current.get()
+        # Текст между тегами не профилируется: его много и он дешёвый.
+        if profile is None or isinstance(self, TextNode):
+            return render(self, context)
+        return profile.render_node(render, self, context)
+    render_annotated.profiled = True
+    return render_annotated
+
+
+def install():
+    """Ставит обёртки, если их ещё нет (тесты Django снимают свою)."""
+    if not getattr(Template._render, 'profiled', False):
+        Template._render = profiled_template_render(Template._render)
+    if not getattr(Node.render_annotated, 'profiled', False):
+        Node.render_annotated = profiled_node_render(Node.render_annotated)
+
+
+@contextmanager
+def profiling():
+    """Профилирует рендер шаблонов в блоке; отдаёт Profile."""
+    install()
+    profile = Profile()
+    token = current.set(profile)
+    try:
+        yield profile
+    finally:
+        current.reset(token)
@@ -1,4 +1,25 @@
-from django.test import TestCase
+import copy
+import gzip
+import json
+import logging
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.template import engines
+from django.templatetags.static import static
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from core.cache import TwoTierCache
+from core.metrics import Registry, registry
+from core.middleware import StaticFilesMiddleware
+from core.slowlog import JsonFormatter
+from core.template_backends import prewarm
+from core.template_profiling import profiling
 
 
 class ViewTestClass(TestCase):
@@ -6,3 +27,395 @@ class ViewTestClass(TestCase):
         response = self.client.get('/somepage/')
         self.assertEqual(response.status_code, 404)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+class TwoTierCacheTest(TestCase):
+    """Два экземпляра над одним файлом изображают два процесса."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.location = os.path.join(directory.name, 'cache.sqlite3')
+        self.first = self.make_cache()
+        self.second = self.make_cache()
+
+    def make_cache(self, **options):
+        return TwoTierCache(self.location, {
+            'OPTIONS': {'SYNC_INTERVAL': 0, 'L1_MAX_ENTRIES': 3, **options},
+        })
+
+    def test_tests_use_own_files(self):
+        """Тесты пишут кеш и метрики не в файлы запущенного сервера."""
+        for path in [
+            settings.CACHES['default']['LOCATION'],
+            settings.METRICS_DATABASE,
+        ]:
+            with self.subTest(path=path):
+                self.assertNotEqual(
+                    os.path.dirname(path), settings.BASE_DIR
+                )
+                self.assertTrue(os.path.isdir(os.path.dirname(path)))
+
+    def test_basic_operations(self):
+        """Операции кеша Django работают поверх общего хранилища."""
+        cache = self.first
+        cache.set('key', {'value': 1})
+        self.assertEqual(cache.get('key'), {'value': 1})
+        self.assertFalse(cache.add('key', 'other'))
+        self.assertTrue(cache.add('new', 'other'))
+        cache.set_many({'a': 1, 'b': 2})
+        self.assertEqual(
+            cache.get_many(['a', 'b', 'missing']), {'a': 1, 'b': 2}
+        )
+        self.assertEqual(cache.incr('a', 10), 11)
+        with self.assertRaises(ValueError):
+            cache.incr('missing')
+        cache.delete_many(['a', 'b'])
+        self.assertIsNone(cache.get('a'))
+        cache.set('short', 1, 0)
+        self.assertIsNone(cache.get('short'))
+
+    def test_tier_statistics(self):
+        """Первое чтение идёт в L2, повторное обслуживает L1."""
+        self.first.set('key', 1)
+        self.first.get('key')
+        self.first.get('key')
+        self.first.get('missing')
+        self.assertEqual(self.first.stats(), {
+            'l1': {'hits': 1, 'misses': 2, 'entries': 1},
+            'l2': {'hits': 1, 'misses': 1},
+        })
+
+    def test_write_invalidates_other_process(self):
+        """Запись одного процесса выбрасывает ключ из L1 другого."""
+        self.first.set('key', 'old')
+        self.assertEqual(self.second.get('key'), 'old')
+        self.first.set('key', 'new')
+        self.assertEqual(self.second.get('key'), 'new')
+        self.first.delete('key')
+        self.assertIsNone(self.second.get('key'))
+
+    def test_stale_until_sync_interval(self):
+        """До очередной сверки со штампами L1 отдаёт прежнее значение."""
+        lazy = self.make_cache(SYNC_INTERVAL=60)
+        self.first.set('key', 'old')
+        self.assertEqual(lazy.get('key'), 'old')
+        self.first.set('key', 'new')
+        self.assertEqual(lazy.get('key'), 'old')
+        lazy._synced_at = 0
+        self.assertEqual(lazy.get('key'), 'new')
+
+    def test_clear_and_pruned_stamps_flush_l1(self):
+        """Очистка и отставание от журнала сбрасывают L1 целиком."""
+        self.first.set('key', 1)
+        self.second.get('key')
+        self.first.clear()
+        self.assertIsNone(self.second.get('key'))
+        short = self.make_cache(STAMPS_KEPT=1)
+        self.first.set('key', 2)
+        self.assertEqual(self.second.get('key'), 2)
+        short.set('a', 1)
+        short.set('b', 1)
+        short.set('key', 3)
+        self.assertEqual(self.second.get('key'), 3)
+
+    def test_incr_is_shared(self):
+        """Инкременты разных процессов не теряются."""
+        self.first.set('counter', 0, None)
+        for _ in range(5):
+            self.first.incr('counter')
+            self.second.incr('counter')
+        self.assertEqual(self.first.get('counter'), 10)
+        self.assertEqual(self.second.get('counter'), 10)
+
+    def test_tiers_are_bounded(self):
+        """L1 вытесняет давние записи, L2 прореживается по MAX_ENTRIES."""
+        cache = self.make_cache(MAX_ENTRIES=5, CULL_FREQUENCY=2)
+        cache.set('generation', 1, None)
+        for number in range(10):
+            cache.set(f'key{number}', number)
+            cache.get(f'key{number}')
+        self.assertEqual(cache.stats()['l1']['entries'], 3)
+        count = cache._connection.execute(
+            'SELECT COUNT(*) FROM entries'
+        ).fetchone()[0]
+        self.assertLessEqual(count, 6)
+        self.assertEqual(cache.get('generation'), 1)
+
+
+class MetricsTest(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        overrides = override_settings(
+            METRICS_DATABASE=os.path.join(directory.name, 'metrics.sqlite3'),
+            METRICS_FLUSH_INTERVAL=0,
+            METRICS_ALLOWED_IPS=['127.0.0.1'],
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        registry.reset()
+        cache.clear()
+
+    def metric(self, text, line):
+        """Значение строки метрики line из ответа /metrics."""
+        for row in text.splitlines():
+            if row.startswith(line + ' '):
+                return float(row.rsplit(' ', 1)[1])
+        self.fail(f'{line} нет в метриках')
+
+    def test_views_are_measured(self):
+        """Запросы учитываются по имени представления."""
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        text = response.content.decode()
+        view = '{view="posts:index"}'
+        self.assertEqual(
+            self.metric(text, f'yatube_request_duration_seconds_count{view}'),
+            2
+        )
+        self.assertEqual(self.metric(
+            text,
+            'yatube_request_duration_seconds_bucket'
+            '{view="posts:index",le="+Inf"}'
+        ), 2)
+        self.assertGreater(
+            self.metric(text, f'yatube_db_queries_total{view}'), 0
+        )
+        self.assertGreater(
+            self.metric(text, f'yatube_response_bytes_total{view}'), 0
+        )
+        # Второй запрос анонима отдан из кеша страниц.
+        self.assertGreater(
+            self.metric(text, f'yatube_cache_hits_total{view}'), 0
+        )
+
+    def test_streaming_response_is_measured(self):
+        """Потоковый ответ учитывается после отдачи всего тела."""
+        response = self.client.get(reverse('posts:index_feed', args=['rss']))
+        size = len(b''.join(response.streaming_content))
+        text = self.client.get(reverse('metrics')).content.decode()
+        self.assertEqual(self.metric(
+            text, 'yatube_response_bytes_total{view="posts:index_feed"}'
+        ), size)
+
+    def test_processes_are_aggregated(self):
+        """Суммы складываются из приращений всех процессов."""
+        other = Registry()
+        registry.record('posts:index', 0.003, {'queries': 2})
+        other.record('posts:index', 0.2, {'queries': 3})
+        totals = registry.totals()['posts:index']
+        self.assertEqual(totals['requests'], 2)
+        self.assertEqual(totals['queries'], 5)
+        self.assertEqual(totals['bucket:0.005'], 1)
+        self.assertEqual(totals['bucket:0.25'], 1)
+
+    def test_access_is_restricted(self):
+        """Посторонним метрики не отдаются."""
+        with override_settings(METRICS_ALLOWED_IPS=[]):
+            response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 403)
+
+
+@override_settings(
+    SLOW_LOG_SAMPLE_RATE=1.0,
+    SLOW_REQUEST_THRESHOLD=0,
+    SLOW_QUERY_THRESHOLD=0,
+)
+class SlowRequestLogTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_slow_request_is_logged(self):
+        """Медленный запрос пишется с SQL, местами вызова и шаблонами."""
+        with self.assertLogs('yatube.slow', logging.WARNING) as logs:
+            self.client.get(reverse('posts:index'))
+        trace = logs.records[0].trace
+        self.assertEqual(trace['view'], 'posts:index')
+        self.assertEqual(trace['status'], 200)
+        self.assertTrue(trace['queries'])
+        sites = [query['site'] for query in trace['queries']]
+        self.assertTrue(any(
+            site and site.startswith('posts' + os.sep) for site in sites
+        ))
+        self.assertIn(
+            'posts/index.html',
+            [template['name'] for template in trace['templates']]
+        )
+        line = JsonFormatter().format(logs.records[0])
+        self.assertEqual(json.loads(line)['path'], '/')
+        self.assertNotIn('template_profile', trace)
+
+    def test_streaming_request_is_logged(self):
+        """Потоковый ответ отдаётся целиком и пишется после отдачи."""
+        url = reverse('posts:index_feed', args=['rss'])
+        with self.assertLogs('yatube.slow', logging.WARNING) as logs:
+            response = self.client.get(url)
+            content = b''.join(response.streaming_content)
+        self.assertTrue(content.startswith(b'<?xml'))
+        self.assertEqual(logs.records[0].trace['view'], 'posts:index_feed')
+
+    @override_settings(TEMPLATE_PROFILING=True)
+    def test_template_profile_is_logged(self):
+        """С TEMPLATE_PROFILING в записи есть профиль шаблонов и тегов."""
+        with self.assertLogs('yatube.slow', logging.WARNING) as logs:
+            self.client.get(reverse('posts:index'))
+        profile = logs.records[0].trace['template_profile']
+        self.assertIn(
+            'posts/index.html', [row['name'] for row in profile['templates']]
+        )
+        json.loads(JsonFormatter().format(logs.records[0]))
+
+    def test_fast_requests_are_not_logged(self):
+        """Запросы быстрее порогов и вне выборки не пишутся."""
+        thresholds = override_settings(
+            SLOW_REQUEST_THRESHOLD=60, SLOW_QUERY_THRESHOLD=60
+        )
+        unsampled = override_settings(SLOW_LOG_SAMPLE_RATE=0)
+        for overrides in (thresholds, unsampled):
+            with self.subTest(overrides=overrides), overrides:
+                with self.assertNoLogs('yatube.slow', logging.WARNING):
+                    self.client.get(reverse('posts:index'))
+
+
+class TemplateRenderingTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_profiling(self):
+        """Профиль считает шаблоны, вложенные шаблоны и их теги."""
+        with profiling() as profile:
+            self.client.get(reverse('posts:index'))
+        self.assertEqual(profile.templates['posts/index.html'][0], 1)
+        count, total, own = profile.templates['base.html']
+        self.assertLess(own, total)
+        self.assertGreater(profile.tags[('includes/header.html', 'url')][0], 0)
+        summary = profile.summary(limit=3)
+        self.assertEqual(len(summary['templates']), 3)
+        self.assertGreaterEqual(
+            summary['tags'][0]['total'], summary['tags'][-1]['total']
+        )
+        # Вне блока рендер не профилируется.
+        self.client.get(reverse('posts:index'))
+        self.assertEqual(profile.templates['posts/index.html'][0], 1)
+
+    def test_production_mode_prewarms_cached_loader(self):
+        """Кеширующий загрузчик после прогрева отдаёт готовые шаблоны."""
+        templates = copy.deepcopy(settings.TEMPLATES)
+        templates[0]['OPTIONS']['loaders'] = [(
+            'django.template.loaders.cached.Loader',
+            settings.TEMPLATE_LOADERS,
+        )]
+        with override_settings(TEMPLATES=templates):
+            self.assertGreater(prewarm(), 0)
+            engine = engines.all()[0].engine
+            template_cache = engine.template_loaders[0].get_template_cache
+            self.assertIn('posts/index.html', template_cache)
+            self.assertIn('admin/base.html', template_cache)
+            response = self.client.get(reverse('posts:index'))
+            self.assertEqual(response.status_code, 200)
+            self.assertTemplateUsed(response, 'posts/index.html')
+
+
+class StaticFilesTest(TestCase):
+    """Сборка статики с хешами и gzip-копиями и её раздача."""
+
+    def setUp(self):
+        source = tempfile.TemporaryDirectory()
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(source.cleanup)
+        self.addCleanup(root.cleanup)
+        os.makedirs(os.path.join(source.name, 'js'))
+        with open(os.path.join(source.name, 'js', 'app.js'), 'w') as file:
+            file.write('console.log("yatube");\n' * 100)
+        with open(os.path.join(source.name, 'tiny.txt'), 'w') as file:
+            file.write('tiny')
+        overrides = override_settings(
+            DEBUG=False,
+            STATIC_ROOT=root.name,
+            STATICFILES_DIRS=[source.name],
+            STATICFILES_FINDERS=[
+                'django.contrib.staticfiles.finders.FileSystemFinder',
+            ],
+            STATICFILES_STORAGE=(
+                'core.staticfiles.CompressedManifestStaticFilesStorage'
+            ),
+            STATIC_PRODUCTION_MODE=True,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.root = root.name
+        call_command('collectstatic', interactive=False, verbosity=0)
+        self.middleware = StaticFilesMiddleware(
+            lambda request: HttpResponse('view')
+        )
+        self.url = static('js/app.js')
+
+    def get(self, url, **headers):
+        return self.middleware(RequestFactory().get(url, **headers))
+
+    def test_collected_files(self):
+        """Имена с хешем, gzip-копии только у сжимаемых файлов."""
+        self.assertRegex(self.url, r'^/static/js/app\.[0-9a-f]{12}\.js$')
+        name = self.url[len(settings.STATIC_URL):]
+        with gzip.open(os.path.join(self.root, f'{name}.gz')) as copy_file:
+            with open(os.path.join(self.root, name), 'rb') as original:
+                self.assertEqual(copy_file.read(), original.read())
+        self.assertFalse(
+            os.path.exists(os.path.join(self.root, 'tiny.txt.gz'))
+        )
+
+    def test_precompressed_and_immutable(self):
+        """gzip-копия отдаётся тем, кто её принимает, и кешируется."""
+        response = self.get(self.url, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(
+            response['Cache-Control'],
+            f'public, max-age={settings.STATIC_MAX_AGE}, immutable'
+        )
+        body = b''.join(response.streaming_content)
+        self.assertEqual(int(response['Content-Length']), len(body))
+        self.assertIn(b'yatube', gzip.decompress(body))
+        for encoding in ('', 'gzip;q=0', 'identity'):
+            with self.subTest(encoding=encoding):
+                response = self.get(
+                    self.url, HTTP_ACCEPT_ENCODING=encoding
+                )
+                self.assertFalse(response.has_header('Content-Encoding'))
+                self.assertIn(
+                    b'yatube', b''.join(response.streaming_content)
+                )
+
+    def test_conditional_requests(self):
+        """Повторный запрос с ETag или датой получает 304 без тела."""
+        response = self.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        for headers in (
+            {'HTTP_IF_NONE_MATCH': response['ETag']},
+            {'HTTP_IF_MODIFIED_SINCE': response['Last-Modified']},
+        ):
+            with self.subTest(headers=headers):
+                cached = self.get(
+                    self.url, HTTP_ACCEPT_ENCODING='gzip', **headers
+                )
+                self.assertEqual(cached.status_code, 304)
+                self.assertEqual(cached['ETag'], response['ETag'])
+                self.assertEqual(cached.content, b'')
+        # ETag gzip-копии не подходит несжатому ответу.
+        response = self.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+
+    def test_unhashed_and_unknown_paths(self):
+        """Имена без хеша кешируются ненадолго, прочее идёт дальше."""
+        response = self.get('/static/js/app.js')
+        self.assertEqual(
+            response['Cache-Control'],
+            f'public, max-age={settings.STATIC_FALLBACK_MAX_AGE}'
+        )
+        self.assertEqual(self.get('/static/missing.js').content, b'view')
+        with self.assertLogs('core.staticfiles', 'WARNING'):
+            self.assertEqual(static('css/missing.css'),
+                             '/static/css/missing.css')
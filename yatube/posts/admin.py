@@ -1,11 +1,93 @@
+from django import forms
+from django.conf import settings
 from django.contrib import admin
-from .models import Post
-from django.contrib import admin
+from django.contrib.admin import helpers
+from django.db import transaction
+from django.template.response import TemplateResponse
+from django.utils import timezone
 
+from . import search
+from .cache import (GLOBAL_SCOPE, group_scope, invalidate_scopes, post_scope,
+                    post_scopes)
 from .models import Post, Group, Comment, Follow
+from .paginators import EstimatedCountPaginator, bounded_count
+
+
+def chunked_pks(queryset, size):
+    """Первичные ключи выборки порциями по size, без OFFSET."""
+    pks = queryset.order_by('pk').values_list('pk', flat=True)
+    last = None
+    while True:
+        chunk = pks if last is None else pks.filter(pk__gt=last)
+        chunk = list(chunk[:size])
+        if not chunk:
+            return
+        yield chunk
+        last = chunk[-1]
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Админка для больших таблиц: оценка количества строк вместо COUNT(*)
+    и удаление порциями вместо delete_selected, который грузит в память
+    все выбранные объекты вместе со связанными.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ['delete_in_chunks']
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    def confirm_action(self, request, queryset, action, title, form=None):
+        """Промежуточная страница подтверждения массового действия."""
+        opts = self.model._meta
+        context = {
+            **self.admin_site.each_context(request),
+            'title': title,
+            'opts': opts,
+            'action': action,
+            'form': form,
+            'count': bounded_count(queryset, settings.ADMIN_COUNT_LIMIT),
+            'count_limit': settings.ADMIN_COUNT_LIMIT,
+            'selected': request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+            'select_across': request.POST.get('select_across', '0'),
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+        }
+        return TemplateResponse(
+            request, 'admin/posts/confirm_action.html', context
+        )
+
+    def delete_in_chunks(self, request, queryset):
+        if not request.POST.get('confirm'):
+            return self.confirm_action(
+                request, queryset, 'delete_in_chunks',
+                'Удалить выбранные объекты?'
+            )
+        deleted = 0
+        for chunk in chunked_pks(queryset, settings.ADMIN_CHUNK_SIZE):
+            with transaction.atomic():
+                _, per_model = self.model.objects.filter(
+                    pk__in=chunk
+                ).delete()
+            deleted += per_model.get(self.model._meta.label, 0)
+        self.message_user(request, f'Удалено объектов: {deleted}')
+    delete_in_chunks.short_description = 'Удалить выбранные порциями'
+    delete_in_chunks.allowed_permissions = ('delete',)
+
+
+class MoveToGroupForm(forms.Form):
+    group = forms.ModelChoiceField(
+        Group.objects.all(),
+        required=False,
+        empty_label='Без группы',
+        label='Группа'
+    )
 
 
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(LargeTableAdmin):
     list_display = (
         'pk',
         'text',
@@ -13,13 +95,75 @@ class PostAdmin(admin.ModelAdmin):
         'author',
         'group'
     )
-    list_editable = ('group',)
+    list_select_related = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
+    autocomplete_fields = ('author', 'group')
+    actions = ['move_to_group', 'delete_in_chunks']
+    empty_value_display = '-пусто-'
+
+    def get_search_results(self, request, queryset, search_term):
+        """Поиск по тексту через полнотекстовый индекс вместо LIKE."""
+        match = search.build_query(search_term, column='text')
+        if match is None or not search.is_supported():
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        return search.filter_matching(queryset, match), False
+
+    def move_to_group(self, request, queryset):
+        """
+        Переносит выбранные посты в группу UPDATE-ами по порциям. Сигналы
+        при этом не срабатывают, поэтому кеш лент и страниц затронутых
+        постов сбрасывается здесь же, для каждой порции.
+        """
+        form = MoveToGroupForm(request.POST if 'confirm' in request.POST
+                               else None)
+        if not form.is_valid():
+            return self.confirm_action(
+                request, queryset, 'move_to_group',
+                'Перенести выбранные посты в группу', form
+            )
+        group = form.cleaned_data['group']
+        moved = 0
+        for chunk in chunked_pks(queryset, settings.ADMIN_CHUNK_SIZE):
+            with transaction.atomic():
+                posts = Post.objects.filter(pk__in=chunk)
+                scopes = {GLOBAL_SCOPE}
+                if group is not None:
+                    scopes.add(group_scope(group.pk))
+                for post in posts.only('pk', 'author', 'group'):
+                    scopes.update(post_scopes(post))
+                    scopes.add(post_scope(post.pk))
+                moved += posts.update(group=group, updated=timezone.now())
+                invalidate_scopes(scopes)
+        self.message_user(request, f'Перенесено постов: {moved}')
+    move_to_group.short_description = 'Перенести выбранные в группу'
+    move_to_group.allowed_permissions = ('change',)
+
+
+class GroupAdmin(admin.ModelAdmin):
+    list_display = ('title', 'slug')
+    search_fields = ('title', 'slug')
+    prepopulated_fields = {'slug': ('title',)}
+
+
+class CommentAdmin(LargeTableAdmin):
+    list_display = ('pk', 'post', 'author', 'created')
+    list_select_related = ('post', 'author')
+    list_filter = ('created',)
+    raw_id_fields = ('post',)
+    autocomplete_fields = ('author',)
     empty_value_display = '-пусто-'
 
 
+class FollowAdmin(LargeTableAdmin):
+    list_display = ('pk', 'user', 'author')
+    list_select_related = ('user', 'author')
+    autocomplete_fields = ('user', 'author')
+
+
 admin.site.register(Post, PostAdmin)
-admin.site.register(Group)
-admin.site.register(Comment)
-admin.site.register(Follow)
+admin.site.register(Group, GroupAdmin)
+admin.site.register(Comment, CommentAdmin)
+admin.site.register(Follow, FollowAdmin)
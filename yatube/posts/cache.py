@@ -0,0 +1,182 @@
+"""
+Области кеширования лент: вся лента, группа, автор и лента подписок
+читателя. Записи постов и подписок сбрасывают закешированные
+значения затронутых областей.
+
+Фрагменты шаблонов не удаляются, а версионируются: у каждой области
+есть счётчик поколений, который увеличивается при записи, и ключ
+фрагмента включает текущие поколения своих областей.
+"""
+import hashlib
+import random
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+GLOBAL_SCOPE = 'global'
+GROUPS_SCOPE = 'groups'
+COUNT_KEY = 'posts:count:{scope}'
+GENERATION_KEY = 'posts:generation:{scope}'
+PAGE_KEY = 'posts:page:{digest}'
+
+
+def group_scope(group_id):
+    return f'group:{group_id}'
+
+
+def author_scope(author_id):
+    return f'author:{author_id}'
+
+
+def follow_scope(user_id):
+    return f'follow:{user_id}'
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def post_scopes(post):
+    """Области, в ленты которых попадает пост."""
+    scopes = [GLOBAL_SCOPE, author_scope(post.author_id)]
+    if post.group_id:
+        scopes.append(group_scope(post.group_id))
+    return scopes
+
+
+def count_key(scope):
+    return COUNT_KEY.format(scope=scope)
+
+
+def invalidate_counts(scopes):
+    cache.delete_many([count_key(scope) for scope in scopes])
+
+
+def generation_key(scope):
+    return GENERATION_KEY.format(scope=scope)
+
+
+def initial_generation():
+    # Случайное начало, чтобы после вытеснения счётчика из кеша
+    # не совпасть с поколением уже закешированных фрагментов.
+    return random.getrandbits(32)
+
+
+def bump_generations(scopes):
+    for scope in scopes:
+        key = generation_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, initial_generation(), None)
+
+
+def scope_version(scopes):
+    """Текущие поколения областей одной строкой для ключа фрагмента."""
+    keys = [generation_key(scope) for scope in scopes]
+    generations = cache.get_many(keys)
+    missing = {
+        key: initial_generation() for key in keys if key not in generations
+    }
+    if missing:
+        cache.set_many(missing, None)
+        generations.update(missing)
+    return '.'.join(str(generations[key]) for key in keys)
+
+
+def invalidate_scopes(scopes):
+    """
+    Сбрасывает количество постов и поднимает поколения областей.
+
+    Сброс повторяется после коммита: иначе параллельный запрос успел бы
+    закешировать ещё не закоммиченное состояние под новым поколением.
+    """
+    scopes = list(scopes)
+
+    def invalidate():
+        invalidate_counts(scopes)
+        bump_generations(scopes)
+
+    invalidate()
+    transaction.on_commit(invalidate)
+
+
+def track_scopes(request, scopes):
+    """
+    Запоминает, от каких областей зависит ответ, и их поколения на
+    момент начала рендеринга; возвращает строку версии.
+    """
+    request.cache_scopes = list(scopes)
+    request.cache_version = scope_version(request.cache_scopes)
+    return request.cache_version
+
+
+def page_key(request):
+    digest = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return PAGE_KEY.format(digest=digest)
+
+
+def conditional_response(request, response):
+    """Отдаёт 304, если у клиента уже есть актуальная версия ответа."""
+    last_modified = response.get('Last-Modified')
+    return get_conditional_response(
+        request,
+        etag=response.get('ETag'),
+        last_modified=last_modified and parse_http_date_safe(last_modified),
+        response=response,
+    )
+
+
+def cache_anonymous_page(view):
+    """
+    Кеширует страницы целиком для анонимных пользователей.
+
+    Представление сообщает свои области через track_scopes(). Запись
+    хранит поколения этих областей на момент рендеринга и считается
+    свежей, пока они не изменились. Ответы получают ETag по
+    содержимому, повторные запросы — 304 без рендеринга.
+
+    Last-Modified — время рендеринга, сохранённое в записи вместе
+    с ответом, а не дата постов: та не меняется от комментариев,
+    удаления верхнего поста ленты или переименования группы и автора.
+    Любая запись в области делает запись устаревшей, и новый рендеринг
+    получает более позднее время.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if (
+            request.method not in ('GET', 'HEAD')
+            or request.user.is_authenticated
+        ):
+            return view(request, *args, **kwargs)
+        key = page_key(request)
+        entry = cache.get(key)
+        rendered = int(time.time())
+        if entry is not None:
+            scopes, version, response = entry
+            if scope_version(scopes) == version:
+                return conditional_response(request, response)
+            # Изменение в ту же секунду, что и прошлый рендеринг, не
+            # должно совпасть с его Last-Modified.
+            previous = parse_http_date_safe(response.get('Last-Modified', ''))
+            rendered = max(rendered, (previous or 0) + 1)
+        response = view(request, *args, **kwargs)
+        scopes = getattr(request, 'cache_scopes', None)
+        if response.status_code != 200 or not scopes or response.cookies:
+            return response
+        response['ETag'] = quote_etag(
+            hashlib.md5(response.content).hexdigest()
+        )
+        response['Last-Modified'] = http_date(rendered)
+        cache.set(
+            key,
+            (scopes, request.cache_version, response),
+            settings.ANONYMOUS_PAGE_CACHE_TIMEOUT
+        )
+        return conditional_response(request, response)
+    return wrapper
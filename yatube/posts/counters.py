@@ -0,0 +1,106 @@
+"""
+Денормализованные счётчики: комментарии поста, посты, подписчики
+и подписки пользователя.
+
+Счётчики меняются атомарными UPDATE ... SET x = x + 1 в той же
+транзакции, что и запись; reconcile() пересчитывает их с нуля.
+Уменьшение не опускает счётчик ниже нуля: разошедшийся счётчик
+(например, после bulk_create или прерванной загрузки) не должен
+ломать удаление нарушением CHECK >= 0, а исправит его reconcile().
+"""
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Follow, Post, User, UserStats
+
+
+def shifted(field, delta):
+    """F(field) + delta, не меньше нуля."""
+    if delta >= 0:
+        return F(field) + delta
+    return Greatest(F(field) + delta, 0)
+
+
+def bump_user(user_id, **deltas):
+    """Сдвигает счётчики пользователя: bump_user(1, posts_count=1)."""
+    UserStats.objects.filter(user_id=user_id).update(
+        **{field: shifted(field, delta) for field, delta in deltas.items()}
+    )
+
+
+def bump_comments(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=shifted('comments_count', delta)
+    )
+
+
+def _count(queryset, field):
+    """Подзапрос с количеством строк queryset для внешнего ключа field."""
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+            field
+        ).annotate(total=Count('pk')).values('total'),
+        output_field=IntegerField()
+    ), 0)
+
+
+def reconcile_posts(posts=None):
+    """Исправляет comments_count у постов; возвращает число исправленных."""
+    if posts is None:
+        posts = Post.objects.all()
+    drifted = posts.annotate(
+        actual=_count(Comment.objects.all(), 'post')
+    ).exclude(comments_count=F('actual')).values_list('pk', 'actual')
+    fixed = 0
+    for pk, actual in drifted.iterator():
+        Post.objects.filter(pk=pk).update(comments_count=actual)
+        fixed += 1
+    return fixed
+
+
+def reconcile_users(users=None):
+    """Создаёт недостающие UserStats и исправляет разошедшиеся счётчики."""
+    if users is None:
+        users = User.objects.all()
+    UserStats.objects.bulk_create(
+        (
+            UserStats(user_id=pk)
+            for pk in users.filter(stats__isnull=True).values_list(
+                'pk', flat=True
+            ).iterator()
+        ),
+        ignore_conflicts=True,
+    )
+    actual = users.annotate(
+        actual_posts=_count(Post.objects.all(), 'author'),
+        actual_followers=_count(Follow.objects.all(), 'author'),
+        actual_following=_count(Follow.objects.all(), 'user'),
+    ).values_list(
+        'pk', 'actual_posts', 'actual_followers', 'actual_following',
+        'stats__posts_count', 'stats__followers_count',
+        'stats__following_count',
+    )
+    fixed = 0
+    for pk, posts, followers, following, *stored in actual.iterator():
+        if stored != [posts, followers, following]:
+            UserStats.objects.filter(user_id=pk).update(
+                posts_count=posts,
+                followers_count=followers,
+                following_count=following,
+            )
+            fixed += 1
+    return fixed
+
+
+def user_stats(user):
+    """
+    Счётчики пользователя. У пользователя, созданного до UserStats,
+    через bulk_create или загрузкой, строки нет: она создаётся с
+    посчитанными значениями.
+    """
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        reconcile_users(User.objects.filter(pk=user.pk))
+        user.stats = UserStats.objects.get(user_id=user.pk)
+        return user.stats
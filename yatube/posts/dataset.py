@@ -0,0 +1,282 @@
+"""
+Синтетический набор данных для проверок производительности.
+
+Пользователи, группы, подписки, посты, комментарии и картинки
+вставляются пачками через bulk_create с заранее известными id, поэтому
+внешние ключи не приходится искать в базе. Популярность авторов
+распределена по степенному закону: вес автора ранга r равен
+1 / r ** alpha, по этим весам выбираются авторы подписок, а по более
+пологим весам 1 / r ** (alpha / 2) — авторы постов. Картинки рисуются
+в пуле процессов параллельно со вставкой строк.
+
+Счётчики UserStats и comments_count считаются при генерации. Ленты
+подписок заполняются запросами INSERT ... SELECT по диапазонам
+читателей, поисковый индекс пересобирается целиком.
+"""
+import itertools
+import multiprocessing
+import os
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+from faker import Faker
+from PIL import Image, ImageDraw
+
+from . import timeline
+from .models import Comment, Follow, Group, Post, User, UserStats
+from .transfer import keeping_dates, reset_sequences
+
+BATCH_SIZE = 5000
+IMAGE_DIR = 'posts/synthetic'
+IMAGE_SIZE = (960, 640)
+IMAGE_SHAPES = 12
+# Доля постов в группах и наибольшая задержка комментария.
+GROUP_SHARE = 0.7
+COMMENT_DELAY = timedelta(days=7)
+# Читателей в одном INSERT ... SELECT при заполнении лент.
+TIMELINE_USERS = 100
+
+
+def render_image(task):
+    """Рисует JPEG из случайных фигур; выполняется в процессе пула."""
+    path, seed = task
+    rng = random.Random(seed)
+
+    def color():
+        return tuple(rng.randrange(256) for _ in range(3))
+
+    image = Image.new('RGB', IMAGE_SIZE, color())
+    draw = ImageDraw.Draw(image)
+    width, height = IMAGE_SIZE
+    for _ in range(IMAGE_SHAPES):
+        x, y = rng.randrange(width), rng.randrange(height)
+        box = [x, y, x + rng.randrange(40, width // 2),
+               y + rng.randrange(40, height // 2)]
+        shape = draw.ellipse if rng.random() < 0.5 else draw.rectangle
+        shape(box, fill=color())
+    image.save(path, 'JPEG', quality=85)
+    return path
+
+
+def next_id(model):
+    last = model.objects.order_by('-pk').values_list('pk', flat=True).first()
+    return (last or 0) + 1
+
+
+def cumulative(weights):
+    return list(itertools.accumulate(weights))
+
+
+class Generator:
+    """Генерирует и вставляет набор данных заданного размера."""
+
+    def __init__(self, users, groups, posts, comments, follows, images,
+                 alpha=1.0, days=365, seed=0, workers=None, password=None,
+                 log=None):
+        self.users = users
+        self.groups = groups
+        self.posts = posts
+        self.comments = comments
+        self.follows = follows
+        self.images = images
+        self.alpha = alpha
+        self.days = days
+        self.workers = os.cpu_count() if workers is None else workers
+        self.password = make_password(password) if password else '!'
+        self.log = log or (lambda message: None)
+        self.rng = random.Random(seed)
+        Faker.seed(seed)
+        self.fake = Faker('ru_RU')
+        self.vocabulary = list(dict.fromkeys(
+            self.fake.words(nb=20000, unique=False)
+        ))
+        # Частоты слов по закону Ципфа, как в живых текстах.
+        self.word_weights = cumulative(
+            1 / rank for rank in range(1, len(self.vocabulary) + 1)
+        )
+
+    def run(self):
+        """Создаёт данные; возвращает id первого нового пользователя."""
+        self.now = timezone.now()
+        self.start = self.now - timedelta(days=self.days)
+        self.first_user = next_id(User)
+        self.user_ids = range(self.first_user, self.first_user + self.users)
+        self.posts_count = dict.fromkeys(self.user_ids, 0)
+        self.followers_count = dict.fromkeys(self.user_ids, 0)
+        self.following_count = dict.fromkeys(self.user_ids, 0)
+        # Ранг популярности — случайная перестановка пользователей.
+        ranked = list(self.user_ids)
+        self.rng.shuffle(ranked)
+        self.ranked = ranked
+        self.popularity = cumulative(
+            1 / rank ** self.alpha for rank in range(1, len(ranked) + 1)
+        )
+        self.activity = cumulative(
+            1 / rank ** (self.alpha / 2) for rank in range(1, len(ranked) + 1)
+        )
+        os.makedirs(os.path.join(settings.MEDIA_ROOT, IMAGE_DIR),
+                    exist_ok=True)
+        pool = multiprocessing.Pool(self.workers) if self.workers else None
+        pending = []
+        try:
+            self.insert(User, self.generate_users())
+            self.group_ids = self.insert(Group, self.generate_groups())
+            self.insert(Follow, self.generate_follows())
+            with keeping_dates(Post, ('pub_date', 'updated')), \
+                    keeping_dates(Comment, ('created',)):
+                for tasks in self.insert_posts():
+                    if pool is None:
+                        for task in tasks:
+                            render_image(task)
+                    else:
+                        pending.append(pool.map_async(render_image, tasks))
+            self.insert(UserStats, self.generate_stats())
+            reset_sequences(User, Group, Post, Comment, Follow)
+            for result in pending:
+                result.get()
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+        return self.first_user
+
+    def materialize_timelines(self):
+        """Заполняет ленты новых читателей; возвращает число записей."""
+        total = 0
+        for first in range(self.first_user, self.first_user + self.users,
+                           TIMELINE_USERS):
+            last = min(first + TIMELINE_USERS, self.first_user + self.users)
+            with transaction.atomic():
+                total += timeline.materialize(first, last - 1)
+            self.log(f'ленты: {total}')
+        return total
+
+    def insert(self, model, objects):
+        """Вставляет объекты пачками; возвращает их id."""
+        ids = []
+        while True:
+            batch = list(itertools.islice(objects, BATCH_SIZE))
+            if not batch:
+                break
+            with transaction.atomic():
+                model.objects.bulk_create(batch)
+            ids.extend(obj.pk for obj in batch)
+            self.log(f'{model._meta.verbose_name_plural}: {len(ids)}')
+        return ids
+
+    def text(self, low, high):
+        words = self.rng.choices(
+            self.vocabulary, cum_weights=self.word_weights,
+            k=self.rng.randint(low, high)
+        )
+        return ' '.join(words).capitalize() + '.'
+
+    def generate_users(self):
+        for user_id in self.user_ids:
+            yield User(
+                id=user_id,
+                username=f'user{user_id}',
+                first_name=self.fake.first_name(),
+                last_name=self.fake.last_name(),
+                password=self.password,
+                date_joined=self.start,
+            )
+
+    def generate_groups(self):
+        first = next_id(Group)
+        for group_id in range(first, first + self.groups):
+            yield Group(
+                id=group_id,
+                slug=f'group-{group_id}',
+                title=self.text(1, 3)[:-1],
+                description=self.text(10, 30),
+            )
+
+    def generate_follows(self):
+        """Подписок у читателя — по экспоненте, авторы — по популярности."""
+        for user_id in self.user_ids:
+            count = min(
+                int(self.rng.expovariate(1 / self.follows)), self.users - 1
+            ) if self.follows else 0
+            authors = set(self.rng.choices(
+                self.ranked, cum_weights=self.popularity, k=count
+            ))
+            authors.discard(user_id)
+            self.following_count[user_id] += len(authors)
+            for author_id in authors:
+                self.followers_count[author_id] += 1
+                yield Follow(user_id=user_id, author_id=author_id)
+
+    def insert_posts(self):
+        """
+        Вставляет посты с комментариями пачками; после каждой пачки
+        отдаёт задания на картинки её постов.
+        """
+        post_id = next_id(Post)
+        comment_id = next_id(Comment)
+        step = (self.now - self.start) / max(self.posts, 1)
+        users = list(self.user_ids)
+        done = 0
+        while done < self.posts:
+            posts, comments, tasks = [], [], []
+            for number in range(done, min(done + BATCH_SIZE, self.posts)):
+                # Посты идут по времени, id растёт вместе с датой.
+                pub_date = self.start + step * number
+                author_id = self.rng.choices(
+                    self.ranked, cum_weights=self.activity
+                )[0]
+                image = ''
+                if self.rng.random() < self.images:
+                    image = f'{IMAGE_DIR}/{post_id}.jpg'
+                    tasks.append((
+                        os.path.join(settings.MEDIA_ROOT, image),
+                        self.rng.getrandbits(32)
+                    ))
+                count = int(self.rng.expovariate(1 / self.comments)) if (
+                    self.comments
+                ) else 0
+                posts.append(Post(
+                    id=post_id,
+                    text=self.text(5, 60),
+                    pub_date=pub_date,
+                    updated=pub_date,
+                    author_id=author_id,
+                    group_id=self.rng.choice(self.group_ids) if (
+                        self.group_ids and self.rng.random() < GROUP_SHARE
+                    ) else None,
+                    image=image,
+                    image_width=IMAGE_SIZE[0] if image else None,
+                    image_height=IMAGE_SIZE[1] if image else None,
+                    comments_count=count,
+                ))
+                delay = min(COMMENT_DELAY, self.now - pub_date)
+                for _ in range(count):
+                    comments.append(Comment(
+                        id=comment_id,
+                        post_id=post_id,
+                        author_id=self.rng.choice(users),
+                        text=self.text(3, 20),
+                        created=pub_date + delay * self.rng.random(),
+                    ))
+                    comment_id += 1
+                self.posts_count[author_id] += 1
+                post_id += 1
+            with transaction.atomic():
+                Post.objects.bulk_create(posts)
+                Comment.objects.bulk_create(comments)
+            done += len(posts)
+            self.log(f'посты: {done}')
+            yield tasks
+
+    def generate_stats(self):
+        for user_id in self.user_ids:
+            yield UserStats(
+                user_id=user_id,
+                posts_count=self.posts_count[user_id],
+                followers_count=self.followers_count[user_id],
+                following_count=self.following_count[user_id],
+            )
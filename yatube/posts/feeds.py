@@ -0,0 +1,190 @@
+"""
+RSS и Atom ленты: общая, группы и автора.
+
+Документ отдаётся потоком: заголовок, записи, закрывающие теги. XML
+каждой записи кешируется по id поста и времени его изменения, список
+записей ленты — по поколениям её областей. Поэтому опрос ленты без
+изменений отвечает 304, не обращаясь к базе.
+"""
+import hashlib
+import io
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed
+from django.utils.http import quote_etag
+from django.utils.xmlutils import SimplerXMLGenerator
+
+from .cache import (GLOBAL_SCOPE, GROUPS_SCOPE, author_scope, group_scope,
+                    scope_version)
+from .models import Group, Post, User
+
+FEED_ROWS_KEY = 'posts:feed:rows:{digest}'
+FEED_ENTRY_KEY = 'posts:feed:entry:{digest}'
+
+
+class StreamingFeedMixin:
+    """Лента, которую можно записать по частям."""
+
+    def latest_post_date(self):
+        return self.feed.get('updated') or super().latest_post_date()
+
+    def split(self):
+        """Документ без записей, разрезанный на начало и конец."""
+        buffer = io.StringIO()
+        self.write(buffer, 'utf-8')
+        document = buffer.getvalue()
+        return document[:-len(self.closing)], self.closing
+
+    def render_item(self, item):
+        buffer = io.StringIO()
+        handler = SimplerXMLGenerator(buffer, 'utf-8')
+        handler.startElement(self.item_element, self.item_attributes(item))
+        self.add_item_elements(handler, item)
+        handler.endElement(self.item_element)
+        return buffer.getvalue()
+
+
+class RssFeed(StreamingFeedMixin, Rss201rev2Feed):
+    item_element = 'item'
+    closing = '</channel></rss>'
+
+
+class AtomFeed(StreamingFeedMixin, Atom1Feed):
+    item_element = 'entry'
+    closing = '</feed>'
+
+
+FEED_CLASSES = {'rss': RssFeed, 'atom': AtomFeed}
+
+
+def digest(*parts):
+    return hashlib.md5('|'.join(map(str, parts)).encode()).hexdigest()
+
+
+def feed_rows(request, version, post_list):
+    """(id, updated) последних постов ленты, закешированные по версии."""
+    key = FEED_ROWS_KEY.format(digest=digest(request.path, version))
+    rows = cache.get(key)
+    if rows is None:
+        rows = list(post_list.values_list('id', 'updated')[
+            :settings.FEED_ENTRIES
+        ])
+        cache.set(key, rows, settings.LISTING_CACHE_TIMEOUT)
+    return rows
+
+
+def entry_keys(request, kind, rows, groups_version):
+    return {
+        post_id: FEED_ENTRY_KEY.format(digest=digest(
+            kind, request.get_host(), post_id, updated.timestamp(),
+            groups_version
+        ))
+        for post_id, updated in rows
+    }
+
+
+def render_entries(request, feed, post_ids):
+    posts = Post.objects.select_related('author', 'group').in_bulk(post_ids)
+    entries = {}
+    for post_id, post in posts.items():
+        link = request.build_absolute_uri(
+            reverse('posts:post_detail', args=[post_id])
+        )
+        feed.add_item(
+            title=post.text[:50],
+            link=link,
+            description=post.text,
+            author_name=post.author.get_full_name() or post.author.username,
+            pubdate=post.pub_date,
+            updateddate=post.updated,
+            unique_id=link,
+            categories=[post.group.title] if post.group else (),
+        )
+        entries[post_id] = feed.render_item(feed.items.pop())
+    return entries
+
+
+def stream(request, feed, rows, keys):
+    """Заголовок, записи из кеша (недостающие рендерятся) и конец."""
+    header, closing = feed.split()
+    yield header
+    cached = cache.get_many(list(keys.values()))
+    missing = [
+        post_id for post_id, _ in rows if keys[post_id] not in cached
+    ]
+    rendered = render_entries(request, feed, missing) if missing else {}
+    if rendered:
+        cache.set_many(
+            {keys[post_id]: xml for post_id, xml in rendered.items()},
+            settings.LISTING_CACHE_TIMEOUT
+        )
+    for post_id, _ in rows:
+        xml = cached.get(keys[post_id]) or rendered.get(post_id)
+        if xml:
+            yield xml
+    yield closing
+
+
+def feed_response(request, kind, scopes, post_list, title, link,
+                  description):
+    feed_class = FEED_CLASSES.get(kind)
+    if feed_class is None:
+        raise Http404('Неизвестный формат ленты')
+    version = scope_version(scopes + [GROUPS_SCOPE])
+    rows = feed_rows(request, version, post_list)
+    updated = max((updated for _, updated in rows), default=None)
+    etag = quote_etag(f'{kind}-{version}')
+    # Last-Modified не отдаётся: после удаления последнего поста дата
+    # ленты уходит назад, и If-Modified-Since давал бы ложный 304.
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+    feed = feed_class(
+        title=title,
+        link=request.build_absolute_uri(link),
+        description=description,
+        feed_url=request.build_absolute_uri(),
+        language='ru',
+        updated=updated,
+    )
+    # Последнее поколение в версии — поколение групп (названия рубрик).
+    keys = entry_keys(request, kind, rows, version.rsplit('.', 1)[-1])
+    response = StreamingHttpResponse(
+        stream(request, feed, rows, keys), content_type=feed.content_type
+    )
+    response['ETag'] = etag
+    return response
+
+
+def index_feed(request, kind):
+    return feed_response(
+        request, kind, [GLOBAL_SCOPE], Post.objects.all(),
+        title='Yatube: последние записи',
+        link=reverse('posts:index'),
+        description='Последние записи всех авторов',
+    )
+
+
+def group_feed(request, slug, kind):
+    group = get_object_or_404(Group, slug=slug)
+    return feed_response(
+        request, kind, [group_scope(group.id)], group.posts.all(),
+        title=f'Yatube: {group.title}',
+        link=reverse('posts:group_list', args=[slug]),
+        description=group.description,
+    )
+
+
+def profile_feed(request, username, kind):
+    author = get_object_or_404(User, username=username)
+    return feed_response(
+        request, kind, [author_scope(author.id)], author.posts.all(),
+        title=f'Yatube: {author.get_full_name() or author.username}',
+        link=reverse('posts:profile', args=[username]),
+        description=f'Записи пользователя {author.username}',
+    )
@@ -1,4 +1,8 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
+from PIL import Image
+
+from .images import ingest
 from .models import Post, Comment
 
 
@@ -15,6 +19,19 @@ class PostForm(forms.ModelForm):
             'group': ('Group to which this post will belong ')
         }
 
+    def clean_image(self):
+        """Новая картинка уменьшается и сохраняется без метаданных."""
+        image = self.cleaned_data.get('image')
+        if not isinstance(image, UploadedFile):
+            return image
+        try:
+            return ingest(image)
+        except (OSError, Image.DecompressionBombError):
+            raise forms.ValidationError(
+                self.fields['image'].error_messages['invalid_image'],
+                code='invalid_image'
+            )
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,78 @@
+"""
+Приём картинок постов.
+
+Раньше оригинал загрузки сохранялся как есть, и sorl декодировал его
+целиком для каждой недостающей миниатюры. Теперь PostForm сразу
+уменьшает картинку до IMAGE_MAX_SIZE по большей стороне и сохраняет
+перекодированную копию без EXIF и прочих метаданных.
+
+Память ограничена на каждом шаге:
+- загрузки больше FILE_UPLOAD_MAX_MEMORY_SIZE Django пишет во
+  временный файл, и Pillow читает их оттуда;
+- Image.thumbnail() у JPEG включает draft(): декодер сам уменьшает
+  картинку в 2-8 раз, и полноразмерный растр не создаётся;
+- у остальных форматов после декодирования работает reduce(), а уже
+  потом точная интерполяция;
+- результат пишется в SpooledTemporaryFile.
+
+Анимированные картинки сохраняются как есть: перекодирование
+потеряло бы кадры.
+"""
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+from PIL import Image, ImageOps
+
+# Форматы, которые перекодируются; прочие (GIF) сохраняются как есть.
+REENCODED_FORMATS = {'JPEG', 'MPO', 'PNG', 'WEBP', 'BMP', 'TIFF'}
+# Декодер JPEG уменьшает картинку в 2, 4 или 8 раз, пока она не
+# меньше итогового размера; дальше работает точная интерполяция.
+REDUCING_GAP = 1.0
+
+
+def has_alpha(image):
+    return image.mode in ('RGBA', 'LA', 'PA') or (
+        image.mode == 'P' and 'transparency' in image.info
+    )
+
+
+def ingest(upload):
+    """
+    Уменьшенная и перекодированная копия загрузки или сама загрузка,
+    если её формат не перекодируется. Ошибки Pillow не перехватывает.
+    """
+    upload.seek(0)
+    image = Image.open(upload)
+    if image.format not in REENCODED_FORMATS or getattr(
+        image, 'is_animated', False
+    ):
+        upload.seek(0)
+        return upload
+    # ICC-профиль — не метаданные, а цвета: без него снимки с широким
+    # охватом выцветают.
+    icc_profile = image.info.get('icc_profile')
+    limit = settings.IMAGE_MAX_SIZE
+    image.thumbnail((limit, limit), Image.LANCZOS, REDUCING_GAP)
+    image = ImageOps.exif_transpose(image)
+    stem = os.path.splitext(os.path.basename(upload.name))[0]
+    output = tempfile.SpooledTemporaryFile(
+        max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+    )
+    if has_alpha(image):
+        name = f'{stem}.png'
+        image.save(output, 'PNG', optimize=True, icc_profile=icc_profile)
+    else:
+        name = f'{stem}.jpg'
+        if image.mode not in ('RGB', 'L'):
+            if image.mode == 'CMYK':
+                # Профиль CMYK к RGB не подходит.
+                icc_profile = None
+            image = image.convert('RGB')
+        image.save(
+            output, 'JPEG', quality=settings.IMAGE_QUALITY, optimize=True,
+            progressive=True, icc_profile=icc_profile
+        )
+    output.seek(0)
+    return File(output, name=name)
@@ -0,0 +1,86 @@
+import multiprocessing
+import os
+import resource
+import statistics
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from posts.images import ingest
+
+
+def resident():
+    """Текущий RSS процесса, байты."""
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * resource.getpagesize()
+
+
+def full_decode(upload):
+    """Прежний путь: sorl декодирует оригинал целиком и уменьшает."""
+    image = Image.open(upload)
+    image.load()
+    limit = settings.IMAGE_MAX_SIZE
+    image.resize((limit, limit * image.height // image.width), Image.LANCZOS)
+
+
+METHODS = {'full': full_decode, 'ingest': ingest}
+
+
+def measure(task):
+    """Выполняется в отдельном процессе: время и прирост пика RSS."""
+    method, path = task
+    baseline = resident()
+    started = time.perf_counter()
+    with open(path, 'rb') as source:
+        METHODS[method](File(source, name=os.path.basename(path)))
+    duration = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return duration, max(peak - baseline, 0)
+
+
+def photo(path, width, height, quality):
+    """Снимок с градиентом и шумом, похожий на фото с телефона."""
+    gradient = Image.linear_gradient('L').resize((width, height))
+    noise = Image.effect_noise((width, height), 40)
+    image = Image.merge('RGB', (gradient, noise, gradient.rotate(180)))
+    image.save(path, 'JPEG', quality=quality)
+
+
+class Command(BaseCommand):
+    help = (
+        'Меряет время и пик памяти приёма картинки: полное '
+        'декодирование против ingest() с draft/reduce'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--width', type=int, default=4032)
+        parser.add_argument('--height', type=int, default=3024)
+        parser.add_argument('--quality', type=int, default=95)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'photo.jpg')
+            photo(path, options['width'], options['height'],
+                  options['quality'])
+            self.stdout.write(
+                f'Снимок {options["width"]}x{options["height"]}, '
+                f'{os.path.getsize(path) / 2 ** 20:.1f} МБ'
+            )
+            # Каждый замер — в новом процессе, чтобы пик RSS был его.
+            with multiprocessing.Pool(1, maxtasksperchild=1) as pool:
+                for method in METHODS:
+                    results = [
+                        pool.apply(measure, [(method, path)])
+                        for _ in range(options['repeat'])
+                    ]
+                    durations, peaks = zip(*results)
+                    self.stdout.write(
+                        f'{method:>6}: '
+                        f'{statistics.median(durations) * 1000:.0f} мс, '
+                        f'пик памяти +{max(peaks) / 2 ** 20:.1f} МБ'
+                    )
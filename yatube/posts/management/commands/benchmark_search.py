@@ -0,0 +1,127 @@
+import random
+import sqlite3
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from faker import Faker
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает поиск через LIKE и через FTS5 на сгенерированном '
+        'корпусе во временной базе в памяти'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--comments', type=int, default=2,
+                            help='Комментариев на пост')
+        parser.add_argument('--queries', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        Faker.seed(options['seed'])
+        vocabulary = list(dict.fromkeys(
+            Faker('ru_RU').words(nb=20000, unique=False)
+        ))
+        # Частоты слов по закону Ципфа, как в живых текстах.
+        weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+        connection = sqlite3.connect(':memory:')
+        started = time.perf_counter()
+        self.generate(connection, rng, vocabulary, weights, options)
+        self.stdout.write(
+            f'Корпус: {options["posts"]} постов, '
+            f'{options["posts"] * options["comments"]} комментариев, '
+            f'{time.perf_counter() - started:.1f} с'
+        )
+        started = time.perf_counter()
+        connection.execute(search.CREATE_TABLE)
+        connection.execute(
+            f'INSERT INTO {search.TABLE} (rowid, text, comments) '
+            f'{search.DOCUMENTS}'
+        )
+        self.stdout.write(
+            f'Построение индекса: {time.perf_counter() - started:.1f} с'
+        )
+        # Половина запросов — частые слова, половина — редкие.
+        half = options['queries'] // 2
+        queries = [rng.choice(vocabulary[:50]) for _ in range(half)] + [
+            rng.choice(vocabulary[len(vocabulary) // 2:])
+            for _ in range(options['queries'] - half)
+        ]
+        for name, method in (('like', self.like), ('fts5', self.fts)):
+            timings = []
+            for query in queries:
+                started = time.perf_counter()
+                method(connection, query)
+                timings.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(
+                f'{name:>5}: медиана {statistics.median(timings):.2f} мс, '
+                f'максимум {max(timings):.2f} мс'
+            )
+
+    def generate(self, connection, rng, vocabulary, weights, options):
+        connection.execute(
+            'CREATE TABLE posts_post (id INTEGER PRIMARY KEY, text TEXT)'
+        )
+        connection.execute(
+            'CREATE TABLE posts_comment (post_id INTEGER, text TEXT)'
+        )
+        connection.execute(
+            'CREATE INDEX posts_comment_post ON posts_comment (post_id)'
+        )
+
+        def text(words):
+            return ' '.join(rng.choices(vocabulary, weights, k=words))
+
+        for post_id in range(1, options['posts'] + 1):
+            connection.execute(
+                'INSERT INTO posts_post VALUES (?, ?)',
+                (post_id, text(rng.randint(20, 120)))
+            )
+            connection.executemany(
+                'INSERT INTO posts_comment VALUES (?, ?)',
+                [
+                    (post_id, text(rng.randint(5, 30)))
+                    for _ in range(options['comments'])
+                ]
+            )
+
+    def like(self, connection, query):
+        """Страница и количество через LIKE по постам и комментариям."""
+        pattern = f'%{query}%'
+        where = (
+            'WHERE p.text LIKE ? OR EXISTS (SELECT 1 FROM posts_comment c '
+            'WHERE c.post_id = p.id AND c.text LIKE ?)'
+        )
+        connection.execute(
+            f'SELECT p.id FROM posts_post p {where} '
+            f'ORDER BY p.id DESC LIMIT ?',
+            (pattern, pattern, settings.POSTS_PER_PAGE)
+        ).fetchall()
+        connection.execute(
+            f'SELECT COUNT(*) FROM posts_post p {where}', (pattern, pattern)
+        ).fetchone()
+
+    def fts(self, connection, query):
+        """Страница по рангу bm25 и количество, как в SearchResults."""
+        match = search.build_query(query)
+        connection.execute(
+            f'SELECT rowid FROM {search.TABLE} '
+            f'WHERE {search.TABLE} MATCH ? '
+            f'ORDER BY bm25({search.TABLE}, ?, ?) LIMIT ?',
+            (
+                match, search.TEXT_WEIGHT, search.COMMENTS_WEIGHT,
+                settings.POSTS_PER_PAGE,
+            )
+        ).fetchall()
+        connection.execute(
+            f'SELECT COUNT(*) FROM {search.TABLE} '
+            f'WHERE {search.TABLE} MATCH ?',
+            (match,)
+        ).fetchone()
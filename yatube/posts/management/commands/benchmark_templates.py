@@ -0,0 +1,181 @@
+import copy
+import statistics
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from core import slowlog, template_profiling
+from core.template_backends import prewarm
+from posts.models import Group, Post, User
+
+CACHED_LOADER = 'django.template.loaders.cached.Loader'
+# Отдельный кеш, чтобы замеры не трогали и не читали кеш сайта.
+LOCAL_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+}
+NO_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+}
+
+
+def templates_setting(cached):
+    """TEMPLATES с кеширующим загрузчиком или без него."""
+    templates = copy.deepcopy(settings.TEMPLATES)
+    templates[0]['OPTIONS']['loaders'] = (
+        [(CACHED_LOADER, settings.TEMPLATE_LOADERS)] if cached
+        else settings.TEMPLATE_LOADERS
+    )
+    return templates
+
+
+class Command(BaseCommand):
+    help = (
+        'Меряет время ответа и рендера шаблонов по типам страниц '
+        'под вошедшим пользователем'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            help='Пользователь (по умолчанию тот, у кого больше подписок)'
+        )
+        parser.add_argument('--repeat', type=int, default=30)
+        parser.add_argument(
+            '--loaders', choices=('current', 'plain', 'cached', 'both'),
+            default='current',
+            help='Загрузчики шаблонов: из настроек, без кеша, с кешем '
+                 'или сравнить оба'
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Без кеша фрагментов: каждый ответ рендерится целиком'
+        )
+        parser.add_argument(
+            '--profile', action='store_true',
+            help='Самые долгие шаблоны и теги по каждой странице '
+                 '(профилирование само замедляет рендер)'
+        )
+        parser.add_argument('--limit', type=int, default=10)
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user'])
+        pages = self.get_pages()
+        if options['loaders'] == 'current':
+            variants = [(None, None)]
+        elif options['loaders'] == 'both':
+            variants = [('plain', False), ('cached', True)]
+        else:
+            variants = [(options['loaders'], options['loaders'] == 'cached')]
+        for name, cached in variants:
+            with ExitStack() as stack:
+                stack.enter_context(override_settings(
+                    CACHES=NO_CACHE if options['cold'] else LOCAL_CACHE,
+                    SLOW_LOG_SAMPLE_RATE=0,
+                ))
+                if name is not None:
+                    stack.enter_context(override_settings(
+                        TEMPLATES=templates_setting(cached)
+                    ))
+                    self.stdout.write(f'Загрузчики: {name}')
+                if cached or (
+                    name is None and settings.TEMPLATE_PRODUCTION_MODE
+                ):
+                    started = time.perf_counter()
+                    compiled = prewarm()
+                    self.stdout.write(
+                        f'Прогрев: {compiled} шаблонов, '
+                        f'{(time.perf_counter() - started) * 1000:.0f} мс'
+                    )
+                client = Client()
+                client.force_login(user)
+                try:
+                    for page, url in pages:
+                        self.measure(client, page, url, options)
+                finally:
+                    client.logout()
+
+    def get_user(self, username):
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f'Пользователь {username} не найден')
+        user = User.objects.annotate(
+            follows=Count('follower')
+        ).order_by('-follows').first()
+        if user is None:
+            raise CommandError('В базе нет пользователей')
+        return user
+
+    def get_pages(self):
+        post = Post.objects.select_related('author').order_by('-id').first()
+        if post is None:
+            raise CommandError('В базе нет постов')
+        pages = [
+            ('index', reverse('posts:index')),
+            ('profile', reverse(
+                'posts:profile', args=[post.author.username]
+            )),
+            ('post_detail', reverse('posts:post_detail', args=[post.id])),
+            ('follow', reverse('posts:follow_index')),
+            ('search', reverse('posts:search') + '?q=' + (
+                post.text.split() or ['']
+            )[0]),
+        ]
+        group = Group.objects.filter(posts__isnull=False).first()
+        if group is not None:
+            pages.insert(1, (
+                'group_list', reverse('posts:group_list', args=[group.slug])
+            ))
+        return pages
+
+    def measure(self, client, page, url, options):
+        # Первый ответ прогревает кеши и в замер не входит.
+        client.get(url)
+        totals = []
+        renders = []
+        with ExitStack() as stack:
+            profile = None
+            if options['profile']:
+                profile = stack.enter_context(
+                    template_profiling.profiling()
+                )
+            for _ in range(options['repeat']):
+                trace = slowlog.Trace()
+                token = slowlog.current.set(trace)
+                started = time.perf_counter()
+                try:
+                    client.get(url)
+                finally:
+                    slowlog.current.reset(token)
+                totals.append((time.perf_counter() - started) * 1000)
+                renders.append(
+                    sum(duration for _, duration in trace.templates) * 1000
+                )
+        total = statistics.median(totals)
+        render = statistics.median(renders)
+        self.stdout.write(
+            f'{page:>12}: ответ {total:.2f} мс, рендер {render:.2f} мс '
+            f'({render / total:.0%})'
+        )
+        if profile is not None:
+            self.write_profile(profile, options)
+
+    def write_profile(self, profile, options):
+        summary = profile.summary(options['limit'])
+        for row in summary['templates']:
+            self.stdout.write(
+                f'{"":>14}{row["name"]}: {row["count"]} раз, '
+                f'своё {row["own"] * 1000:.2f} мс, '
+                f'всего {row["total"] * 1000:.2f} мс'
+            )
+        for row in summary['tags']:
+            self.stdout.write(
+                f'{"":>14}{row["template"]} {{% {row["tag"]} %}}: '
+                f'{row["count"]} раз, {row["total"] * 1000:.2f} мс'
+            )
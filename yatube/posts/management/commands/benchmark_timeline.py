@@ -0,0 +1,73 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from posts.models import Post, User
+from posts.paginators import KeysetPaginator
+from posts.timeline import timeline_feed
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает выборку страницы ленты подписок через JOIN по Follow '
+        'и через материализованную ленту'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            help='Читатель ленты (по умолчанию тот, у кого больше подписок)'
+        )
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument(
+            '--pages', type=int, default=1,
+            help='Сколько страниц пролистывать курсором за один прогон'
+        )
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user'])
+        feeds = {
+            'join': (Post.objects.filter(author__following__user=user), None),
+            'timeline': timeline_feed(user),
+        }
+        self.stdout.write(
+            f'Читатель: {user.username}, подписок: {user.follower.count()}'
+        )
+        for name, (post_list, key) in feeds.items():
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                self.walk(post_list, key, options['pages'])
+                timings.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(
+                f'{name:>8}: медиана {statistics.median(timings):.2f} мс, '
+                f'максимум {max(timings):.2f} мс'
+            )
+
+    def get_user(self, username):
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f'Пользователь {username} не найден')
+        user = User.objects.annotate(
+            follows=Count('follower')
+        ).order_by('-follows').first()
+        if user is None:
+            raise CommandError('В базе нет пользователей')
+        return user
+
+    def walk(self, post_list, key, pages):
+        paginator = KeysetPaginator(
+            post_list.select_related('author', 'group'),
+            settings.POSTS_PER_PAGE,
+            key=key
+        )
+        page = paginator.cursor_page()
+        for _ in range(pages - 1):
+            if not page.has_next():
+                break
+            page = paginator.cursor_page(after=page.next_cursor)
@@ -0,0 +1,43 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает пользователей, группы, посты, комментарии и подписки '
+        'в каталог: по файлу JSONL или CSV на таблицу'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help='Каталог для файлов выгрузки')
+        parser.add_argument(
+            '--format', choices=transfer.FORMATS, default='jsonl'
+        )
+        parser.add_argument(
+            '--tables', nargs='+', choices=list(transfer.TABLES),
+            help='Какие таблицы выгрузить (по умолчанию все)'
+        )
+
+    def handle(self, *args, **options):
+        directory = options['directory']
+        os.makedirs(directory, exist_ok=True)
+        if not os.path.isdir(directory):
+            raise CommandError(f'{directory} не каталог')
+        for name, table in transfer.TABLES.items():
+            if options['tables'] and name not in options['tables']:
+                continue
+            started = time.perf_counter()
+            count = transfer.export_table(
+                table,
+                transfer.table_path(directory, name, options['format']),
+                options['format']
+            )
+            self.stdout.write(
+                f'{name}: {count} строк, '
+                f'{time.perf_counter() - started:.1f} с'
+            )
+        self.stdout.write(self.style.SUCCESS(f'Выгрузка в {directory} готова'))
@@ -0,0 +1,75 @@
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import search
+from posts.dataset import Generator
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерирует синтетический набор данных: пользователей, группы, '
+        'подписки со степенным распределением, посты, комментарии и '
+        'картинки'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--comments', type=float, default=2,
+                            help='Среднее число комментариев на пост')
+        parser.add_argument('--follows', type=float, default=20,
+                            help='Среднее число подписок пользователя')
+        parser.add_argument('--images', type=float, default=0.1,
+                            help='Доля постов с картинкой')
+        parser.add_argument('--alpha', type=float, default=1.0,
+                            help='Показатель степенного закона популярности')
+        parser.add_argument('--days', type=int, default=365,
+                            help='За сколько последних дней публикуются посты')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Процессов для картинок (0 — без пула)')
+        parser.add_argument('--password',
+                            help='Общий пароль пользователей для входа')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--skip-rebuild', action='store_true',
+            help='Не перестраивать ленты подписок и поисковый индекс'
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        generator = Generator(
+            users=options['users'],
+            groups=options['groups'],
+            posts=options['posts'],
+            comments=options['comments'],
+            follows=options['follows'],
+            images=options['images'],
+            alpha=options['alpha'],
+            days=options['days'],
+            seed=options['seed'],
+            workers=options['workers'],
+            password=options['password'],
+            log=self.stdout.write if options['verbosity'] > 1 else None,
+        )
+        generator.run()
+        self.stdout.write(
+            f'Данные: {time.perf_counter() - started:.1f} с'
+        )
+        if not options['skip_rebuild']:
+            started = time.perf_counter()
+            entries = generator.materialize_timelines()
+            with transaction.atomic():
+                search.rebuild()
+            self.stdout.write(
+                f'Ленты ({entries} записей) и индекс: '
+                f'{time.perf_counter() - started:.1f} с'
+            )
+        cache.clear()
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано: {options["users"]} пользователей, '
+            f'{options["posts"]} постов'
+        ))
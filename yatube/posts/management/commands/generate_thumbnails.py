@@ -0,0 +1,71 @@
+import multiprocessing
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import thumbnails
+from posts.models import Post
+
+
+def generate(task):
+    """
+    Выполняется в процессе пула: создаёт варианты и возвращает размер
+    с описаниями, а ошибку — текстом. В базу пишет основной процесс.
+    """
+    name, force = task
+    try:
+        return name, thumbnails.generate(name, force=force), None
+    except Exception as error:
+        return name, None, f'{type(error).__name__}: {error}'
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт варианты IMAGE_RENDITIONS для уже загруженных картинок '
+        'постов в пуле процессов и записывает в посты размеры картинок '
+        'и описания вариантов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='Процессов (0 — без пула)')
+        parser.add_argument('--force', action='store_true',
+                            help='Пересоздать существующие варианты')
+        parser.add_argument('--missing', action='store_true',
+                            help='Только картинки без записанных вариантов')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        posts = Post.objects.exclude(image='')
+        if options['missing']:
+            posts = posts.filter(image_renditions='')
+        names = posts.order_by().values_list('image', flat=True).distinct()
+        tasks = [(name, options['force']) for name in names]
+        if not options['workers']:
+            self.report(map(generate, tasks), started, options)
+            return
+        # Процессы пула открывают свои соединения с базой.
+        connections.close_all()
+        with multiprocessing.Pool(options['workers']) as pool:
+            self.report(
+                pool.imap_unordered(generate, tasks, chunksize=8),
+                started, options
+            )
+
+    def report(self, results, started, options):
+        done = failed = 0
+        for name, result, error in results:
+            if error is None:
+                thumbnails.store(name, *result)
+                done += 1
+            else:
+                failed += 1
+                self.stderr.write(f'{name}: {error}')
+            if options['verbosity'] > 1 and (done + failed) % 100 == 0:
+                self.stdout.write(f'картинок: {done + failed}')
+        self.stdout.write(
+            f'Картинок: {done}, с ошибками: {failed}, '
+            f'{time.perf_counter() - started:.1f} с'
+        )
@@ -0,0 +1,61 @@
+import os
+import time
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает выгрузку export_content пачками через bulk_create. '
+        'Прерванную загрузку можно продолжить с --resume'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help='Каталог с файлами выгрузки')
+        parser.add_argument(
+            '--tables', nargs='+', choices=list(transfer.TABLES),
+            help='Какие таблицы загрузить (по умолчанию все найденные)'
+        )
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Продолжить с последней контрольной точки'
+        )
+        parser.add_argument(
+            '--skip-rebuild', action='store_true',
+            help='Не пересчитывать счётчики, ленты и поисковый индекс'
+        )
+
+    def handle(self, *args, **options):
+        directory = options['directory']
+        if not os.path.isdir(directory):
+            raise CommandError(f'Каталог {directory} не найден')
+        loader = transfer.Loader(
+            directory,
+            resume=options['resume'],
+            log=self.stdout.write if options['verbosity'] > 1 else None,
+        )
+        started = time.perf_counter()
+        try:
+            result = loader.load(options['tables'])
+        except transfer.IdConflict as error:
+            raise CommandError(error)
+        for name, (rows, skipped) in result.items():
+            self.stdout.write(
+                f'{name}: {rows} строк, пропущено без ссылок {skipped}'
+            )
+        self.stdout.write(
+            f'Загрузка: {time.perf_counter() - started:.1f} с'
+        )
+        # bulk_create не вызывает сигналы: производные данные
+        # пересчитываются целиком.
+        if not options['skip_rebuild']:
+            for command in (
+                'reconcile_counters', 'rebuild_timeline', 'rebuild_search'
+            ):
+                call_command(command, stdout=self.stdout)
+        cache.clear()
+        self.stdout.write(self.style.SUCCESS('Загрузка завершена'))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import timeline
+from posts.models import TimelineEntry, User
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает материализованные ленты подписок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames', nargs='*',
+            help='Пользователи, чьи ленты нужно перестроить (по умолчанию все)'
+        )
+
+    def handle(self, *args, **options):
+        users = None
+        if options['usernames']:
+            users = User.objects.filter(username__in=options['usernames'])
+        with transaction.atomic():
+            timeline.rebuild(users)
+        entries = TimelineEntry.objects.all()
+        if users is not None:
+            entries = entries.filter(user__in=users)
+        self.stdout.write(self.style.SUCCESS(
+            f'Лента перестроена: {entries.count()} записей'
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счётчики и исправляет расхождения'
+
+    def handle(self, *args, **options):
+        posts = counters.reconcile_posts()
+        users = counters.reconcile_users()
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено счётчиков: постов {posts}, пользователей {users}'
+        ))
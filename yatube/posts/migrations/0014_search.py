@@ -0,0 +1,38 @@
+from django.db import migrations
+
+CREATE_TABLE = (
+    'CREATE VIRTUAL TABLE IF NOT EXISTS posts_search USING fts5('
+    "text, comments, tokenize='unicode61 remove_diacritics 2', "
+    "prefix='2 3')"
+)
+FILL_TABLE = (
+    'INSERT INTO posts_search (rowid, text, comments) '
+    'SELECT p.id, p.text, COALESCE(('
+    "SELECT group_concat(c.text, ' ') FROM posts_comment c "
+    "WHERE c.post_id = p.id), '') FROM posts_post p"
+)
+
+
+def create_index(apps, schema_editor):
+    # FTS5 есть только в SQLite, на других СУБД поиск идёт через LIKE.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(CREATE_TABLE)
+    schema_editor.execute(FILL_TABLE)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS posts_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_post_updated'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
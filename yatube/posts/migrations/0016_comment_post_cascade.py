@@ -0,0 +1,19 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:44
+
+from django.db import migrations, models
+import posts.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_post_image_dimensions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='comment',
+            name='post',
+            field=models.ForeignKey(on_delete=posts.models.cascade_from_post, related_name='comments', to='posts.Post'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_comment_post_cascade'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userstats',
+            name='pull_timeline',
+            field=models.BooleanField(default=False, verbose_name='Лента подписчиков читается при чтении'),
+        ),
+    ]
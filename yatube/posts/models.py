@@ -1,10 +1,24 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
 
 
 User = get_user_model()
 
 
+class AtomicSaveModel(models.Model):
+    """
+    Модель, которая сохраняется в одной транзакции с обработчиками
+    post_save, чтобы счётчики не расходились с данными.
+    """
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    class Meta:
+        abstract = True
+
+
 class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
@@ -14,7 +28,7 @@ class Group(models.Model):
         return self.title
 
 
-class Post(models.Model):
+class Post(AtomicSaveModel):
     text = models.TextField(
         'Текст поста',
         help_text='Введите текст поста'
@@ -22,6 +36,9 @@ class Post(models.Model):
     pub_date = models.DateTimeField(
         'Дата публикации',
         auto_now_add=True)
+    updated = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True)
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -42,18 +59,71 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    # Размеры и варианты картинки хранятся в строке, чтобы страницы не
+    # открывали файлы; заполняются при загрузке и в posts.thumbnails.
+    # width_field ImageField здесь не годится: пока размеры не
+    # заполнены, он читает файл при каждой загрузке модели из базы.
+    image_width = models.PositiveIntegerField(
+        'Ширина картинки',
+        blank=True,
+        null=True,
+        editable=False
+    )
+    image_height = models.PositiveIntegerField(
+        'Высота картинки',
+        blank=True,
+        null=True,
+        editable=False
+    )
+    image_renditions = models.TextField(
+        'Варианты картинки',
+        blank=True,
+        editable=False,
+        help_text='JSON: описания вариантов по видам IMAGE_RENDITIONS'
+    )
+    comments_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+        editable=False
+    )
 
     def __str__(self):
         return self.text[:15]
 
     class Meta:
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-id']
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'], name='post_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_date_idx'
+            ),
+            # posts.thumbnails записывает варианты во все посты картинки.
+            models.Index(fields=['image'], name='post_image_idx'),
+        ]
 
 
-class Comment(models.Model):
+def cascade_from_post(collector, field, sub_objs, using):
+    """
+    CASCADE, который помечает комментарии удаляемого поста: их
+    обработчик post_delete не ведёт учёт по каждому комментарию,
+    это делает удаление самого поста.
+    """
+    for comment in sub_objs:
+        comment._post_deleted = True
+    models.CASCADE(collector, field, sub_objs, using)
+
+
+class Comment(AtomicSaveModel):
     post = models.ForeignKey(
         Post,
-        on_delete=models.CASCADE,
+        on_delete=cascade_from_post,
         related_name='comments',
     )
     author = models.ForeignKey(
@@ -70,8 +140,17 @@ class Comment(models.Model):
         'Дата публикации',
         auto_now_add=True)
 
+    class Meta:
+        ordering = ['created', 'id']
+        indexes = [
+            models.Index(
+                fields=['post', 'created', 'id'],
+                name='comment_post_created_idx'
+            ),
+        ]
+
 
-class Follow(models.Model):
+class Follow(AtomicSaveModel):
     user = author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -91,3 +170,61 @@ class Follow(models.Model):
                 fields=['user', 'author'], name='unique_follow'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'], name='follow_author_user_idx'
+            ),
+        ]
+
+
+class UserStats(models.Model):
+    """Счётчики пользователя, поддерживаемые при записи."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь'
+    )
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+    # Автор был популярен и опустился ниже порога: его посты всё ещё
+    # дотягиваются при чтении, пока rebuild_timeline не разложит их.
+    pull_timeline = models.BooleanField(
+        'Лента подписчиков читается при чтении',
+        default=False
+    )
+
+    def __str__(self):
+        return f'Счётчики {self.user_id}'
+
+
+class TimelineEntry(models.Model):
+    """Пост в материализованной ленте подписок пользователя."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост'
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique_timeline_entry'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_date_idx'
+            )
+        ]
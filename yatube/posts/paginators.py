@@ -0,0 +1,335 @@
+import base64
+import binascii
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db import connections, router
+from django.db.models import BigIntegerField, Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+from .cache import count_key
+
+
+def encode_cursor(post):
+    """Упаковывает ключ (pub_date, id) поста в непрозрачный токен."""
+    raw = f'{post.pub_date.isoformat()}|{post.pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def in_pk_range(pk):
+    """Помещается ли целое в столбец первичного ключа."""
+    return -BigIntegerField.MAX_BIGINT - 1 <= pk <= BigIntegerField.MAX_BIGINT
+
+
+def decode_cursor(token):
+    """Возвращает (pub_date, id) из токена или None, если токен испорчен."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        pub_date, pk = raw.decode().split('|')
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    # Ключ вне знакового 64-битного диапазона не передать в запрос.
+    if pub_date is None or not in_pk_range(pk):
+        return None
+    return pub_date, pk
+
+
+def estimated_count(model):
+    """
+    Быстрая оценка числа строк таблицы без COUNT(*) или None, если
+    для этой СУБД оценка не поддерживается.
+    """
+    connection = connections[router.db_for_read(model)]
+    table = connection.ops.quote_name(model._meta.db_table)
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'SELECT MAX(_rowid_) FROM {table}')
+        elif connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+                [model._meta.db_table]
+            )
+        else:
+            return None
+        row = cursor.fetchone()
+    return row[0] if row and row[0] is not None else 0
+
+
+def bounded_count(queryset, limit):
+    """COUNT(*), который останавливается на limit строках."""
+    return queryset.order_by()[:limit].count()
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор для админки на больших таблицах: без фильтров количество
+    берётся из оценки, с фильтрами считается не дальше
+    ADMIN_COUNT_LIMIT строк.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.has_filters():
+            estimate = estimated_count(queryset.model)
+            if (estimate or 0) >= settings.PAGINATOR_APPROXIMATE_COUNT:
+                return estimate
+        return bounded_count(queryset, settings.ADMIN_COUNT_LIMIT)
+
+
+class PageRows:
+    """
+    Строки страницы и одна строка сверх неё, по которой видно, есть ли
+    следующая. Читаются одним запросом при первом обращении: если
+    фрагмент шаблона со списком взят из кеша, запроса к ленте нет.
+    """
+
+    def __init__(self, queryset, per_page, reverse=False):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.reverse = reverse
+
+    @cached_property
+    def fetched(self):
+        return list(self.queryset[:self.per_page + 1])
+
+    @cached_property
+    def rows(self):
+        rows = self.fetched[:self.per_page]
+        return rows[::-1] if self.reverse else rows
+
+    def has_more(self):
+        return len(self.fetched) > self.per_page
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __getitem__(self, index):
+        return self.rows[index]
+
+
+class KeysetPage(Page):
+    """Страница с курсорами на соседние страницы по ключу (pub_date, id)."""
+
+    @cached_property
+    def next_cursor(self):
+        if not len(self) or not self.has_next():
+            return None
+        return encode_cursor(self[-1])
+
+    @cached_property
+    def previous_cursor(self):
+        if not len(self) or not self.has_previous():
+            return None
+        return encode_cursor(self[0])
+
+
+class CursorPage(KeysetPage):
+    """
+    Страница курсорного режима: ни номер страницы, ни общее количество
+    объектов для неё не вычисляются.
+
+    has_next и has_previous — известный заранее ответ или None, если
+    его даёт строка сверх страницы.
+    """
+    is_cursor = True
+
+    def __init__(self, rows, paginator, has_next=None, has_previous=None):
+        super().__init__(rows, None, paginator)
+        self.rows = rows
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        start = encode_cursor(self[0]) if len(self) else ''
+        return f'<Cursor page from {start!r}>'
+
+    def has_next(self):
+        if self._has_next is None:
+            return self.rows.has_more()
+        return self._has_next
+
+    def has_previous(self):
+        if self._has_previous is None:
+            return self.rows.has_more()
+        return self._has_previous
+
+
+class NumberedPage(KeysetPage):
+    """
+    Нумерованная страница: есть ли следующая, решают прочитанные строки,
+    а не количество, которое может быть оценочным или устаревшим.
+
+    Строки, а с ними и номер читаются при первом обращении. Если
+    количество завышено и за его последней страницей строк нет, оно
+    пересчитывается точно, и страница становится настоящей последней.
+    """
+    is_cursor = False
+
+    def __init__(self, number, paginator):
+        # Page.__init__ не вызывается: object_list и number вычисляются.
+        self.requested_number = number
+        self.paginator = paginator
+
+    @cached_property
+    def resolved(self):
+        number = self.requested_number
+        rows = self.paginator.page_rows(number)
+        if not rows and number > 1:
+            self.paginator.recount()
+            number = self.paginator.num_pages
+            rows = self.paginator.page_rows(number)
+        return number, rows
+
+    @cached_property
+    def number(self):
+        return self.resolved[0]
+
+    @cached_property
+    def object_list(self):
+        return self.resolved[1]
+
+    @cached_property
+    def elided_page_range(self):
+        return list(self.paginator.get_elided_page_range(self.number))
+
+    def has_next(self):
+        return self.resolved[1].has_more()
+
+
+class KeysetPaginator(Paginator):
+    """
+    Пагинатор с двумя режимами: обычные номера страниц и курсоры
+    по ключу (pub_date, id).
+
+    Курсорная страница выбирается одним запросом с LIMIT без OFFSET
+    и без COUNT(*), поэтому её стоимость не зависит от глубины.
+
+    `key` задаёт поля, по которым сортируется и фильтруется выборка;
+    их значения должны совпадать с pub_date и id поста (например,
+    копии этих полей в записях ленты).
+
+    Если задана область `count_scope`, количество объектов кешируется
+    и сбрасывается при записи в эту область. С `approximate=True`
+    для больших нефильтрованных таблиц вместо COUNT(*) берётся оценка.
+    """
+    default_key = ('pub_date', 'id')
+    ELLIPSIS = '…'
+
+    def __init__(self, object_list, per_page, key=None, count_scope=None,
+                 approximate=False, **kwargs):
+        self.key = key or self.default_key
+        self.count_scope = count_scope
+        self.approximate = approximate
+        super().__init__(
+            object_list.order_by(*(f'-{field}' for field in self.key)),
+            per_page, **kwargs
+        )
+
+    @cached_property
+    def count(self):
+        if self.count_scope is None:
+            return self._count()
+        cache_key = count_key(self.count_scope)
+        count = cache.get(cache_key)
+        if count is None:
+            count = self._count()
+            cache.set(cache_key, count, settings.PAGINATOR_COUNT_TIMEOUT)
+        return count
+
+    def _count(self):
+        if self.approximate:
+            estimate = estimated_count(self.object_list.model)
+            if (estimate or 0) >= settings.PAGINATOR_APPROXIMATE_COUNT:
+                return estimate
+        return self.object_list.count()
+
+    def get_elided_page_range(self, number=1, on_each_side=2, on_ends=1):
+        """
+        Номера страниц вокруг текущей и по краям, пропуски заменены
+        на ELLIPSIS: число ссылок не зависит от числа страниц.
+        """
+        number = self.validate_number(number)
+        if self.num_pages <= (on_each_side + on_ends) * 2 + 1:
+            yield from self.page_range
+            return
+        if number > 1 + on_each_side + on_ends + 1:
+            yield from range(1, on_ends + 1)
+            yield self.ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if number < self.num_pages - on_each_side - on_ends - 1:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield self.ELLIPSIS
+            yield from range(self.num_pages - on_ends + 1, self.num_pages + 1)
+        else:
+            yield from range(number + 1, self.num_pages + 1)
+
+    def _after(self, pub_date, pk):
+        date_field, id_field = self.key
+        return self.object_list.filter(
+            Q(**{f'{date_field}__lt': pub_date})
+            | Q(**{date_field: pub_date, f'{id_field}__lt': pk})
+        )
+
+    def _before(self, pub_date, pk):
+        date_field, id_field = self.key
+        return self.object_list.filter(
+            Q(**{f'{date_field}__gt': pub_date})
+            | Q(**{date_field: pub_date, f'{id_field}__gt': pk})
+        ).reverse()
+
+    def page_rows(self, number):
+        """Строки страницы number; срез не ограничивается count."""
+        bottom = (number - 1) * self.per_page
+        return PageRows(self.object_list[bottom:], self.per_page)
+
+    def recount(self):
+        """Точное количество вместо завышенного, в том числе в кеше."""
+        count = self.object_list.count()
+        if self.count_scope is not None:
+            cache.set(
+                count_key(self.count_scope), count,
+                settings.PAGINATOR_COUNT_TIMEOUT
+            )
+        self.__dict__['count'] = count
+        self.__dict__.pop('num_pages', None)
+
+    def page(self, number):
+        """
+        Обычная нумерованная страница, дополненная курсорами, чтобы
+        ссылки «вперёд/назад» не зависели от глубины, и сокращённым
+        списком номеров страниц.
+        """
+        return NumberedPage(self.validate_number(number), self)
+
+    def cursor_page(self, after=None, before=None):
+        """Страница после курсора `after` или перед курсором `before`."""
+        after_key = decode_cursor(after)
+        if after_key is not None:
+            return CursorPage(
+                PageRows(self._after(*after_key), self.per_page), self,
+                has_previous=True,
+            )
+        before_key = decode_cursor(before)
+        if before_key is not None:
+            return CursorPage(
+                PageRows(
+                    self._before(*before_key), self.per_page, reverse=True
+                ),
+                self, has_next=True,
+            )
+        return CursorPage(
+            PageRows(self.object_list, self.per_page), self,
+            has_previous=False,
+        )
@@ -0,0 +1,94 @@
+"""
+Адаптивные картинки постов.
+
+Вид картинки в IMAGE_RENDITIONS задаёт кадр (соотношение сторон и
+ширину, в которой картинка показывается на странице), набор ширин для
+srcset и атрибут sizes. Каждая ширина создаётся через sorl в WebP и
+JPEG. Ширины больше оригинала заранее урезаются до его ширины, так
+что sorl не увеличивает картинку и не создаёт одинаковых вариантов.
+
+Описания вариантов (адреса и размеры) вместе с размером оригинала
+хранятся в строке поста: их пишет posts.thumbnails после загрузки или
+команда generate_thumbnails. post_detail вызывает attach(), а в
+списках постов тег post_image разбирает описание сам: страница
+читается только при рендеринге фрагмента, которого нет в кеше. Шаблон
+рендерит картинки, не обращаясь ни к кешу, ни к хранилищу ключей
+sorl, ни к файлам. Пока вариантов нет, показывается оригинал
+с известными размерами.
+
+Формат выбирает браузер: в <picture> WebP стоит в <source type=...>,
+остальные получают JPEG. Выбор по заголовку Accept на сервере разделил
+бы кеш страниц и фрагментов, общий для всех клиентов.
+"""
+import json
+
+from django.conf import settings
+from sorl.thumbnail import get_thumbnail
+
+# Форматы в порядке предпочтения; последний — запасной для <img>.
+FORMATS = (('WEBP', 'image/webp'), ('JPEG', 'image/jpeg'))
+
+
+def widths(kind, original_width):
+    """Ширины вариантов вида, не больше ширины оригинала."""
+    return sorted({
+        min(width, original_width)
+        for width in settings.IMAGE_RENDITIONS[kind]['widths']
+    })
+
+
+def build(name, kind, size):
+    """
+    Создаёт недостающие варианты вида во всех форматах; возвращает
+    описание набора или None, если картинку не удалось прочитать.
+    """
+    spec = settings.IMAGE_RENDITIONS[kind]
+    frame_width, frame_height = spec['aspect']
+    sources = []
+    for image_format, content_type in FORMATS:
+        variants = {}
+        for width in widths(kind, size[0]):
+            thumbnail = get_thumbnail(
+                name, f'{width}x{round(width * frame_height / frame_width)}',
+                crop='center', upscale=False, format=image_format
+            )
+            if thumbnail.size is None:
+                return None
+            variants.setdefault(
+                thumbnail.width, (thumbnail.url, thumbnail.height)
+            )
+        sources.append((content_type, sorted(variants.items())))
+    # Запасной вариант для <img>: самый крупный не шире кадра.
+    fallback = sources[-1][1]
+    width, (url, height) = max(
+        (variant for variant in fallback if variant[0] <= frame_width),
+        default=fallback[0]
+    )
+    return {
+        'sources': [
+            (content_type, [(url, width) for width, (url, _) in variants])
+            for content_type, variants in sources
+        ],
+        'src': url,
+        'width': width,
+        'height': height,
+        'sizes': spec['sizes'],
+    }
+
+
+def load(post):
+    """Описания вариантов из строки поста: {вид: описание}."""
+    if not post.image or not post.image_renditions:
+        return {}
+    try:
+        return json.loads(post.image_renditions)
+    except ValueError:
+        # Испорченное описание не ломает страницу: показывается оригинал.
+        return {}
+
+
+def attach(posts):
+    """Разбирает описания вариантов постов страницы в post.renditions."""
+    for post in posts:
+        post.renditions = load(post)
+    return posts
@@ -0,0 +1,180 @@
+"""
+Полнотекстовый поиск по постам и комментариям.
+
+На SQLite документы лежат в виртуальной таблице FTS5 posts_search:
+rowid — id поста, колонки — текст поста и склеенные тексты его
+комментариев. Записи постов и комментариев обновляют документ в той же
+транзакции, rebuild() пересобирает таблицу целиком. Результаты
+ранжируются по bm25, текст поста весит больше комментариев.
+
+На других СУБД поиск деградирует до icontains по тексту поста.
+"""
+import re
+
+from django.db import connection
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Post
+
+TABLE = 'posts_search'
+CREATE_TABLE = (
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5('
+    "text, comments, tokenize='unicode61 remove_diacritics 2', "
+    "prefix='2 3')"
+)
+DROP_TABLE = f'DROP TABLE IF EXISTS {TABLE}'
+# Документ поста: текст и тексты комментариев через пробел.
+DOCUMENTS = (
+    'SELECT p.id, p.text, COALESCE(('
+    "SELECT group_concat(c.text, ' ') FROM posts_comment c "
+    "WHERE c.post_id = p.id), '') FROM posts_post p"
+)
+TEXT_WEIGHT = 10.0
+COMMENTS_WEIGHT = 1.0
+# Границы подсветки в сниппете: заменяются на <mark> после экранирования.
+MARK_START = '\x02'
+MARK_END = '\x03'
+SNIPPET_TOKENS = 16
+
+WORD = re.compile(r'\w+')
+
+
+def is_supported():
+    return connection.vendor == 'sqlite'
+
+
+def index_post(post_id):
+    """Пересобирает документ поста после изменения поста или комментариев."""
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [post_id])
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, text, comments) '
+            f'{DOCUMENTS} WHERE p.id = %s',
+            [post_id]
+        )
+
+
+def unindex_post(post_id):
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [post_id])
+
+
+def rebuild():
+    """Пересобирает индекс всех постов; возвращает число документов."""
+    if not is_supported():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, text, comments) {DOCUMENTS}'
+        )
+        cursor.execute(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')")
+        cursor.execute(f'SELECT COUNT(*) FROM {TABLE}')
+        return cursor.fetchone()[0]
+
+
+def build_query(text, column=None):
+    """
+    Превращает ввод пользователя в запрос FTS5: каждое слово в кавычках,
+    последнее ищется ещё и как префикс. Операторы FTS5 из ввода
+    не проходят. column ограничивает поиск одной колонкой.
+    None, если слов нет.
+    """
+    words = WORD.findall(text or '')
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    query = ' '.join(terms)
+    if column is not None:
+        query = f'{column} : ({query})'
+    return query
+
+
+def filter_matching(queryset, match):
+    """Оставляет в выборке постов подходящие под запрос FTS5 match."""
+    table = queryset.model._meta.db_table
+    return queryset.extra(
+        where=[
+            f'{table}.id IN (SELECT rowid FROM {TABLE} '
+            f'WHERE {TABLE} MATCH %s)'
+        ],
+        params=[match]
+    )
+
+
+def highlight(snippet):
+    return mark_safe(
+        escape(snippet).replace(MARK_START, '<mark>').replace(
+            MARK_END, '</mark>'
+        )
+    )
+
+
+class SearchResults:
+    """
+    Ленивая выборка найденных постов для Paginator: count() и срезы
+    выполняются отдельными запросами к индексу, посты страницы
+    подгружаются одним запросом.
+    """
+
+    def __init__(self, query):
+        self.query = query
+        self.match = build_query(query)
+
+    def count(self):
+        if self.match is None:
+            return 0
+        if not is_supported():
+            return self.fallback().count()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {TABLE} WHERE {TABLE} MATCH %s',
+                [self.match]
+            )
+            return cursor.fetchone()[0]
+
+    def fallback(self):
+        return Post.objects.filter(text__icontains=self.query.strip())
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            raise TypeError('SearchResults поддерживает только срезы')
+        if self.match is None:
+            return []
+        offset = index.start or 0
+        limit = index.stop - offset
+        if not is_supported():
+            return list(self.fallback().select_related(
+                'author', 'group'
+            )[offset:offset + limit])
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid, snippet({TABLE}, -1, %s, %s, %s, %s) '
+                f'FROM {TABLE} WHERE {TABLE} MATCH %s '
+                f'ORDER BY bm25({TABLE}, %s, %s) LIMIT %s OFFSET %s',
+                [
+                    MARK_START, MARK_END, '…', SNIPPET_TOKENS,
+                    self.match, TEXT_WEIGHT, COMMENTS_WEIGHT,
+                    limit, offset,
+                ]
+            )
+            rows = cursor.fetchall()
+        posts = Post.objects.select_related('author', 'group').in_bulk(
+            [post_id for post_id, _ in rows]
+        )
+        results = []
+        for post_id, snippet in rows:
+            post = posts.get(post_id)
+            if post is not None:
+                post.snippet = highlight(snippet)
+                results.append(post)
+        return results
@@ -0,0 +1,127 @@
+from django.conf import settings
+from django.core.files.images import get_image_dimensions
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import counters, search, thumbnails, timeline
+from .cache import (GROUPS_SCOPE, author_scope, follow_scope, group_scope,
+                    invalidate_scopes, post_scope, post_scopes)
+from .models import Comment, Follow, Group, Post, UserStats
+
+
+def follow_scopes(follow):
+    """Лента читателя и страницы обоих авторов со счётчиками подписок."""
+    return [
+        follow_scope(follow.user_id),
+        author_scope(follow.user_id),
+        author_scope(follow.author_id),
+    ]
+
+
+def changed_scopes(post):
+    """Области поста, включая группу, из которой его перенесли."""
+    scopes = post_scopes(post) + [post_scope(post.pk)]
+    old_group_id = getattr(post, '_old_group_id', None)
+    if old_group_id and old_group_id != post.group_id:
+        scopes.append(group_scope(old_group_id))
+    return scopes
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def create_user_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(pre_save, sender=Post)
+def remember_old_values(sender, instance, raw=False, **kwargs):
+    if instance.pk and not raw:
+        instance._old_group_id, instance._old_image = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('group_id', 'image').first() or (None, None)
+
+
+@receiver(pre_save, sender=Post)
+def reset_image_metadata(sender, instance, raw=False, **kwargs):
+    """
+    У новой картинки варианты создаются заново, а размеры берутся из
+    загруженного файла, пока он ещё не записан в хранилище.
+    """
+    if raw or instance.image.name == getattr(instance, '_old_image', None):
+        return
+    if instance.pk:
+        instance.image_renditions = ''
+        instance.image_width = instance.image_height = None
+    if instance.image and not instance.image._committed:
+        instance.image_width, instance.image_height = get_image_dimensions(
+            instance.image.file
+        )
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    scopes = changed_scopes(instance)
+    if created:
+        counters.bump_user(instance.author_id, posts_count=1)
+        followers = timeline.fan_out_post(instance)
+        scopes.extend(follow_scope(user_id) for user_id in followers)
+    search.index_post(instance.pk)
+    invalidate_scopes(scopes)
+    if instance.image.name != getattr(instance, '_old_image', None):
+        thumbnails.schedule(instance.image.name)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.bump_user(instance.author_id, posts_count=-1)
+    search.unindex_post(instance.pk)
+    invalidate_scopes(changed_scopes(instance))
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    search.index_post(instance.post_id)
+    if created:
+        counters.bump_comments(instance.post_id, 1)
+        invalidate_scopes(changed_scopes(instance.post))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    # Пост удаляется вместе с комментарием: счётчик и поисковый документ
+    # уходят с ним, а области сбросит post_deleted.
+    if getattr(instance, '_post_deleted', False):
+        return
+    counters.bump_comments(instance.post_id, -1)
+    post = Post.objects.filter(pk=instance.post_id).first()
+    if post is not None:
+        search.index_post(post.pk)
+        invalidate_scopes(changed_scopes(post))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_scopes([GROUPS_SCOPE, group_scope(instance.pk)])
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.bump_user(instance.user_id, following_count=1)
+        counters.bump_user(instance.author_id, followers_count=1)
+        timeline.backfill(instance.user_id, instance.author_id)
+        invalidate_scopes(follow_scopes(instance))
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.bump_user(instance.user_id, following_count=-1)
+    counters.bump_user(instance.author_id, followers_count=-1)
+    timeline.unfollow(instance.user_id, instance.author_id)
+    invalidate_scopes(follow_scopes(instance))
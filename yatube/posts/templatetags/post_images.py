@@ -0,0 +1,58 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from posts import renditions
+
+register = template.Library()
+
+
+def srcset(variants):
+    return ', '.join(f'{url} {width}w' for url, width in variants)
+
+
+@register.simple_tag
+def post_image(post, kind='card', sizes=None):
+    """
+    Картинка поста тегом <picture>: WebP и JPEG нескольких ширин,
+    браузер выбирает формат и ширину сам. Описания берутся из
+    post.renditions, если представление их приложило, иначе из строки
+    поста. Пока вариантов нет, показывается оригинал.
+    """
+    if not post.image:
+        return ''
+    attached = getattr(post, 'renditions', None)
+    if attached is None:
+        attached = renditions.load(post)
+    rendition = attached.get(kind)
+    if rendition is None:
+        return original(post)
+    sizes = sizes or rendition['sizes']
+    *preferred, (_, fallback) = rendition['sources']
+    return format_html(
+        '<picture>{}<img class="card-img h-auto my-2" src="{}" '
+        'srcset="{}" sizes="{}" width="{}" height="{}" alt="" '
+        'loading="lazy"></picture>',
+        format_html_join(
+            '', '<source type="{}" srcset="{}" sizes="{}">',
+            (
+                (content_type, srcset(variants), sizes)
+                for content_type, variants in preferred
+            )
+        ),
+        rendition['src'], srcset(fallback), sizes,
+        rendition['width'], rendition['height'],
+    )
+
+
+def original(post):
+    if post.image_width is None:
+        return format_html(
+            '<img class="card-img h-auto my-2" src="{}" alt="" '
+            'loading="lazy">',
+            post.image.url
+        )
+    return format_html(
+        '<img class="card-img h-auto my-2" src="{}" width="{}" height="{}" '
+        'alt="" loading="lazy">',
+        post.image.url, post.image_width, post.image_height
+    )
@@ -0,0 +1,137 @@
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.models import Group, Post
+from posts.paginators import EstimatedCountPaginator
+
+User = get_user_model()
+
+CHANGELIST = reverse('admin:posts_post_changelist')
+
+
+class PostAdminTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        cls.author = User.objects.create_user(username='StasBasov')
+        cls.old_group = Group.objects.create(
+            title='Старая группа', slug='old', description='Старая'
+        )
+        cls.new_group = Group.objects.create(
+            title='Новая группа', slug='new', description='Новая'
+        )
+        for number in range(5):
+            Post.objects.create(
+                author=cls.author,
+                text=f'Пост про котиков {number}',
+                group=cls.old_group,
+            )
+        Post.objects.create(author=cls.author, text='Пост про собак')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def changelist_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(CHANGELIST)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow(self):
+        """Число запросов списка не зависит от числа постов."""
+        before = self.changelist_queries()
+        Post.objects.bulk_create([
+            Post(author=self.author, text='Ещё пост', group=self.new_group)
+            for _ in range(20)
+        ])
+        self.assertEqual(self.changelist_queries(), before)
+
+    def test_search_uses_full_text_index(self):
+        """Поиск в админке находит посты по словам текста."""
+        response = self.client.get(CHANGELIST, {'q': 'собак'})
+        self.assertEqual(
+            [post.text for post in response.context['cl'].result_list],
+            ['Пост про собак']
+        )
+        response = self.client.get(CHANGELIST, {'q': 'котик'})
+        self.assertEqual(response.context['cl'].result_count, 5)
+
+    def action(self, name, pks, **data):
+        return self.client.post(CHANGELIST, {
+            'action': name,
+            'index': 0,
+            ACTION_CHECKBOX_NAME: pks,
+            **data,
+        })
+
+    def test_delete_selected_is_replaced(self):
+        """Стандартное удаление заменено удалением порциями."""
+        response = self.client.get(CHANGELIST)
+        choices = dict(response.context['action_form'].fields[
+            'action'
+        ].choices)
+        self.assertNotIn('delete_selected', choices)
+        self.assertIn('delete_in_chunks', choices)
+
+    @override_settings(ADMIN_CHUNK_SIZE=2)
+    def test_move_to_group(self):
+        """Перенос спрашивает группу и сбрасывает кеш обеих групп."""
+        pks = list(self.old_group.posts.values_list('pk', flat=True))
+        old_page = reverse('posts:group_list', args=['old'])
+        self.assertContains(self.client.get(old_page), 'Пост про котиков')
+        response = self.action('move_to_group', pks)
+        self.assertTemplateUsed(response, 'admin/posts/confirm_action.html')
+        self.assertEqual(Post.objects.filter(group=self.new_group).count(), 0)
+        response = self.action(
+            'move_to_group', pks, confirm='yes', group=self.new_group.pk
+        )
+        self.assertRedirects(response, CHANGELIST)
+        self.assertEqual(Post.objects.filter(group=self.new_group).count(), 5)
+        self.assertNotContains(self.client.get(old_page), 'Пост про котиков')
+        self.assertContains(
+            self.client.get(reverse('posts:group_list', args=['new'])),
+            'Пост про котиков'
+        )
+
+    @override_settings(ADMIN_CHUNK_SIZE=2)
+    def test_delete_in_chunks(self):
+        """Удаление порциями удаляет посты и снимает их с главной."""
+        self.assertContains(self.client.get(reverse('posts:index')), 'котиков')
+        pks = list(self.old_group.posts.values_list('pk', flat=True))
+        response = self.action('delete_in_chunks', pks)
+        self.assertContains(response, 'Выбрано объектов: 5')
+        self.assertEqual(Post.objects.count(), 6)
+        self.action('delete_in_chunks', pks, confirm='yes')
+        self.assertEqual(Post.objects.count(), 1)
+        self.assertNotContains(
+            self.client.get(reverse('posts:index')), 'котиков'
+        )
+
+
+class EstimatedCountPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        author = User.objects.create_user(username='StasBasov')
+        Post.objects.bulk_create([
+            Post(author=author, text=f'Пост {number}') for number in range(7)
+        ])
+
+    @override_settings(ADMIN_COUNT_LIMIT=5)
+    def test_filtered_count_is_bounded(self):
+        """С фильтром количество считается не дальше ADMIN_COUNT_LIMIT."""
+        queryset = Post.objects.filter(text__startswith='Пост')
+        self.assertEqual(EstimatedCountPaginator(queryset, 2).count, 5)
+
+    def test_small_table_is_counted(self):
+        """Маленькая таблица считается точно."""
+        queryset = Post.objects.order_by('pk')
+        self.assertEqual(EstimatedCountPaginator(queryset, 2).count, 7)
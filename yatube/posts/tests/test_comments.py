@@ -1,4 +1,6 @@
+from django.db import connection
 from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from posts.models import Group, Post, Comment, User
 
@@ -90,3 +92,28 @@ class CommentTest(TestCase):
         self.assertEqual(post.id, 1)
         self.assertEqual(text, 'Новый коментарий')
         self.assertEqual(author.username, 'StasBasov')
+
+    def test_post_delete_does_not_scale_with_comments(self):
+        """Удаление поста не ведёт учёт по каждому комментарию."""
+        queries = []
+        for count in (2, 20):
+            post = Post.objects.create(author=self.user_auth, text='Пост')
+            Comment.objects.bulk_create(
+                Comment(post=post, author=self.user, text=f'Ответ {number}')
+                for number in range(count)
+            )
+            with CaptureQueriesContext(connection) as captured:
+                post.delete()
+            queries.append(len(captured))
+        self.assertEqual(queries[0], queries[1])
+        self.assertFalse(Comment.objects.filter(text='Ответ 0').exists())
+
+    def test_comment_delete_updates_post(self):
+        """Удаление одного комментария по-прежнему меняет счётчик."""
+        post = Post.objects.get()
+        comment = Comment.objects.create(
+            post=post, author=self.user, text='Комментарий'
+        )
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
@@ -0,0 +1,110 @@
+from xml.etree import ElementTree
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.http import StreamingHttpResponse
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.models import Group, Post
+
+User = get_user_model()
+
+ATOM = '{http://www.w3.org/2005/Atom}'
+
+
+class FeedsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='StasBasov')
+        cls.group = Group.objects.create(
+            title='Важная группа',
+            slug='important',
+            description='Группа для важных постов',
+        )
+        for number in range(5):
+            Post.objects.create(
+                author=cls.author,
+                text=f'Пост {number}',
+                group=cls.group if number % 2 else None,
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def get_feed(self, url, **headers):
+        response = self.client.get(url, **headers)
+        if response.status_code != 200:
+            return response, None
+        self.assertIsInstance(response, StreamingHttpResponse)
+        content = b''.join(response.streaming_content)
+        return response, ElementTree.fromstring(content)
+
+    def test_feeds_list_posts(self):
+        """Ленты содержат посты своей области в порядке публикации."""
+        feeds = [
+            (reverse('posts:index_feed', args=['rss']), 5),
+            (reverse('posts:group_feed', args=['important', 'rss']), 2),
+            (reverse('posts:profile_feed', args=['StasBasov', 'rss']), 5),
+        ]
+        for url, count in feeds:
+            with self.subTest(url=url):
+                response, root = self.get_feed(url)
+                self.assertIn('application/rss+xml', response['Content-Type'])
+                items = root.findall('channel/item')
+                self.assertEqual(len(items), count)
+                self.assertEqual(
+                    items[-1].find('description').text,
+                    'Пост 1' if count == 2 else 'Пост 0'
+                )
+
+    def test_atom_feed(self):
+        """Atom лента валидна и содержит записи."""
+        response, root = self.get_feed(
+            reverse('posts:group_feed', args=['important', 'atom'])
+        )
+        entries = root.findall(f'{ATOM}entry')
+        self.assertEqual(len(entries), 2)
+        self.assertEqual(entries[0].find(f'{ATOM}title').text, 'Пост 3')
+
+    def test_unknown_kind(self):
+        """Неизвестный формат ленты — 404."""
+        response = self.client.get(reverse('posts:index_feed', args=['xml']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_conditional_get_skips_database(self):
+        """Повторный опрос с ETag получает 304 без запросов к базе."""
+        url = reverse('posts:index_feed', args=['atom'])
+        response, _ = self.get_feed(url)
+        with CaptureQueriesContext(connection) as queries:
+            not_modified = self.client.get(
+                url, HTTP_IF_NONE_MATCH=response['ETag']
+            )
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(len(queries), 0)
+        # Дата ленты может уйти назад после удаления поста, поэтому
+        # проверка идёт только по ETag.
+        self.assertFalse(response.has_header('Last-Modified'))
+
+    def test_entries_are_cached(self):
+        """Записи берутся из кеша, изменённый пост рендерится заново."""
+        url = reverse('posts:index_feed', args=['rss'])
+        self.get_feed(url)
+        post = Post.objects.latest('pub_date')
+        post.text = 'Исправленный пост'
+        post.save()
+        with CaptureQueriesContext(connection) as queries:
+            response, root = self.get_feed(url)
+        self.assertEqual(
+            root.find('channel/item/description').text, 'Исправленный пост'
+        )
+        # Список записей и один пропущенный в кеше пост.
+        self.assertEqual(len(queries), 2)
+
+    @override_settings(FEED_ENTRIES=3)
+    def test_feed_is_bounded(self):
+        """В ленту попадают только FEED_ENTRIES последних постов."""
+        _, root = self.get_feed(reverse('posts:index_feed', args=['rss']))
+        self.assertEqual(len(root.findall('channel/item')), 3)
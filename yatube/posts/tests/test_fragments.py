@@ -0,0 +1,115 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class FeedFragmentsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='StasBasov')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Важная группа',
+            slug='important',
+            description='Группа для важных постов',
+        )
+        for number in range(25):
+            Post.objects.create(
+                author=cls.author, text=f'Пост {number}', group=cls.group
+            )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.feeds = [
+            (reverse('posts:index'), reverse('posts:index_fragment')),
+            (
+                reverse('posts:group_list', args=['important']),
+                reverse('posts:group_fragment', args=['important']),
+            ),
+            (
+                reverse('posts:profile', args=['StasBasov']),
+                reverse('posts:profile_fragment', args=['StasBasov']),
+            ),
+            (
+                reverse('posts:follow_index'),
+                reverse('posts:follow_fragment'),
+            ),
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_scrolling_walks_whole_feed(self):
+        """Порции фрагментов продолжают страницу без пропусков и повторов."""
+        for page_url, fragment_url in self.feeds:
+            with self.subTest(url=fragment_url):
+                response = self.client.get(page_url)
+                texts = [post.text for post in response.context['page_obj']]
+                self.assertContains(
+                    response, f'data-feed-next="{fragment_url}'
+                )
+                cursor = response.context['page_obj'].next_cursor
+                while cursor:
+                    response = self.client.get(fragment_url, {'after': cursor})
+                    texts += [
+                        post.text for post in response.context['page_obj']
+                    ]
+                    cursor = response.get('X-Next-Cursor')
+                self.assertEqual(
+                    texts, [f'Пост {number}' for number in range(24, -1, -1)]
+                )
+
+    def test_cached_fragment_skips_posts_query(self):
+        """Страница и порция из кеша фрагмента не читают посты."""
+        for page_url, fragment_url in self.feeds:
+            cursor = self.client.get(page_url).context['page_obj'].next_cursor
+            for url in (page_url, f'{fragment_url}?after={cursor}'):
+                with self.subTest(url=url):
+                    first = self.client.get(url)
+                    with CaptureQueriesContext(connection) as queries:
+                        response = self.client.get(url)
+                    self.assertEqual(response.content, first.content)
+                    self.assertEqual(
+                        response.get('X-Next-Cursor'),
+                        first.get('X-Next-Cursor')
+                    )
+                    sql = ' '.join(query['sql'] for query in queries)
+                    self.assertNotIn('FROM "posts_post"', sql)
+
+    def test_fragment_is_only_cards(self):
+        """Фрагмент не содержит обвязки страницы и пагинатора."""
+        cursor = self.client.get(
+            reverse('posts:index')
+        ).context['page_obj'].next_cursor
+        response = self.client.get(
+            reverse('posts:index_fragment'), {'after': cursor}
+        )
+        self.assertTemplateUsed(response, 'posts/includes/index_post.html')
+        self.assertTemplateNotUsed(response, 'base.html')
+        self.assertTemplateNotUsed(response, 'posts/includes/paginator.html')
+        self.assertNotContains(response, '<html')
+
+    def test_fragment_skips_count(self):
+        """Порция выбирается одним запросом постов без COUNT и OFFSET."""
+        cursor = self.client.get(
+            reverse('posts:index')
+        ).context['page_obj'].next_cursor
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(
+                reverse('posts:index_fragment'), {'after': cursor}
+            )
+        sql = ' '.join(query['sql'] for query in queries)
+        self.assertNotIn('COUNT(', sql)
+        self.assertNotIn('OFFSET', sql)
+
+    def test_follow_fragment_requires_login(self):
+        """Фрагмент ленты подписок доступен только авторизованным."""
+        response = Client().get(reverse('posts:follow_fragment'))
+        self.assertEqual(response.status_code, 302)
@@ -1,7 +1,9 @@
+import io
 import shutil
 import tempfile
 
 
+from PIL import Image
 from posts.forms import PostForm
 from posts.models import Post, User, Group
 from django.conf import settings
@@ -126,3 +128,64 @@ class PostFormTests(TestCase):
             'posts:post_detail', kwargs={'post_id': '2'}
         ))
         self.assertEqual(response.context['post'].image, 'posts/small.gif')
+
+
+def encoded(mode, size, image_format, **params):
+    buffer = io.BytesIO()
+    Image.new(mode, size, 'red').save(buffer, image_format, **params)
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, IMAGE_MAX_SIZE=400)
+class ImageIngestTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def upload(self, name, content, content_type):
+        form = PostForm(
+            data={'text': 'Текст'},
+            files={'image': SimpleUploadedFile(name, content, content_type)}
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+        form.instance.author = self.user
+        post = form.save()
+        post.image.open()
+        self.addCleanup(post.image.close)
+        return post.image.name, Image.open(post.image)
+
+    def test_photo_is_downscaled_without_metadata(self):
+        """Снимок уменьшается, поворачивается по EXIF и теряет EXIF."""
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        exif[0x010F] = 'Camera'
+        name, image = self.upload('photo.jpeg', encoded(
+            'RGB', (1200, 900), 'JPEG', exif=exif.tobytes()
+        ), 'image/jpeg')
+        self.assertEqual(name, 'posts/photo.jpg')
+        self.assertEqual(image.format, 'JPEG')
+        self.assertEqual(image.size, (300, 400))
+        self.assertFalse(image.getexif())
+
+    def test_transparency_is_kept(self):
+        """Картинка с прозрачностью остаётся PNG."""
+        name, image = self.upload(
+            'logo.png', encoded('RGBA', (800, 800), 'PNG'), 'image/png'
+        )
+        self.assertEqual(name, 'posts/logo.png')
+        self.assertEqual((image.format, image.mode), ('PNG', 'RGBA'))
+        self.assertEqual(image.size, (400, 400))
+
+    def test_small_image_is_not_upscaled(self):
+        """Маленькая картинка перекодируется без увеличения."""
+        name, image = self.upload(
+            'small.bmp', encoded('RGB', (40, 30), 'BMP'), 'image/bmp'
+        )
+        self.assertEqual(name, 'posts/small.jpg')
+        self.assertEqual(image.size, (40, 30))
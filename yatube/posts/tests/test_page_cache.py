@@ -0,0 +1,142 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.http import parse_http_date
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class AnonymousPageCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='StasBasov')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый пост',
+            group=cls.group,
+        )
+        cls.urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test'}),
+            reverse('posts:profile', kwargs={'username': 'StasBasov'}),
+            reverse('posts:post_detail', kwargs={'post_id': cls.post.id}),
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_repeated_request_is_served_from_cache(self):
+        """Повторный анонимный запрос не рендерит страницу заново."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                first = self.guest_client.get(url)
+                with CaptureQueriesContext(connection) as queries:
+                    second = self.guest_client.get(url)
+                self.assertEqual(len(queries), 0)
+                self.assertEqual(first.content, second.content)
+                self.assertEqual(first['ETag'], second['ETag'])
+
+    def test_write_invalidates_page(self):
+        """Новый пост и комментарий сбрасывают закешированные страницы."""
+        for url in self.urls:
+            self.guest_client.get(url)
+        Post.objects.create(
+            author=self.user, text='Самый свежий пост', group=self.group
+        )
+        for url in self.urls[:3]:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertContains(response, 'Самый свежий пост')
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Свежий комментарий'
+        )
+        response = self.guest_client.get(self.urls[3])
+        self.assertContains(response, 'Свежий комментарий')
+
+    def test_follow_invalidates_profile(self):
+        """Подписка меняет счётчик подписчиков на странице автора."""
+        url = self.urls[2]
+        self.guest_client.get(url)
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=self.user)
+        response = self.guest_client.get(url)
+        self.assertContains(response, 'Followers: 1')
+
+    def test_if_none_match_returns_not_modified(self):
+        """Запрос с актуальным ETag получает 304 без тела."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)['ETag']
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+
+    def test_if_modified_since_returns_not_modified(self):
+        """Запрос с актуальным Last-Modified получает 304."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                last_modified = self.guest_client.get(url)['Last-Modified']
+                response = self.guest_client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=last_modified
+                )
+                self.assertEqual(response.status_code, 304)
+
+    def test_if_modified_since_does_not_hide_changes(self):
+        """
+        Комментарий или удаление верхнего поста не меняют дат постов,
+        но страница рендерится заново с более поздним Last-Modified.
+        """
+        url = self.urls[3]
+        last_modified = self.guest_client.get(url)['Last-Modified']
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Свежий комментарий'
+        )
+        response = self.guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertContains(response, 'Свежий комментарий')
+        self.assertGreater(
+            parse_http_date(response['Last-Modified']),
+            parse_http_date(last_modified)
+        )
+        url = self.urls[0]
+        newest = Post.objects.create(author=self.user, text='Верхний пост')
+        last_modified = self.guest_client.get(url)['Last-Modified']
+        newest.delete()
+        response = self.guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'Верхний пост')
+
+    def test_stale_etag_gets_full_page(self):
+        """После записи старый ETag больше не подходит."""
+        url = self.urls[0]
+        etag = self.guest_client.get(url)['ETag']
+        Post.objects.create(author=self.user, text='Ещё один пост')
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_authorized_user_is_not_cached(self):
+        """Страницы авторизованного пользователя не кешируются целиком."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertFalse(response.has_header('ETag'))
+                self.assertIsNotNone(response.context)
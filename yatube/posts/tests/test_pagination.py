@@ -1,7 +1,12 @@
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from posts.cache import count_key, group_scope
 from posts.models import Group, Post
+from posts.paginators import KeysetPaginator, NumberedPage, encode_cursor
 
 User = get_user_model()
 
@@ -24,6 +29,8 @@ class PaginatorViewsTest(TestCase):
         ) for i in range(13)])
 
     def setUp(self):
+        # Посты созданы через bulk_create в обход сигналов сброса кеша.
+        cache.clear()
         self.guest_client = Client()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
@@ -62,3 +69,121 @@ class PaginatorViewsTest(TestCase):
                         self.assertEqual(len(page), per_page)
                     else:
                         self.assertEqual(len(page), count)
+
+    def test_cursor_pages_walk_all_records(self):
+        """Курсоры `after`/`before` обходят ленту без пропусков и повторов."""
+        url = reverse('posts:index')
+        expected = list(Post.objects.values_list('id', flat=True))
+        page = self.client.get(url).context['page_obj']
+        seen = [post.id for post in page]
+        while page.has_next():
+            page = self.client.get(
+                url, {'after': page.next_cursor}
+            ).context['page_obj']
+            self.assertTrue(page.is_cursor)
+            seen.extend(post.id for post in page)
+        self.assertEqual(seen, expected)
+        previous = self.client.get(
+            url, {'before': page.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(
+            [post.id for post in previous], expected[:10]
+        )
+        self.assertFalse(previous.has_previous())
+
+    def test_cursor_page_skips_count(self):
+        """Курсорная страница не выполняет COUNT(*) и OFFSET."""
+        first = self.client.get(reverse('posts:index')).context['page_obj']
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(
+                reverse('posts:index'), {'after': first.next_cursor}
+            )
+        sql = ' '.join(query['sql'] for query in queries)
+        self.assertNotIn('COUNT(', sql)
+        self.assertNotIn('OFFSET', sql)
+
+    def test_broken_cursor_returns_first_page(self):
+        """Испорченный курсор открывает первую страницу."""
+        response = self.client.get(reverse('posts:index'), {'after': '%%%'})
+        page = response.context['page_obj']
+        self.assertEqual(len(page), 10)
+        self.assertFalse(page.has_previous())
+
+    def test_out_of_range_cursor_returns_first_page(self):
+        """Курсор с id за пределами 64 бит открывает первую страницу."""
+        token = encode_cursor(
+            Post(pub_date=Post.objects.first().pub_date, id=10 ** 23)
+        )
+        response = self.client.get(reverse('posts:index'), {'after': token})
+        page = response.context['page_obj']
+        self.assertEqual(len(page), 10)
+        self.assertFalse(page.has_previous())
+
+    def test_count_is_cached_until_write(self):
+        """Количество постов кешируется и сбрасывается новым постом."""
+        url = reverse('posts:group_list', kwargs={'slug': 'important'})
+        self.authorized_client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(url)
+        self.assertNotIn(
+            'COUNT(', ' '.join(query['sql'] for query in queries)
+        )
+        self.assertEqual(response.context['page_obj'].paginator.count, 13)
+        Post.objects.create(
+            author=self.user, text='Новый пост', group=Group.objects.get()
+        )
+        response = self.authorized_client.get(url)
+        self.assertEqual(response.context['page_obj'].paginator.count, 14)
+
+    @override_settings(PAGINATOR_APPROXIMATE_COUNT=1)
+    def test_index_uses_estimated_count(self):
+        """На большой таблице главная страница берёт оценку вместо COUNT."""
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('posts:index'))
+        self.assertNotIn(
+            'COUNT(', ' '.join(query['sql'] for query in queries)
+        )
+
+    def test_elided_page_range(self):
+        """Список номеров страниц сокращается вокруг текущей."""
+        paginator = KeysetPaginator(Post.objects.all(), 1)
+        self.assertEqual(
+            list(paginator.get_elided_page_range(7)),
+            [1, '…', 5, 6, 7, 8, 9, '…', 13]
+        )
+        self.assertEqual(
+            list(paginator.get_elided_page_range(1)),
+            [1, 2, 3, '…', 13]
+        )
+        response = self.client.get(reverse('posts:index'), {'page': 2})
+        self.assertEqual(
+            response.context['page_obj'].elided_page_range, [1, 2]
+        )
+
+    def test_overestimated_count(self):
+        """
+        При завышенном количестве последняя страница не ведёт дальше,
+        а номер за концом данных открывает настоящую последнюю страницу.
+        """
+        group = Group.objects.get()
+        url = reverse('posts:group_list', kwargs={'slug': 'important'})
+        cache.set(count_key(group_scope(group.id)), 113)
+        response = self.client.get(url, {'page': 2})
+        page = response.context['page_obj']
+        self.assertIsInstance(page, NumberedPage)
+        self.assertEqual(len(page), 3)
+        self.assertFalse(page.has_next())
+        self.assertNotContains(response, '?after=')
+        self.assertNotContains(response, '=None')
+        for number in (3, 12):
+            with self.subTest(number=number):
+                cache.set(count_key(group_scope(group.id)), 113)
+                response = self.client.get(url, {'page': number})
+                page = response.context['page_obj']
+                self.assertEqual(page.number, 2)
+                self.assertEqual(len(page), 3)
+                self.assertNotContains(response, '=None')
+                self.assertEqual(
+                    cache.get(count_key(group_scope(group.id))), 13
+                )
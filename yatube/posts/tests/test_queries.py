@@ -0,0 +1,75 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+from posts.tests.utils import QueryBudgetMixin
+
+
+class QueryBudgetTest(QueryBudgetMixin, TestCase):
+    """Число SQL-запросов страниц не зависит от числа постов и комментариев."""
+    query_budgets = {
+        'posts:index': 5,
+        'posts:group_list': 5,
+        'posts:profile': 6,
+        'posts:post_detail': 4,
+        'posts:follow_index': 5,
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.post = Post.objects.create(
+            author=cls.author,
+            text='Тестовый пост',
+            group=cls.group,
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def get_urls(self):
+        return {
+            'posts:index': reverse('posts:index'),
+            'posts:group_list': reverse(
+                'posts:group_list', kwargs={'slug': self.group.slug}
+            ),
+            'posts:profile': reverse(
+                'posts:profile', kwargs={'username': self.author.username}
+            ),
+            'posts:post_detail': reverse(
+                'posts:post_detail', kwargs={'post_id': self.post.id}
+            ),
+            'posts:follow_index': reverse('posts:follow_index'),
+        }
+
+    def count_queries(self):
+        counts = {}
+        for name, url in self.get_urls().items():
+            with self.subTest(name=name):
+                cache.clear()
+                _, counts[name] = self.get_within_budget(
+                    self.client, name, url
+                )
+        return counts
+
+    def test_queries_do_not_grow_with_content(self):
+        """Страницы выполняют фиксированное число запросов."""
+        small = self.count_queries()
+        for number in range(9):
+            author = User.objects.create_user(username=f'author{number}')
+            Follow.objects.create(user=self.reader, author=author)
+            Post.objects.create(author=author, text='Пост', group=self.group)
+            Post.objects.create(author=self.author, text='Пост')
+            Comment.objects.create(post=self.post, author=author, text='Да')
+        large = self.count_queries()
+        self.assertEqual(small, large)
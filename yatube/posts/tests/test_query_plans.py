@@ -0,0 +1,96 @@
+import re
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?(?!subquery)\w+$')
+TEMP_SORT = 'USE TEMP B-TREE'
+
+
+class QueryPlanTest(TestCase):
+    """Запросы страниц идут по индексам, без полного скана и сортировки."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for number in range(12):
+            cls.post = Post.objects.create(
+                author=cls.author, text=f'Пост {number}', group=cls.group
+            )
+        Comment.objects.create(post=cls.post, author=cls.reader, text='Да')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def get_plans(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        plans = {}
+        with connection.cursor() as cursor:
+            for query in context.captured_queries:
+                if not query['sql'].startswith('SELECT'):
+                    continue
+                cursor.execute(
+                    'EXPLAIN QUERY PLAN ' + query['sql'].replace('%', '%%')
+                )
+                plans[query['sql']] = [row[-1] for row in cursor.fetchall()]
+        return response, plans
+
+    def assertIndexedPlans(self, url):
+        response, plans = self.get_plans(url)
+        for sql, plan in plans.items():
+            for step in plan:
+                self.assertFalse(
+                    FULL_SCAN.match(step) or TEMP_SORT in step,
+                    f'{url}: {step}\n{sql}'
+                )
+        return response
+
+    def test_views_use_indexes(self):
+        """Страницы и их курсорные продолжения читают данные по индексам."""
+        urls = {
+            'posts:index': reverse('posts:index'),
+            'posts:group_list': reverse(
+                'posts:group_list', kwargs={'slug': self.group.slug}
+            ),
+            'posts:profile': reverse(
+                'posts:profile', kwargs={'username': self.author.username}
+            ),
+            'posts:follow_index': reverse('posts:follow_index'),
+        }
+        for name, url in urls.items():
+            with self.subTest(name=name):
+                response = self.assertIndexedPlans(url)
+                next_cursor = response.context['page_obj'].next_cursor
+                self.assertIndexedPlans(f'{url}?after={next_cursor}')
+        with self.subTest(name='posts:post_detail'):
+            self.assertIndexedPlans(reverse(
+                'posts:post_detail', kwargs={'post_id': self.post.id}
+            ))
+
+    def test_rendition_lookup_uses_index(self):
+        """Посты картинки для записи вариантов ищутся по индексу."""
+        sql, params = Post.objects.filter(
+            image='posts/small.gif'
+        ).query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = [row[-1] for row in cursor.fetchall()]
+        self.assertTrue(
+            any('post_image_idx' in step for step in plan), plan
+        )
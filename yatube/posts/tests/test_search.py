@@ -0,0 +1,84 @@
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='StasBasov')
+        cls.in_text = Post.objects.create(
+            author=cls.user, text='Пишем про котиков и собак'
+        )
+        cls.in_comment = Post.objects.create(
+            author=cls.user, text='Пост без ключевого слова'
+        )
+        Comment.objects.create(
+            post=cls.in_comment, author=cls.user, text='А где котики?'
+        )
+        Post.objects.create(author=cls.user, text='Совсем другой пост')
+
+    def search(self, query, **params):
+        return self.client.get(reverse('posts:search'), {'q': query, **params})
+
+    def found(self, query):
+        return list(self.search(query).context['page_obj'])
+
+    def test_search_posts_and_comments(self):
+        """Находятся посты по тексту и по комментариям, текст выше."""
+        self.assertEqual(self.found('котик'), [self.in_text, self.in_comment])
+
+    def test_search_is_case_insensitive(self):
+        """Регистр букв не важен."""
+        self.assertEqual(self.found('СОБАК'), [self.in_text])
+
+    def test_index_follows_writes(self):
+        """Изменение и удаление поста сразу видны в поиске."""
+        post = Post.objects.get(pk=self.in_text.pk)
+        post.text = 'Теперь про хомяков'
+        post.save()
+        self.assertEqual(self.found('хомяков'), [post])
+        self.assertEqual(self.found('собак'), [])
+        self.in_comment.comments.all().delete()
+        self.assertEqual(self.found('котики'), [])
+        post.delete()
+        self.assertEqual(self.found('хомяков'), [])
+
+    def test_query_syntax_is_escaped(self):
+        """Операторы FTS5 и кавычки из ввода не ломают запрос."""
+        for query in ['"', 'котик OR', 'NEAR(котик', '*', '-собак']:
+            with self.subTest(query=query):
+                self.assertEqual(self.search(query).status_code, 200)
+        self.assertEqual(self.found(''), [])
+
+    def test_snippet_is_escaped_and_highlighted(self):
+        """Сниппет подсвечивает совпадение и экранирует HTML."""
+        Post.objects.create(
+            author=self.user, text='<script>alert(1)</script> енот'
+        )
+        response = self.search('енот')
+        self.assertContains(response, '<mark>енот</mark>')
+        self.assertNotContains(response, '<script>alert')
+
+    def test_pagination_keeps_query(self):
+        """Ссылки на страницы результатов сохраняют запрос."""
+        for number in range(10):
+            Post.objects.create(author=self.user, text=f'Ещё котик {number}')
+        response = self.search('котик')
+        self.assertContains(
+            response, '?q=%D0%BA%D0%BE%D1%82%D0%B8%D0%BA&page=2'
+        )
+        response = self.search('котик', page=2)
+        self.assertEqual(len(response.context['page_obj']), 2)
+
+    def test_rebuild_command(self):
+        """Команда переиндексирует посты, созданные в обход сигналов."""
+        Post.objects.bulk_create([Post(author=self.user, text='Барсук')])
+        self.assertEqual(self.found('барсук'), [])
+        call_command('rebuild_search', stdout=open('/dev/null', 'w'))
+        self.assertEqual(len(self.found('барсук')), 1)
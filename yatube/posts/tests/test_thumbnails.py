@@ -0,0 +1,224 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail import default, delete
+from sorl.thumbnail.images import ImageFile
+
+from posts import thumbnails
+from posts.models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def jpeg(name='photo.jpg', size=(1200, 800)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, (200, 80, 40)).save(buffer, 'JPEG')
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/jpeg')
+
+
+def run_on_commit():
+    """TestCase не коммитит транзакцию: отложенное выполняется вручную."""
+    callbacks, connection.run_on_commit = connection.run_on_commit, []
+    for _, callback in callbacks:
+        callback()
+
+
+def thumbnail_files():
+    return sum(
+        len(files) for _, _, files in
+        os.walk(os.path.join(TEMP_MEDIA_ROOT, 'cache'))
+    )
+
+
+def has_thumbnails(name):
+    return default.kvstore.get(ImageFile(name, default.storage)) is not None
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ThumbnailsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_new_image_gets_thumbnails(self):
+        """Варианты создаются после сохранения новой картинки."""
+        post = Post.objects.create(author=self.user, text='Текст')
+        run_on_commit()
+        post.image = jpeg()
+        post.save()
+        self.assertFalse(has_thumbnails(post.image.name))
+        run_on_commit()
+        self.assertTrue(has_thumbnails(post.image.name))
+        # Страница берёт готовые варианты, а не создаёт свои.
+        created = thumbnail_files()
+        self.assertGreater(created, 0)
+        self.client.get(reverse('posts:post_detail', args=[post.pk]))
+        self.assertEqual(thumbnail_files(), created)
+
+    def test_unchanged_image_is_not_processed(self):
+        """Правка текста не ставит картинку в очередь заново."""
+        post = Post.objects.create(
+            author=self.user, text='Текст', image=jpeg()
+        )
+        run_on_commit()
+        delete(post.image.name, delete_file=False)
+        post.text = 'Новый текст'
+        post.save()
+        run_on_commit()
+        self.assertFalse(has_thumbnails(post.image.name))
+
+    def test_backfill_command(self):
+        """Команда создаёт варианты для уже загруженных картинок."""
+        post = Post.objects.create(
+            author=self.user, text='Текст', image=jpeg()
+        )
+        connection.run_on_commit = []
+        out = io.StringIO()
+        call_command('generate_thumbnails', workers=0, stdout=out)
+        self.assertTrue(has_thumbnails(post.image.name))
+        self.assertIn('Картинок: 1, с ошибками: 0', out.getvalue())
+        post.refresh_from_db()
+        self.assertIn('card', json.loads(post.image_renditions))
+        out = io.StringIO()
+        call_command('generate_thumbnails', workers=0, missing=True,
+                     stdout=out)
+        self.assertIn('Картинок: 0, с ошибками: 0', out.getvalue())
+
+    def test_upload_stores_dimensions(self):
+        """Размеры записываются при загрузке, до создания вариантов."""
+        self.client.force_login(self.user)
+        self.client.post(reverse('posts:post_create'), {
+            'text': 'Текст', 'image': jpeg(size=(640, 480))
+        })
+        post = Post.objects.get()
+        self.assertEqual((post.image_width, post.image_height), (640, 480))
+        self.assertEqual(post.image_renditions, '')
+        response = self.client.get(reverse('api:post_detail', args=[post.pk]))
+        self.assertEqual(
+            (response.json()['image_width'], response.json()['image_height']),
+            (640, 480)
+        )
+        run_on_commit()
+        post.refresh_from_db()
+        self.assertNotEqual(post.image_renditions, '')
+        # Новая картинка сбрасывает прежние размеры и варианты.
+        post.image = jpeg('other.jpg', size=(300, 200))
+        post.save()
+        self.assertEqual((post.image_width, post.image_height), (300, 200))
+        self.assertEqual(post.image_renditions, '')
+
+    def test_picture_markup(self):
+        """Страницы отдают WebP и JPEG нескольких ширин без увеличения."""
+        post = Post.objects.create(
+            author=self.user, text='Текст', image=jpeg(size=(1200, 800))
+        )
+        run_on_commit()
+        post.refresh_from_db()
+        self.assertEqual((post.image_width, post.image_height), (1200, 800))
+        rendition = json.loads(post.image_renditions)['card']
+        self.assertEqual(
+            [content_type for content_type, _ in rendition['sources']],
+            ['image/webp', 'image/jpeg']
+        )
+        for _, variants in rendition['sources']:
+            self.assertEqual(
+                [width for _, width in variants],
+                [320, 480, 640, 960, 1200]
+            )
+            self.assertTrue(all(url.startswith('/media/cache/')
+                                for url, _ in variants))
+        self.assertEqual((rendition['width'], rendition['height']),
+                         (960, 339))
+        for url in (
+            reverse('posts:index'),
+            reverse('posts:post_detail', args=[post.pk]),
+        ):
+            with self.subTest(url=url):
+                content = self.client.get(url).content.decode()
+                self.assertIn('<source type="image/webp"', content)
+                self.assertIn(' 1200w"', content)
+                self.assertIn('width="960" height="339"', content)
+
+    def test_missing_file_renders_nothing(self):
+        """Картинка без файла не ломает страницу."""
+        post = Post.objects.create(
+            author=self.user, text='Текст', image='posts/missing.jpg'
+        )
+        with self.assertLogs('posts.thumbnails', 'ERROR'):
+            run_on_commit()
+        response = self.client.get(
+            reverse('posts:post_detail', args=[post.pk])
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, '<picture>')
+
+    def test_page_does_not_touch_files(self):
+        """Страница рендерит картинки из строк постов, не читая файлы."""
+        for number in range(3):
+            Post.objects.create(
+                author=self.user, text=f'Пост {number}', image=jpeg()
+            )
+        run_on_commit()
+        # Без файлов и ключей sorl разметка всё равно полная.
+        default.kvstore.clear()
+        shutil.rmtree(TEMP_MEDIA_ROOT)
+        with self.assertNoLogs('sorl.thumbnail', 'ERROR'):
+            content = self.client.get(reverse('posts:index')).content.decode()
+        self.assertEqual(content.count('<picture>'), 3)
+        self.assertEqual(content.count('width="960" height="339"'), 3)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=2)
+class ThumbnailPoolTest(TransactionTestCase):
+    """Пул потоков, как в продакшене: транзакции здесь коммитятся."""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def tearDown(self):
+        thumbnails.shutdown()
+        cache.clear()
+
+    def test_pool_generates_renditions(self):
+        """Варианты создаются в потоке пула и записываются в пост."""
+        threads = []
+        generate_logged = thumbnails.generate_logged
+
+        def recording(name):
+            threads.append(threading.current_thread().name)
+            generate_logged(name)
+
+        user = User.objects.create_user(username='auth')
+        with mock.patch.object(thumbnails, 'generate_logged', recording):
+            post = Post.objects.create(
+                author=user, text='Текст', image=jpeg()
+            )
+            thumbnails.shutdown()
+        self.assertEqual(len(threads), 1)
+        self.assertTrue(threads[0].startswith('thumbnails'))
+        post.refresh_from_db()
+        self.assertTrue(has_thumbnails(post.image.name))
+        self.assertIn('card', json.loads(post.image_renditions))
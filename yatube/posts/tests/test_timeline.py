@@ -0,0 +1,110 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Follow, Post, TimelineEntry, User, UserStats
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def get_feed(self):
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        return [post.text for post in response.context['page_obj']]
+
+    def test_new_post_is_fanned_out(self):
+        """Новый пост автора попадает в ленты подписчиков."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertEqual(self.get_feed(), ['Новый пост'])
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        """Подписка дописывает посты автора в ленту, отписка их убирает."""
+        Post.objects.create(author=self.author, text='Старый пост')
+        self.authorized_client.get(
+            reverse('posts:profile_follow', kwargs={'username': 'auth'})
+        )
+        self.assertEqual(self.get_feed(), ['Старый пост'])
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', kwargs={'username': 'auth'})
+        )
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.get_feed(), [])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_popular_author_is_pulled(self):
+        """Посты популярного автора не раскладываются, а читаются из Post."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Post.objects.create(author=self.author, text='Пост звезды')
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.get_feed(), ['Пост звезды'])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_pulled_author_post_updates_feed_count(self):
+        """Новый пост автора в режиме чтения меняет количество в ленте."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        url = reverse('posts:follow_index')
+        response = self.authorized_client.get(url)
+        self.assertEqual(response.context['page_obj'].paginator.count, 0)
+        Post.objects.create(author=self.author, text='Пост звезды')
+        response = self.authorized_client.get(url)
+        self.assertEqual(response.context['page_obj'].paginator.count, 1)
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=3)
+    def test_author_below_limit_stays_pulled(self):
+        """
+        Автор, опустившийся ниже порога, остаётся в режиме чтения:
+        отписка не пишет записей, а посты времён популярности не
+        пропадают. rebuild_timeline раскладывает их в ленты.
+        """
+        other, third, late = (
+            User.objects.create_user(username=name)
+            for name in ('other', 'third', 'late')
+        )
+        for user in (self.reader, other, third):
+            Follow.objects.create(user=user, author=self.author)
+        for number in range(5):
+            Post.objects.create(author=self.author, text=f'Пост {number}')
+        Follow.objects.create(user=late, author=self.author)
+        Follow.objects.filter(user=other).delete()
+        with CaptureQueriesContext(connection) as queries:
+            Follow.objects.filter(user=third).delete()
+        self.assertLess(len(queries), 15)
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.get_feed()[0], 'Пост 4')
+        call_command('rebuild_timeline', stdout=StringIO())
+        self.assertEqual(
+            TimelineEntry.objects.filter(user__in=[self.reader, late]).count(),
+            10
+        )
+        self.assertFalse(UserStats.objects.get(user=self.author).pull_timeline)
+        self.assertEqual(len(self.get_feed()), 5)
+        Post.objects.create(author=self.author, text='Новый пост')
+        self.assertEqual(self.get_feed()[0], 'Новый пост')
+        self.assertEqual(
+            TimelineEntry.objects.filter(post__text='Новый пост').count(), 2
+        )
+
+    def test_rebuild_command(self):
+        """Команда rebuild_timeline восстанавливает ленту."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Post.objects.create(author=self.author, text='Пост')
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timeline', stdout=StringIO())
+        self.assertEqual(TimelineEntry.objects.count(), 1)
+        self.assertEqual(self.get_feed(), ['Пост'])
@@ -0,0 +1,140 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class TransferTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='StasBasov', password='secret', first_name='Стас'
+        )
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Важная группа',
+            slug='important',
+            description='Группа для важных постов',
+        )
+        for number in range(5):
+            post = Post.objects.create(
+                author=cls.author,
+                text=f'Пост {number}, "в кавычках"\nи с переносом',
+                group=cls.group if number % 2 else None,
+            )
+            Comment.objects.create(
+                post=post, author=cls.reader, text=f'Комментарий {number}'
+            )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def snapshot(self):
+        return (
+            list(User.objects.order_by('username').values_list(
+                'username', 'password', 'first_name', 'date_joined'
+            )),
+            list(Group.objects.values_list('slug', 'title')),
+            list(Post.objects.values_list(
+                'id', 'text', 'pub_date', 'updated', 'author__username',
+                'group__slug', 'comments_count'
+            )),
+            list(Comment.objects.values_list(
+                'id', 'post_id', 'author__username', 'text', 'created'
+            )),
+            list(Follow.objects.values_list(
+                'user__username', 'author__username'
+            )),
+        )
+
+    def export(self, **options):
+        call_command(
+            'export_content', self.directory, stdout=io.StringIO(), **options
+        )
+
+    def load(self, **options):
+        call_command(
+            'import_content', self.directory, stdout=io.StringIO(), **options
+        )
+
+    def wipe(self):
+        Post.objects.all().delete()
+        Group.objects.all().delete()
+        User.objects.all().delete()
+
+    def test_round_trip(self):
+        """Выгрузка и загрузка в пустую базу восстанавливают контент."""
+        for file_format in ('jsonl', 'csv'):
+            with self.subTest(format=file_format):
+                expected = self.snapshot()
+                self.export(format=file_format)
+                self.assertTrue(os.path.exists(
+                    os.path.join(self.directory, f'posts.{file_format}')
+                ))
+                self.wipe()
+                self.load()
+                self.assertEqual(self.snapshot(), expected)
+                author = User.objects.get(username='StasBasov')
+                self.assertTrue(author.check_password('secret'))
+                self.assertEqual(author.stats.posts_count, 5)
+                self.assertEqual(author.stats.followers_count, 1)
+                shutil.rmtree(self.directory)
+
+    def test_import_is_idempotent(self):
+        """Повторная загрузка в ту же базу ничего не дублирует."""
+        expected = self.snapshot()
+        self.export()
+        self.load()
+        self.load()
+        self.assertEqual(self.snapshot(), expected)
+
+    @override_settings(TRANSFER_BATCH_SIZE=2)
+    def test_resume_from_checkpoint(self):
+        """С --resume загрузка пропускает строки из контрольной точки."""
+        self.export(tables=['users', 'posts'])
+        self.wipe()
+        with open(os.path.join(self.directory, 'checkpoint.json'), 'w') as f:
+            json.dump({'users': 2, 'posts': 4}, f)
+        User.objects.create_user(username='StasBasov')
+        self.load(resume=True, skip_rebuild=True)
+        self.assertEqual(list(Post.objects.values_list('text', flat=True)), [
+            'Пост 4, "в кавычках"\nи с переносом'
+        ])
+        self.assertFalse(os.path.exists(
+            os.path.join(self.directory, 'checkpoint.json')
+        ))
+
+    def test_rows_without_references_are_skipped(self):
+        """Комментарии к отсутствующим постам не загружаются."""
+        self.export(tables=['comments'])
+        Post.objects.filter(text__startswith='Пост 0').delete()
+        stdout = io.StringIO()
+        call_command('import_content', self.directory, stdout=stdout)
+        self.assertIn('comments: 5 строк, пропущено без ссылок 1',
+                      stdout.getvalue())
+        self.assertEqual(Comment.objects.count(), 4)
+
+    def test_id_conflict_aborts_import(self):
+        """Пост выгрузки, чей id занят другим постом, прерывает загрузку."""
+        self.export()
+        post_id = Post.objects.order_by('pk').first().pk
+        Post.objects.filter(pk=post_id).delete()
+        Post.objects.create(id=post_id, author=self.reader, text='Чужой пост')
+        comments = Comment.objects.count()
+        with self.assertRaisesMessage(CommandError, f'({post_id})'):
+            self.load()
+        self.assertEqual(Post.objects.get(pk=post_id).text, 'Чужой пост')
+        self.assertEqual(Comment.objects.count(), comments)
@@ -160,7 +160,8 @@ class TaskPagesTests(TestCase):
 
     def test_cache_index(self):
         """
-        Список постов на главной странице сайта хранится в кэше и обновляется.
+        Список постов на главной странице сайта хранится в кэше
+        и обновляется сразу после записи.
         """
         post = Post.objects.create(
             author=self.user,
@@ -171,17 +172,41 @@ class TaskPagesTests(TestCase):
         first_response_content = self.guest_client.get(
             reverse('posts:index')
         ).content
-        post.delete()
+        # update() минует сигналы: поколение не меняется, фрагмент из кеша
+        Post.objects.filter(pk=post.pk).update(text='Изменённый текст')
 
         second_response_content = self.guest_client.get(
             reverse('posts:index')
         ).content
         self.assertEqual(first_response_content, second_response_content)
-        cache.clear()
+        post.delete()
         third_response_content = self.guest_client.get(
             reverse('posts:index')
         ).content
         self.assertNotEqual(third_response_content, second_response_content)
+        cache.clear()
+        fourth_response_content = self.guest_client.get(
+            reverse('posts:index')
+        ).content
+        self.assertEqual(third_response_content, fourth_response_content)
+
+    def test_cache_group_and_profile(self):
+        """Фрагменты группы и профиля сбрасываются новым постом."""
+        urls = [
+            reverse('posts:group_list', kwargs={'slug': 'test'}),
+            reverse('posts:profile', kwargs={'username': 'StasBasov'}),
+        ]
+        for url in urls:
+            self.guest_client.get(url)
+        Post.objects.create(
+            author=self.user,
+            text='Самый свежий пост',
+            group=Group.objects.get(id=1)
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertContains(response, 'Самый свежий пост')
 
     def test_follow(self):
         """Тестирование подписки на автора."""
@@ -0,0 +1,25 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """
+    Проверка того, что запрос к странице укладывается в заявленный
+    бюджет SQL-запросов.
+    """
+    query_budgets = {}
+
+    def get_within_budget(self, client, budget_name, url, data=None):
+        budget = self.query_budgets[budget_name]
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url, data)
+        if len(context) > budget:
+            executed = '\n'.join(
+                f'{number}. {query["sql"]}'
+                for number, query in enumerate(context.captured_queries, 1)
+            )
+            self.fail(
+                f'{budget_name}: выполнено {len(context)} SQL-запросов '
+                f'при бюджете {budget}:\n{executed}'
+            )
+        return response, len(context)
@@ -0,0 +1,126 @@
+"""
+Варианты картинок постов, созданные заранее.
+
+После сохранения поста с новой картинкой все виды из IMAGE_RENDITIONS
+(posts.renditions) ставятся в очередь пула потоков THUMBNAIL_WORKERS.
+Pillow отпускает GIL, пока декодирует и масштабирует, так что потоки
+почти не мешают обработке запросов. Размер оригинала и описания
+вариантов записываются в посты с этой картинкой, а страницы с ними
+сбрасываются из кеша.
+
+Для уже загруженных картинок есть команда generate_thumbnails: она
+раскладывает их по процессам на все ядра.
+"""
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import Image
+from sorl.thumbnail import delete
+
+from . import renditions
+from .cache import invalidate_scopes, post_scope, post_scopes
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_executor = None
+_pid = None
+
+# Значения тега EXIF Orientation, при которых картинка повёрнута на 90°.
+EXIF_ORIENTATION = 0x0112
+TRANSPOSED = {5, 6, 7, 8}
+
+
+def image_size(name):
+    """Размер картинки с учётом поворота; читается только заголовок."""
+    with default_storage.open(name) as source:
+        image = Image.open(source)
+        width, height = image.size
+        if image.getexif().get(EXIF_ORIENTATION) in TRANSPOSED:
+            width, height = height, width
+    return width, height
+
+
+def generate(name, force=False):
+    """
+    Создаёт все виды картинки, которых ещё нет; с force пересоздаёт
+    их. Возвращает размер оригинала и описания видов.
+    """
+    if force:
+        delete(name, delete_file=False)
+    size = image_size(name)
+    descriptions = {}
+    for kind in settings.IMAGE_RENDITIONS:
+        descriptions[kind] = renditions.build(name, kind, size)
+        if descriptions[kind] is None:
+            raise OSError(f'Не удалось прочитать картинку {name}')
+    return size, descriptions
+
+
+def store(name, size, descriptions):
+    """Записывает размеры и варианты в посты с картинкой name."""
+    posts = list(Post.objects.filter(image=name))
+    Post.objects.filter(pk__in=[post.pk for post in posts]).update(
+        image_width=size[0],
+        image_height=size[1],
+        image_renditions=json.dumps(descriptions),
+    )
+    scopes = set()
+    for post in posts:
+        scopes.update(post_scopes(post))
+        scopes.add(post_scope(post.pk))
+    invalidate_scopes(scopes)
+
+
+def executor():
+    """Пул потоков процесса; после fork() создаётся заново."""
+    global _executor, _pid
+    with _lock:
+        if _executor is None or _pid != os.getpid():
+            _executor = ThreadPoolExecutor(
+                settings.THUMBNAIL_WORKERS, thread_name_prefix='thumbnails'
+            )
+            _pid = os.getpid()
+        return _executor
+
+
+def shutdown(wait=True):
+    """Останавливает пул процесса, по умолчанию дождавшись его задач."""
+    global _executor
+    with _lock:
+        pool, _executor = _executor, None
+    if pool is not None:
+        pool.shutdown(wait=wait)
+
+
+def generate_logged(name):
+    """Ошибки создания пишутся в журнал и не доходят до запроса."""
+    try:
+        store(name, *generate(name))
+    except Exception:
+        logger.exception('Не удалось создать варианты %s', name)
+
+
+def run(name):
+    """Задача пула: после неё закрываются соединения потока."""
+    try:
+        generate_logged(name)
+    finally:
+        connections.close_all()
+
+
+def schedule(name):
+    """Ставит картинку в очередь пула после коммита транзакции."""
+    if not name:
+        return
+    if settings.THUMBNAIL_WORKERS:
+        transaction.on_commit(lambda: executor().submit(run, name))
+    else:
+        transaction.on_commit(lambda: generate_logged(name))
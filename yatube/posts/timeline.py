@@ -0,0 +1,169 @@
+"""
+Материализованная лента подписок.
+
+Новый пост раскладывается в ленты подписчиков автора при записи
+(fan-out on write). Посты популярных авторов, у которых подписчиков
+не меньше TIMELINE_FANOUT_LIMIT, не раскладываются: лента читателя
+дотягивает их при чтении (pull).
+
+Автор, опустившийся ниже порога после отписки, остаётся в режиме
+чтения (UserStats.pull_timeline): раскладывать его посты в ленты
+подписчиков в запросе отписки слишком дорого. Это делает
+rebuild_timeline.
+"""
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, Q
+
+from .models import Follow, Post, TimelineEntry, UserStats
+
+# SQLite вставляет пачку через UNION ALL, а в нём не больше 500 SELECT.
+BATCH_SIZE = 500
+
+
+def is_popular(author_id):
+    """Читаются ли посты автора при чтении ленты, а не раскладываются."""
+    return UserStats.objects.filter(
+        Q(followers_count__gte=settings.TIMELINE_FANOUT_LIMIT)
+        | Q(pull_timeline=True),
+        user_id=author_id,
+    ).exists()
+
+
+def fan_out_post(post):
+    """
+    Добавляет новый пост в ленты всех подписчиков автора и возвращает
+    их id (пустой список для популярного автора).
+    """
+    if is_popular(post.author_id):
+        return []
+    follower_ids = list(Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True))
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in follower_ids
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    return follower_ids
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту читателя последние посты нового автора."""
+    if is_popular(author_id):
+        return
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'id', 'pub_date'
+    )[:settings.TIMELINE_BACKFILL_SIZE]
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+            for post_id, pub_date in posts
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def prune(user_id, author_id):
+    """Убирает из ленты читателя посты автора, от которого он отписался."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def unfollow(user_id, author_id):
+    """
+    Отписка: чистит ленту читателя. Если автор из-за неё опустился
+    ниже порога, он остаётся в режиме чтения, а не раскладывается в
+    ленты остальных подписчиков прямо в запросе.
+    """
+    prune(user_id, author_id)
+    UserStats.objects.filter(
+        user_id=author_id,
+        followers_count=settings.TIMELINE_FANOUT_LIMIT - 1
+    ).update(pull_timeline=True)
+
+
+def rebuild(users=None):
+    """
+    Перестраивает ленты заданных пользователей (или всех) с нуля.
+    Полная перестройка возвращает авторов ниже порога в режим
+    раскладки.
+    """
+    if users is None:
+        UserStats.objects.filter(
+            pull_timeline=True,
+            followers_count__lt=settings.TIMELINE_FANOUT_LIMIT
+        ).update(pull_timeline=False)
+    follows = Follow.objects.all()
+    entries = TimelineEntry.objects.all()
+    if users is not None:
+        follows = follows.filter(user__in=users)
+        entries = entries.filter(user__in=users)
+    entries.delete()
+    for user_id, author_id in follows.values_list(
+        'user_id', 'author_id'
+    ).iterator():
+        backfill(user_id, author_id)
+
+
+def materialize(first_user_id, last_user_id):
+    """
+    Раскладывает в ленты читателей с id из диапазона все посты
+    непопулярных авторов их подписок одним INSERT ... SELECT, как если бы
+    подписки существовали с самого начала. Для первичного наполнения,
+    когда лент ещё нет: в отличие от rebuild() не ограничена
+    TIMELINE_BACKFILL_SIZE и не проходит по подпискам в Python.
+    """
+    entries = TimelineEntry._meta.db_table
+    follows = Follow._meta.db_table
+    posts = Post._meta.db_table
+    stats = UserStats._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {entries} (user_id, post_id, pub_date) '
+            f'SELECT f.user_id, p.id, p.pub_date FROM {follows} f '
+            f'JOIN {stats} s ON s.user_id = f.author_id '
+            f'JOIN {posts} p ON p.author_id = f.author_id '
+            f'WHERE f.user_id BETWEEN %s AND %s AND s.followers_count < %s '
+            f'AND NOT s.pull_timeline',
+            [first_user_id, last_user_id, settings.TIMELINE_FANOUT_LIMIT]
+        )
+        return cursor.rowcount
+
+
+def popular_authors_followed_by(user):
+    return Follow.objects.filter(
+        Q(author__stats__followers_count__gte=settings.TIMELINE_FANOUT_LIMIT)
+        | Q(author__stats__pull_timeline=True),
+        user=user,
+    ).values_list('author', flat=True)
+
+
+def timeline_feed(user):
+    """
+    Возвращает посты ленты и поля ключа пагинации.
+
+    Если читатель не подписан на популярных авторов, лента целиком
+    читается из материализованных записей в порядке индекса
+    (user, -pub_date, -post). Иначе к ним добавляются посты популярных
+    авторов, и сортировка идёт по полям самого поста.
+    """
+    popular = list(popular_authors_followed_by(user))
+    if not popular:
+        return (
+            Post.objects.filter(timeline_entries__user=user).annotate(
+                feed_date=F('timeline_entries__pub_date'),
+                feed_post=F('timeline_entries__post'),
+            ),
+            ('feed_date', 'feed_post'),
+        )
+    materialized = TimelineEntry.objects.filter(user=user).values('post')
+    return (
+        Post.objects.filter(Q(id__in=materialized) | Q(author__in=popular)),
+        None,
+    )
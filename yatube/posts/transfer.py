@@ -0,0 +1,426 @@
+"""
+Выгрузка и загрузка контента в JSONL и CSV.
+
+Каталог выгрузки содержит по файлу на таблицу: users, groups, posts,
+comments, follows. Пользователи и группы ссылаются друг на друга по
+естественным ключам (username и slug), посты и комментарии сохраняют
+свои id. Если id из выгрузки в базе занят другим постом или
+комментарием, загрузка прерывается до вставки первой строки.
+Выгрузка читает таблицы итератором и пишет построчно, память
+не растёт с размером таблицы. Загрузка вставляет строки пачками через
+bulk_create, внешние ключи ищет через LRU-кеш и после каждой пачки
+записывает контрольную точку, с которой её можно продолжить.
+"""
+import csv
+import json
+import os
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.color import no_style
+from django.db import connection, transaction
+
+from core.cache import LRU
+
+from .models import Comment, Follow, Group, Post, User
+
+FORMATS = ('jsonl', 'csv')
+CHECKPOINT = 'checkpoint.json'
+
+
+def parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    return value in ('True', 'true', '1')
+
+
+def parse_date(value):
+    return datetime.fromisoformat(value) if value else None
+
+
+def encode_date(value):
+    # Полный isoformat: DjangoJSONEncoder обрезает микросекунды.
+    return value.isoformat()
+
+
+def parse_text(value):
+    return value or ''
+
+
+def parse_optional(value):
+    return value if value not in (None, '') else None
+
+
+class IdConflict(Exception):
+    """id из выгрузки занят в базе другим объектом."""
+
+
+class KeyCache:
+    """
+    id моделей по естественному ключу. Недостающие ключи пачки
+    загружаются одним запросом, найденные хранятся в LRU.
+    """
+
+    def __init__(self, model, field):
+        self.model = model
+        self.field = field
+        self.ids = LRU(settings.TRANSFER_KEY_CACHE_SIZE)
+
+    def load(self, keys):
+        missing = {key for key in keys if key and self.ids.get(key) is None}
+        if not missing:
+            return
+        for key, pk in self.model.objects.filter(**{
+            f'{self.field}__in': missing
+        }).values_list(self.field, 'pk').iterator():
+            self.ids.set(key, pk, None)
+
+    def get(self, key):
+        return self.ids.get(key) if key else None
+
+
+class Table:
+    """Таблица выгрузки: колонки, чтение и сборка объектов из строк."""
+    name = None
+    model = None
+    # Колонка файла -> (поле values() при выгрузке, разбор при загрузке).
+    columns = {}
+    # Колонки-ссылки: колонка -> таблица, в кеше ключей которой она ищется.
+    references = {}
+    # Поля, которые при загрузке не заполняются автоматически.
+    keep_dates = ()
+    # Колонки, по которым строка с id узнаёт себя в базе: тот же id
+    # с другими значениями — чужой объект.
+    identity = ()
+
+    def rows(self):
+        fields = [field for field, _ in self.columns.values()]
+        queryset = self.model.objects.order_by('pk').values_list(*fields)
+        for values in queryset.iterator(
+            chunk_size=settings.TRANSFER_BATCH_SIZE
+        ):
+            yield dict(zip(self.columns, values))
+
+    def parse(self, row):
+        return {
+            column: parse(row.get(column))
+            for column, (_, parse) in self.columns.items()
+        }
+
+    def build(self, row, keys):
+        """Объект модели из строки или None, если ссылки не найдены."""
+        raise NotImplementedError
+
+    def conflicts(self, batch):
+        """id строк пачки, занятые в базе другими объектами."""
+        expected = {
+            row['id']: tuple(row[column] for column in self.identity)
+            for row in batch
+        }
+        fields = [self.columns[column][0] for column in self.identity]
+        return [
+            pk for pk, *values in self.model.objects.filter(
+                pk__in=expected
+            ).values_list('pk', *fields).iterator()
+            if tuple(values) != expected[pk]
+        ]
+
+
+class Users(Table):
+    name = 'users'
+    model = User
+    columns = {
+        'username': ('username', parse_text),
+        'email': ('email', parse_text),
+        'first_name': ('first_name', parse_text),
+        'last_name': ('last_name', parse_text),
+        'password': ('password', parse_text),
+        'is_active': ('is_active', parse_bool),
+        'is_staff': ('is_staff', parse_bool),
+        'is_superuser': ('is_superuser', parse_bool),
+        'date_joined': ('date_joined', parse_date),
+        'last_login': ('last_login', parse_date),
+    }
+
+    def build(self, row, keys):
+        return User(**row)
+
+
+class Groups(Table):
+    name = 'groups'
+    model = Group
+    columns = {
+        'slug': ('slug', parse_text),
+        'title': ('title', parse_text),
+        'description': ('description', parse_text),
+    }
+
+    def build(self, row, keys):
+        return Group(**row)
+
+
+class Posts(Table):
+    name = 'posts'
+    model = Post
+    columns = {
+        'id': ('id', int),
+        'text': ('text', parse_text),
+        'pub_date': ('pub_date', parse_date),
+        'updated': ('updated', parse_date),
+        'author': ('author__username', parse_text),
+        'group': ('group__slug', parse_optional),
+        'image': ('image', parse_text),
+    }
+    references = {'author': 'users', 'group': 'groups'}
+    keep_dates = ('pub_date', 'updated')
+    identity = ('author', 'pub_date')
+
+    def build(self, row, keys):
+        author_id = keys['users'].get(row.pop('author'))
+        if author_id is None:
+            return None
+        return Post(
+            author_id=author_id,
+            group_id=keys['groups'].get(row.pop('group')),
+            **row
+        )
+
+
+class Comments(Table):
+    name = 'comments'
+    model = Comment
+    columns = {
+        'id': ('id', int),
+        'post': ('post_id', int),
+        'author': ('author__username', parse_text),
+        'text': ('text', parse_text),
+        'created': ('created', parse_date),
+    }
+    references = {'author': 'users', 'post': 'posts'}
+    keep_dates = ('created',)
+    identity = ('post', 'author', 'created')
+
+    def build(self, row, keys):
+        author_id = keys['users'].get(row.pop('author'))
+        post_id = keys['posts'].get(row.pop('post'))
+        if author_id is None or post_id is None:
+            return None
+        return Comment(author_id=author_id, post_id=post_id, **row)
+
+
+class Follows(Table):
+    name = 'follows'
+    model = Follow
+    columns = {
+        'user': ('user__username', parse_text),
+        'author': ('author__username', parse_text),
+    }
+    references = {'user': 'users', 'author': 'users'}
+
+    def build(self, row, keys):
+        user_id = keys['users'].get(row['user'])
+        author_id = keys['users'].get(row['author'])
+        if user_id is None or author_id is None or user_id == author_id:
+            return None
+        return Follow(user_id=user_id, author_id=author_id)
+
+
+# В порядке зависимостей: ссылки указывают только на таблицы выше.
+TABLES = {table.name: table() for table in (
+    Users, Groups, Posts, Comments, Follows
+)}
+
+
+def table_path(directory, name, file_format):
+    return os.path.join(directory, f'{name}.{file_format}')
+
+
+def export_table(table, path, file_format):
+    """Пишет таблицу в файл построчно; возвращает число строк."""
+    count = 0
+    with open(path, 'w', encoding='utf-8', newline='') as output:
+        if file_format == 'csv':
+            writer = csv.DictWriter(output, fieldnames=list(table.columns))
+            writer.writeheader()
+            write = writer.writerow
+        else:
+            def write(row):
+                output.write(json.dumps(
+                    row, default=encode_date, ensure_ascii=False
+                ))
+                output.write('\n')
+        for row in table.rows():
+            write(row)
+            count += 1
+    return count
+
+
+def read_table(path, file_format):
+    with open(path, encoding='utf-8', newline='') as source:
+        if file_format == 'csv':
+            yield from csv.DictReader(source)
+        else:
+            for line in source:
+                if line.strip():
+                    yield json.loads(line)
+
+
+@contextmanager
+def keeping_dates(model, names):
+    """Отключает auto_now и auto_now_add, чтобы сохранить даты из файла."""
+    fields = [model._meta.get_field(name) for name in names]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def reset_sequences(*models):
+    """Сдвигает счётчики id после вставки строк с явными id."""
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+
+class PostIds:
+    """Посты существуют под своими id: проверяются пачкой в базе."""
+
+    def __init__(self):
+        self.ids = LRU(settings.TRANSFER_KEY_CACHE_SIZE)
+
+    def load(self, keys):
+        missing = {key for key in keys if self.ids.get(key) is None}
+        if missing:
+            for pk in Post.objects.filter(pk__in=missing).values_list(
+                'pk', flat=True
+            ).iterator():
+                self.ids.set(pk, pk, None)
+
+    def get(self, key):
+        return self.ids.get(key)
+
+
+class Loader:
+    """
+    Загрузка каталога выгрузки с контрольными точками: после каждой
+    закоммиченной пачки в checkpoint.json записывается, сколько строк
+    каждой таблицы уже обработано. Повторная вставка тех же строк
+    безопасна: конфликты по уникальным ключам пропускаются.
+    """
+
+    def __init__(self, directory, resume=False, log=None):
+        self.directory = directory
+        self.checkpoint_path = os.path.join(directory, CHECKPOINT)
+        self.done = self.read_checkpoint() if resume else {}
+        self.log = log or (lambda message: None)
+        self.keys = {
+            'users': KeyCache(User, 'username'),
+            'groups': KeyCache(Group, 'slug'),
+            'posts': PostIds(),
+        }
+
+    def read_checkpoint(self):
+        if not os.path.exists(self.checkpoint_path):
+            return {}
+        with open(self.checkpoint_path) as checkpoint:
+            return json.load(checkpoint)
+
+    def write_checkpoint(self):
+        temporary = f'{self.checkpoint_path}.tmp'
+        with open(temporary, 'w') as checkpoint:
+            json.dump(self.done, checkpoint)
+        os.replace(temporary, self.checkpoint_path)
+
+    def find(self, name):
+        for file_format in FORMATS:
+            path = table_path(self.directory, name, file_format)
+            if os.path.exists(path):
+                return path, file_format
+        return None, None
+
+    def tables(self, names=None):
+        """Выбранные таблицы, для которых в каталоге есть файл."""
+        for name, table in TABLES.items():
+            if names and name not in names:
+                continue
+            path, file_format = self.find(name)
+            if path is not None:
+                yield table, path, file_format
+
+    def check_ids(self, names=None):
+        """
+        Проверяет, что id постов и комментариев выгрузки свободны или
+        заняты теми же объектами (повторная загрузка); иначе IdConflict.
+        """
+        for table, path, file_format in self.tables(names):
+            if not table.identity:
+                continue
+            rows = read_table(path, file_format)
+            conflicts = []
+            while True:
+                batch = [
+                    table.parse(row) for row in islice(
+                        rows, settings.TRANSFER_BATCH_SIZE
+                    )
+                ]
+                if not batch:
+                    break
+                conflicts += table.conflicts(batch)
+            if conflicts:
+                shown = ', '.join(map(str, sorted(conflicts)[:10]))
+                raise IdConflict(
+                    f'{table.name}: {len(conflicts)} id из выгрузки заняты '
+                    f'в базе другими объектами ({shown})'
+                )
+
+    def load(self, names=None):
+        """
+        Загружает таблицы; возвращает {таблица: (строк, пропущено)},
+        где пропущены строки со ссылками на отсутствующие объекты.
+        """
+        self.check_ids(names)
+        result = {}
+        for table, path, file_format in self.tables(names):
+            with keeping_dates(table.model, table.keep_dates):
+                result[table.name] = self.load_table(
+                    table, path, file_format
+                )
+        reset_sequences(Post, Comment)
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+        return result
+
+    def load_table(self, table, path, file_format):
+        skip = self.done.get(table.name, 0)
+        rows = islice(read_table(path, file_format), skip, None)
+        processed = skipped = 0
+        while True:
+            batch = [
+                table.parse(row) for row in islice(
+                    rows, settings.TRANSFER_BATCH_SIZE
+                )
+            ]
+            if not batch:
+                break
+            for column, keys in table.references.items():
+                self.keys[keys].load(row[column] for row in batch)
+            objects = [table.build(row, self.keys) for row in batch]
+            objects = [obj for obj in objects if obj is not None]
+            with transaction.atomic():
+                table.model.objects.bulk_create(
+                    objects, ignore_conflicts=True
+                )
+            processed += len(batch)
+            skipped += len(batch) - len(objects)
+            self.done[table.name] = skip + processed
+            self.write_checkpoint()
+            self.log(f'{table.name}: {self.done[table.name]}')
+        return processed, skipped
@@ -1,19 +1,45 @@
 from django.urls import path
-from . import views
+from . import feeds, views
 app_name = 'posts'
 
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('fragment/', views.index_fragment, name='index_fragment'),
+    path('feed/<str:kind>/', feeds.index_feed, name='index_feed'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
+    path(
+        'group/<slug:slug>/fragment/',
+        views.group_fragment,
+        name='group_fragment'
+    ),
+    path(
+        'group/<slug:slug>/feed/<str:kind>/',
+        feeds.group_feed,
+        name='group_feed'
+    ),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path(
+        'profile/<str:username>/fragment/',
+        views.profile_fragment,
+        name='profile_fragment'
+    ),
+    path(
+        'profile/<str:username>/feed/<str:kind>/',
+        feeds.profile_feed,
+        name='profile_feed'
+    ),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path('search/', views.search, name='search'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path(
         'posts/<int:post_id>/comment/', views.add_comment, name='add_comment'
     ),
     path('follow/', views.follow_index, name='follow_index'),
+    path(
+        'follow/fragment/', views.follow_fragment, name='follow_fragment'
+    ),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
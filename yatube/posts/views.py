@@ -1,59 +1,202 @@
-from django.core.paginator import Paginator
 from django.shortcuts import render, get_object_or_404, redirect
-from .models import Post, Group, User, Comment, Follow
+from django.urls import reverse
+from .models import Post, Group, User, Follow
 from .forms import PostForm, CommentForm
-from yatube.settings import POSTS_PER_PAGE
+from .counters import user_stats
+from .cache import (GLOBAL_SCOPE, GROUPS_SCOPE, author_scope,
+                    cache_anonymous_page, follow_scope, group_scope,
+                    post_scope, track_scopes)
+from .paginators import KeysetPaginator
+from .renditions import attach
+from .search import SearchResults
+from .timeline import timeline_feed
+from yatube.settings import (LISTING_CACHE_TIMEOUT, POSTS_PER_PAGE,
+                             SEARCH_QUERY_LENGTH)
 from django.contrib.auth.decorators import login_required
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.paginator import Paginator
+from django.http import HttpResponse
 
 
-def get_page_object(request, post_list, posts_per_page):
-    paginator = Paginator(post_list, POSTS_PER_PAGE)
+def get_page_object(request, post_list, posts_per_page, **options):
+    paginator = KeysetPaginator(post_list, posts_per_page, **options)
+    after = request.GET.get('after')
+    before = request.GET.get('before')
+    if after or before:
+        return paginator.cursor_page(after=after, before=before)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     return page_obj
 
 
+def listing_cache(request, *scopes):
+    """
+    Параметры кеша фрагмента со списком постов для областей scopes.
+
+    Вызывается до чтения постов: версия должна быть не новее данных.
+    """
+    return {
+        'cache_version': track_scopes(request, scopes),
+        'cache_timeout': LISTING_CACHE_TIMEOUT,
+    }
+
+
+def render_feed_fragment(request, post_list, post_template, fragment_url,
+                         cache_context, key=None):
+    """
+    Только карточки постов после курсора ?after= и ссылка на следующую
+    порцию: без base.html, шапки и пагинатора. Курсор продолжения
+    дублируется в заголовке X-Next-Cursor.
+
+    Порция кешируется вместе с курсором: на попадании в кеш посты
+    не читаются.
+    """
+    fragment_key = make_template_fragment_key('feed_fragment', [
+        cache_context['cache_version'], post_template, request.user.id,
+        request.get_full_path(),
+    ])
+    cached = cache.get(fragment_key)
+    if cached is not None:
+        content, next_cursor = cached
+        response = HttpResponse(content)
+    else:
+        paginator = KeysetPaginator(post_list, POSTS_PER_PAGE, key=key)
+        page_obj = paginator.cursor_page(after=request.GET.get('after'))
+        context = {
+            'page_obj': page_obj,
+            'post_template': post_template,
+            'fragment_url': fragment_url,
+        }
+        response = render(
+            request, 'posts/includes/feed_fragment.html', context
+        )
+        next_cursor = page_obj.next_cursor
+        cache.set(
+            fragment_key, (response.content, next_cursor),
+            cache_context['cache_timeout']
+        )
+    if next_cursor:
+        response['X-Next-Cursor'] = next_cursor
+    return response
+
+
+@cache_anonymous_page
 def index(request):
-    post_list = Post.objects.all()
-    page_obj = get_page_object(request, post_list, POSTS_PER_PAGE)
+    cache_context = listing_cache(request, GLOBAL_SCOPE, GROUPS_SCOPE)
+    post_list = Post.objects.select_related('author', 'group')
+    page_obj = get_page_object(
+        request,
+        post_list,
+        POSTS_PER_PAGE,
+        count_scope=GLOBAL_SCOPE,
+        approximate=True
+    )
     context = {
-        'page_obj': page_obj
+        'page_obj': page_obj,
+        'fragment_url': reverse('posts:index_fragment'),
+        **cache_context,
     }
     template = 'posts/index.html'
     return render(request, template, context)
 
 
+@cache_anonymous_page
+def index_fragment(request):
+    cache_context = listing_cache(request, GLOBAL_SCOPE, GROUPS_SCOPE)
+    return render_feed_fragment(
+        request,
+        Post.objects.select_related('author', 'group'),
+        'posts/includes/index_post.html',
+        reverse('posts:index_fragment'),
+        cache_context,
+    )
+
+
+@cache_anonymous_page
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
     template = 'posts/group_list.html'
-    post_list = group.posts.all()
-    page_obj = get_page_object(request, post_list, POSTS_PER_PAGE)
+    cache_context = listing_cache(request, group_scope(group.id))
+    post_list = group.posts.select_related('author', 'group')
+    page_obj = get_page_object(
+        request, post_list, POSTS_PER_PAGE, count_scope=group_scope(group.id)
+    )
     context = {
         'group': group,
         'page_obj': page_obj,
+        'fragment_url': reverse('posts:group_fragment', args=[slug]),
+        **cache_context,
     }
     return render(request, template, context)
 
 
+@cache_anonymous_page
+def group_fragment(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    cache_context = listing_cache(request, group_scope(group.id))
+    return render_feed_fragment(
+        request,
+        group.posts.select_related('author', 'group'),
+        'posts/includes/group_post.html',
+        reverse('posts:group_fragment', args=[slug]),
+        cache_context,
+    )
+
+
+@cache_anonymous_page
 def profile(request, username):
-    author = User.objects.get(username=username)
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    user_stats(author)
+    cache_context = listing_cache(
+        request, author_scope(author.id), GROUPS_SCOPE
+    )
     following = (
         request.user.is_authenticated and Follow.objects.filter(
             user=request.user, author=author).exists()
     )
-    post_list = author.posts.all()
-    page_obj = get_page_object(request, post_list, POSTS_PER_PAGE)
+    post_list = author.posts.select_related('author', 'group')
+    page_obj = get_page_object(
+        request, post_list, POSTS_PER_PAGE, count_scope=author_scope(author.id)
+    )
     context = {
         'author': author,
         'page_obj': page_obj,
-        'following': following
+        'following': following,
+        'fragment_url': reverse('posts:profile_fragment', args=[username]),
+        **cache_context,
     }
     return render(request, 'posts/profile.html', context)
 
 
+@cache_anonymous_page
+def profile_fragment(request, username):
+    author = get_object_or_404(User, username=username)
+    cache_context = listing_cache(
+        request, author_scope(author.id), GROUPS_SCOPE
+    )
+    return render_feed_fragment(
+        request,
+        author.posts.select_related('author', 'group'),
+        'posts/includes/profile_post.html',
+        reverse('posts:profile_fragment', args=[username]),
+        cache_context,
+    )
+
+
+@cache_anonymous_page
 def post_detail(request, post_id):
-    post = Post.objects.get(id=post_id)
-    comments = Comment.objects.filter(post=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), id=post_id
+    )
+    track_scopes(request, [
+        post_scope(post.id), author_scope(post.author_id), GROUPS_SCOPE
+    ])
+    user_stats(post.author)
+    attach([post])
+    comments = post.comments.select_related('author')
     comment_form = CommentForm()
     context = {
         'post': post,
@@ -63,6 +206,18 @@ def post_detail(request, post_id):
     return render(request, 'posts/post_detail.html', context)
 
 
+def search(request):
+    """Поиск по постам и комментариям, самые релевантные сначала."""
+    query = request.GET.get('q', '').strip()[:SEARCH_QUERY_LENGTH]
+    paginator = Paginator(SearchResults(query), POSTS_PER_PAGE)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
@@ -107,15 +262,44 @@ def add_comment(request, post_id):
 def follow_index(request):
     template = 'posts/follow.html'
     title = 'Публикации избранных авторов'
-    post_list = Post.objects.filter(author__following__user=request.user)
-    page_obj = get_page_object(request, post_list, POSTS_PER_PAGE)
+    cache_context = listing_cache(
+        request, GLOBAL_SCOPE, GROUPS_SCOPE, follow_scope(request.user.id)
+    )
+    post_list, key = timeline_feed(request.user)
+    # Посты авторов в режиме чтения не пишут в область ленты читателя,
+    # поэтому количество такой ленты не кешируется.
+    page_obj = get_page_object(
+        request,
+        post_list.select_related('author', 'group'),
+        POSTS_PER_PAGE,
+        key=key,
+        count_scope=follow_scope(request.user.id) if key else None
+    )
     context = {
         'title': title,
         'page_obj': page_obj,
+        'fragment_url': reverse('posts:follow_fragment'),
+        **cache_context,
     }
     return render(request, template, context)
 
 
+@login_required
+def follow_fragment(request):
+    cache_context = listing_cache(
+        request, GLOBAL_SCOPE, GROUPS_SCOPE, follow_scope(request.user.id)
+    )
+    post_list, key = timeline_feed(request.user)
+    return render_feed_fragment(
+        request,
+        post_list.select_related('author', 'group'),
+        'posts/includes/follow_post.html',
+        reverse('posts:follow_fragment'),
+        cache_context,
+        key=key,
+    )
+
+
 @login_required
 def profile_follow(request, username):
     user = request.user
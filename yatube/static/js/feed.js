@@ -0,0 +1,62 @@
+// Подгружает следующие посты ленты, когда читатель долистал до конца.
+// Без JavaScript или при ошибке остаётся обычная постраничная навигация.
+(function () {
+  'use strict';
+  var feed = document.querySelector('[data-feed]');
+  if (!feed || !('IntersectionObserver' in window) || !window.fetch) {
+    return;
+  }
+  var pagination = document.querySelectorAll('[data-feed-pagination]');
+  var loading = false;
+
+  function showPagination(visible) {
+    pagination.forEach(function (node) { node.hidden = !visible; });
+  }
+
+  function load(next) {
+    if (loading) {
+      return;
+    }
+    loading = true;
+    observer.unobserve(next);
+    fetch(next.dataset.feedNext, {
+      credentials: 'same-origin',
+      headers: {'X-Requested-With': 'XMLHttpRequest'}
+    }).then(function (response) {
+      // Истёкшая сессия: fetch проходит редирект и получает страницу
+      // входа, её нельзя вставлять в ленту.
+      var type = response.headers.get('Content-Type') || '';
+      if (!response.ok || response.redirected ||
+          type.indexOf('text/html') !== 0) {
+        throw new Error(response.status);
+      }
+      return response.text();
+    }).then(function (html) {
+      next.remove();
+      feed.insertAdjacentHTML('beforeend', html);
+      loading = false;
+      watch();
+    }).catch(function () {
+      loading = false;
+      showPagination(true);
+    });
+  }
+
+  var observer = new IntersectionObserver(function (entries) {
+    entries.forEach(function (entry) {
+      if (entry.isIntersecting) {
+        load(entry.target);
+      }
+    });
+  }, {rootMargin: '800px 0px'});
+
+  function watch() {
+    var next = feed.querySelector('[data-feed-next]');
+    if (next) {
+      observer.observe(next);
+    }
+  }
+
+  showPagination(false);
+  watch();
+})();
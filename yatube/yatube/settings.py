@@ -1,8 +1,22 @@
+import atexit
 import os
+import shutil
+import sys
+import tempfile
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+# Тесты (manage.py test и pytest) держат файлы кеша и метрик во
+# временном каталоге процесса: очистка кеша в тестах не задевает
+# запущенный сервер, а состояние не переходит между прогонами.
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+if TESTING:
+    RUNTIME_DIR = tempfile.mkdtemp(prefix='yatube-test-')
+    atexit.register(shutil.rmtree, RUNTIME_DIR, ignore_errors=True)
+else:
+    RUNTIME_DIR = BASE_DIR
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/2.2/howto/deployment/checklist/
@@ -30,9 +44,13 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.StaticFilesMiddleware',
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.SlowRequestMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -45,11 +63,19 @@ MIDDLEWARE = [
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+# Продакшен-режим шаблонов: скомпилированные шаблоны кешируются
+# загрузчиком и компилируются все при старте рабочего процесса
+TEMPLATE_PRODUCTION_MODE = not DEBUG
+# Профилирование рендера по шаблонам и тегам в журнале медленных запросов
+TEMPLATE_PROFILING = False
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backends.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -58,6 +84,10 @@ TEMPLATES = [
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
             ],
+            'loaders': [
+                ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+            ] if TEMPLATE_PRODUCTION_MODE else TEMPLATE_LOADERS,
+            'debug': DEBUG and not TEMPLATE_PRODUCTION_MODE,
         },
     },
 ]
@@ -114,9 +144,82 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+STATIC_ROOT = os.path.join(BASE_DIR, 'collected_static')
+# Продакшен-режим статики: collectstatic пишет имена с хешем и
+# gzip-копии, а StaticFilesMiddleware отдаёт их из STATIC_ROOT
+STATIC_PRODUCTION_MODE = not DEBUG
+if STATIC_PRODUCTION_MODE:
+    STATICFILES_STORAGE = (
+        'core.staticfiles.CompressedManifestStaticFilesStorage'
+    )
 
 # Magic constants
 POSTS_PER_PAGE = 10
+# Авторы с таким числом подписчиков не раскладываются по лентам
+TIMELINE_FANOUT_LIMIT = 10000
+# Сколько последних постов автора попадает в ленту при подписке
+TIMELINE_BACKFILL_SIZE = 1000
+# Сколько секунд хранится закешированное количество постов ленты
+PAGINATOR_COUNT_TIMEOUT = 60 * 60
+# С какого размера таблицы вместо COUNT(*) берётся оценка
+PAGINATOR_APPROXIMATE_COUNT = 100000
+# Сколько секунд живут фрагменты со списками постов: свежесть
+# обеспечивают поколения областей, а не срок жизни
+LISTING_CACHE_TIMEOUT = 60 * 60 * 24
+# Сколько секунд хранятся целые страницы для анонимных пользователей
+ANONYMOUS_PAGE_CACHE_TIMEOUT = 60 * 10
+# Наибольший размер страницы и пакета постов в JSON API
+API_MAX_PAGE_SIZE = 100
+API_BATCH_SIZE = 100
+# Сколько последних постов попадает в RSS и Atom ленты
+FEED_ENTRIES = 50
+# Сколько символов поискового запроса учитывается
+SEARCH_QUERY_LENGTH = 200
+# Админка: сколько строк считать для отфильтрованного списка
+# и сколько объектов менять одной транзакцией в массовых действиях
+ADMIN_COUNT_LIMIT = 10000
+ADMIN_CHUNK_SIZE = 1000
+# Выгрузка и загрузка контента: строк в пачке и в контрольной точке,
+# сколько id по естественным ключам держать в памяти
+TRANSFER_BATCH_SIZE = 1000
+TRANSFER_KEY_CACHE_SIZE = 100000
+# Метрики запросов: общий файл процессов, как часто процесс сбрасывает
+# в него накопленное (секунды) и с каких адресов /metrics доступен
+# без входа под персоналом (например, сервер Prometheus)
+METRICS_DATABASE = os.path.join(RUNTIME_DIR, 'metrics.sqlite3')
+METRICS_FLUSH_INTERVAL = 5
+METRICS_ALLOWED_IPS = []
+# Журнал медленных запросов: доля запросов, за которыми ведётся
+# трасса, пороги запроса и отдельного SQL (секунды) и сколько SQL
+# одного запроса попадает в запись
+SLOW_LOG_SAMPLE_RATE = 0.1
+SLOW_REQUEST_THRESHOLD = 0.5
+SLOW_QUERY_THRESHOLD = 0.1
+SLOW_LOG_MAX_QUERIES = 200
+SLOW_LOG_FILE = os.path.join(BASE_DIR, 'slow.log')
+# Сколько самых долгих шаблонов и тегов попадает в профиль рендера
+SLOW_LOG_PROFILE_ROWS = 20
+# Адаптивные картинки постов. Для каждого вида задаются кадр
+# (соотношение сторон и ширина на странице), ширины вариантов для
+# srcset и атрибут sizes по умолчанию
+IMAGE_RENDITIONS = {
+    'card': {
+        'aspect': (960, 339),
+        'widths': [320, 480, 640, 960, 1280, 1920],
+        'sizes': '(min-width: 1200px) 1110px, 100vw',
+    },
+}
+# Сколько потоков процесса создаёт варианты после загрузки (0 — сразу
+# после коммита, в запросе)
+THUMBNAIL_WORKERS = 2
+# Загруженные картинки постов уменьшаются до такого размера большей
+# стороны и перекодируются в JPEG с таким качеством
+IMAGE_MAX_SIZE = 1920
+IMAGE_QUALITY = 85
+# Сколько секунд браузер хранит статику: файлы с хешем в имени не
+# перепроверяются год, прочие — минуту
+STATIC_MAX_AGE = 60 * 60 * 24 * 365
+STATIC_FALLBACK_MAX_AGE = 60
 
 # Login
 LOGIN_URL = 'users:login'
@@ -139,9 +242,44 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Загрузки больше этого размера сразу пишутся во временный файл
+FILE_UPLOAD_MAX_MEMORY_SIZE = 256 * 1024
 
+# L1 в памяти каждого процесса, L2 — общий файл для всех процессов
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache.TwoTierCache',
+        'LOCATION': os.path.join(RUNTIME_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+            'L1_MAX_ENTRIES': 1000,
+            'SYNC_INTERVAL': 1,
+        },
     }
 }
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {'()': 'core.slowlog.JsonFormatter'},
+    },
+    'handlers': {
+        'slow_file': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': SLOW_LOG_FILE,
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'encoding': 'utf-8',
+            'delay': True,
+            'formatter': 'json',
+        },
+    },
+    'loggers': {
+        'yatube.slow': {
+            'handlers': ['slow_file'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}